@@ -0,0 +1,341 @@
+import bisect
+import sqlite3
+import threading
+import time
+import asyncio
+from array import array
+
+from message_counters import MessageCounters, HOUR, DAY, retention
+
+
+class LastSeen:
+    """A guild's last-seen times as two parallel arrays sorted by member ID.
+
+    16 bytes a member instead of a dict entry holding two boxed numbers;
+    get() is a binary search.
+    """
+
+    __slots__ = ('ids', 'times')
+
+    def __init__(self):
+        self.ids = array('Q')  # Member snowflakes, ascending
+        self.times = array('d')  # Epoch seconds of each member's newest message
+
+    def get(self, member_id, default=None):
+        row = bisect.bisect_left(self.ids, member_id)
+        if row < len(self.ids) and self.ids[row] == member_id:
+            return self.times[row]
+        return default
+
+    def __len__(self):
+        return len(self.ids)
+
+
+class ActivityIndex:
+    """Persistent last-seen index per (guild, member), backed by SQLite.
+
+    on_message calls record_message() for every guild message, which only
+    touches in-memory dicts: the pending last-seen updates and the rolling
+    message counters behind windowed !topchatter. Pending updates are written
+    to disk in batches by flush(), either from the background flush loop or
+    when the buffer grows past flush_batch entries.
+
+    It also keeps the newest message ID seen in each channel. Messages sent
+    while the bot was offline never reach on_message, so after a new gateway
+    session a guild's catch-up reads each channel back to where the bot last
+    saw it (catch_up_marks), and only then is the guild caught up.
+    """
+
+    def __init__(self, path, flush_interval=30, flush_batch=500):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.flush_batch = flush_batch
+        self._pending = {}  # (guild_id, member_id) -> newest epoch seconds not yet on disk
+        self._pending_counts = {}  # (guild_id, width, bucket, member_id) -> messages not yet on disk
+        self._pending_marks = {}  # (guild_id, channel_id) -> newest message ID not yet on disk
+        self._channel_marks = {}  # guild_id -> {channel_id: newest message ID seen live or read from history}
+        self._catch_up_from = {}  # guild_id -> channel marks as of the end of the last session it was caught up in
+        self.counters = MessageCounters()  # Hourly/daily message counts, loaded from disk below
+        self._backfilled = set()  # Guild IDs that have been seeded from history
+        self._caught_up = set()  # Guild IDs brought up to date from history since the current gateway session began
+        self._lock = threading.Lock()  # Serializes access to the SQLite connection
+        self._pruned = {}  # width -> oldest bucket kept at the last prune, so it only runs when a bucket rolls over
+        self._flush_task = None
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS member_activity ("
+            " guild_id INTEGER NOT NULL,"
+            " member_id INTEGER NOT NULL,"
+            " last_seen REAL NOT NULL,"
+            " PRIMARY KEY (guild_id, member_id)"
+            ") WITHOUT ROWID"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS backfilled_guilds ("
+            " guild_id INTEGER PRIMARY KEY,"
+            " backfilled_at REAL NOT NULL"
+            ")"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS message_buckets ("
+            " guild_id INTEGER NOT NULL,"
+            " width INTEGER NOT NULL,"
+            " bucket INTEGER NOT NULL,"
+            " member_id INTEGER NOT NULL,"
+            " count INTEGER NOT NULL,"
+            " PRIMARY KEY (guild_id, width, bucket, member_id)"
+            ") WITHOUT ROWID"
+        )
+        # Pruning and loading pick buckets by age across all guilds, which the primary key can't serve
+        self._conn.execute("CREATE INDEX IF NOT EXISTS message_buckets_age ON message_buckets (width, bucket)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS channel_marks ("
+            " guild_id INTEGER NOT NULL,"
+            " channel_id INTEGER NOT NULL,"
+            " message_id INTEGER NOT NULL,"
+            " PRIMARY KEY (guild_id, channel_id)"
+            ") WITHOUT ROWID"
+        )
+        self._conn.commit()
+        for (guild_id,) in self._conn.execute("SELECT guild_id FROM backfilled_guilds"):
+            self._backfilled.add(guild_id)
+        for guild_id, channel_id, message_id in self._conn.execute("SELECT guild_id, channel_id, message_id FROM channel_marks"):
+            self._channel_marks.setdefault(guild_id, {})[channel_id] = message_id
+        self._catch_up_from = {guild_id: dict(marks) for guild_id, marks in self._channel_marks.items()}
+        self._load_counts(time.time())
+
+    def record(self, guild_id, member_id, timestamp):
+        """Remember that a member was active at the given epoch timestamp"""
+        key = (guild_id, member_id)
+        if timestamp > self._pending.get(key, 0):
+            self._pending[key] = timestamp
+        if len(self._pending) + len(self._pending_counts) >= self.flush_batch and self._flush_task is not None:
+            # Wake the flush loop early instead of waiting for the interval
+            self._flush_task.wake()
+
+    def record_message(self, guild_id, member_id, timestamp, channel_id, message_id):
+        """Record activity, count one message for windowed !topchatter and move the channel's mark past it"""
+        marks = self._channel_marks.get(guild_id)
+        if marks is None:
+            marks = self._channel_marks[guild_id] = {}
+        if message_id > marks.get(channel_id, 0):
+            marks[channel_id] = message_id
+            self._pending_marks[(guild_id, channel_id)] = message_id
+        self.counters.add(guild_id, member_id, timestamp)
+        for width in (HOUR, DAY):
+            key = (guild_id, width, int(timestamp // width), member_id)
+            self._pending_counts[key] = self._pending_counts.get(key, 0) + 1
+        self.record(guild_id, member_id, timestamp)
+
+    def top_chatters(self, guild_id, window, k):
+        """Top k members by messages in a window ('24h', '7d', '30d'), see MessageCounters.top"""
+        return self.counters.top(guild_id, window, k, time.time())
+
+    def message_counts_for(self, guild_id, window, member_ids):
+        """{member_id: messages} in a window for the given members who posted in it"""
+        return self.counters.counts_for(guild_id, window, member_ids, time.time())
+
+    def is_backfilled(self, guild_id):
+        """Check if a guild has already been seeded from message history"""
+        return guild_id in self._backfilled
+
+    def needs_catch_up(self, guild_id):
+        """Whether messages from before this gateway session (e.g. while the bot was offline) may be missing"""
+        return guild_id in self._backfilled and guild_id not in self._caught_up
+
+    def catch_up_marks(self, guild_id):
+        """{channel_id: message ID} a catch-up has to read each channel back to (channels without one never had a message seen)"""
+        return dict(self._catch_up_from.get(guild_id, {}))
+
+    def record_channels_read(self, guild_id, watermarks):
+        """Channels read from history without a gap up to these message IDs ({channel_id: message ID})"""
+        marks = self._channel_marks.setdefault(guild_id, {})
+        catch_up_from = self._catch_up_from.get(guild_id)
+        for channel_id, message_id in watermarks.items():
+            if message_id > marks.get(channel_id, 0):
+                marks[channel_id] = message_id
+                self._pending_marks[(guild_id, channel_id)] = message_id
+            if catch_up_from is not None and message_id > catch_up_from.get(channel_id, 0):
+                catch_up_from[channel_id] = message_id
+
+    def mark_caught_up(self, guild_id):
+        self._caught_up.add(guild_id)
+        self._catch_up_from.pop(guild_id, None)
+
+    def session_started(self):
+        """A new gateway session began, so messages sent before it may never have reached on_message"""
+        # Guilds that were caught up saw every message until now; the others still have their earlier gap to read
+        for guild_id in self._caught_up:
+            self._catch_up_from[guild_id] = dict(self._channel_marks.get(guild_id, {}))
+        self._caught_up.clear()
+
+    async def mark_backfilled(self, guild_id):
+        """Flush pending updates and remember that a guild has been seeded"""
+        self._backfilled.add(guild_id)
+        self.mark_caught_up(guild_id)
+        await self.flush()
+        await asyncio.to_thread(self._write_backfilled, guild_id, time.time())
+
+    async def forget_guild(self, guild_id):
+        """Drop everything recorded for a guild, in memory and on disk (for servers the bot has left)"""
+        self._pending = {key: ts for key, ts in self._pending.items() if key[0] != guild_id}
+        self._pending_counts = {key: count for key, count in self._pending_counts.items() if key[0] != guild_id}
+        self._pending_marks = {key: message_id for key, message_id in self._pending_marks.items() if key[0] != guild_id}
+        self._channel_marks.pop(guild_id, None)
+        self._catch_up_from.pop(guild_id, None)
+        self.counters.forget_guild(guild_id)
+        self._backfilled.discard(guild_id)
+        self._caught_up.discard(guild_id)
+        await asyncio.to_thread(self._delete_guild, guild_id)
+
+    async def last_seen_for_guild(self, guild_id):
+        """A LastSeen of every member seen in a guild"""
+        await self.flush()
+        return await asyncio.to_thread(self._read_guild, guild_id)
+
+    async def last_seen_for_members(self, guild_id, member_ids):
+        """{member_id: epoch seconds} for the given members of a guild who have been seen (one batch at a time, not the whole guild)"""
+        await self.flush()
+        return dict(await asyncio.to_thread(self._read_members, guild_id, member_ids))
+
+    async def flush(self):
+        """Write all pending updates to disk in a single transaction"""
+        if not self._pending and not self._pending_counts and not self._pending_marks:
+            return
+        batch, self._pending = self._pending, {}
+        counts, self._pending_counts = self._pending_counts, {}
+        marks, self._pending_marks = self._pending_marks, {}
+        try:
+            await asyncio.to_thread(self._write_batch, batch, counts, marks, time.time())
+        except Exception:
+            # Put the batch back so the next flush retries it
+            for key, ts in batch.items():
+                if ts > self._pending.get(key, 0):
+                    self._pending[key] = ts
+            for key, count in counts.items():
+                self._pending_counts[key] = self._pending_counts.get(key, 0) + count
+            for key, message_id in marks.items():
+                if message_id > self._pending_marks.get(key, 0):
+                    self._pending_marks[key] = message_id
+            raise
+
+    def flush_sync(self):
+        """Blocking flush, used once the event loop has already stopped"""
+        if self._pending or self._pending_counts or self._pending_marks:
+            batch, self._pending = self._pending, {}
+            counts, self._pending_counts = self._pending_counts, {}
+            marks, self._pending_marks = self._pending_marks, {}
+            self._write_batch(batch, counts, marks, time.time())
+
+    def start(self):
+        """Start the background write-behind loop (safe to call more than once)"""
+        if self._flush_task is None:
+            self._flush_task = _FlushLoop(self)
+        return self._flush_task
+
+    def close(self):
+        """Flush everything and close the database"""
+        self.flush_sync()
+        with self._lock:
+            self._conn.close()
+
+    def _write_batch(self, batch, counts, marks, now):
+        rows = [(guild_id, member_id, ts) for (guild_id, member_id), ts in batch.items()]
+        count_rows = [key + (count,) for key, count in counts.items()]
+        mark_rows = [key + (message_id,) for key, message_id in marks.items()]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO channel_marks (guild_id, channel_id, message_id) VALUES (?, ?, ?) "
+                "ON CONFLICT(guild_id, channel_id) DO UPDATE SET "
+                "message_id = MAX(message_id, excluded.message_id)",
+                mark_rows
+            )
+            self._conn.executemany(
+                "INSERT INTO member_activity (guild_id, member_id, last_seen) VALUES (?, ?, ?) "
+                "ON CONFLICT(guild_id, member_id) DO UPDATE SET "
+                "last_seen = MAX(last_seen, excluded.last_seen)",
+                rows
+            )
+            self._conn.executemany(
+                "INSERT INTO message_buckets (guild_id, width, bucket, member_id, count) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(guild_id, width, bucket, member_id) DO UPDATE SET "
+                "count = count + excluded.count",
+                count_rows
+            )
+            # Buckets that have rotated out of the in-memory rings are never read again
+            for width in (HOUR, DAY):
+                oldest = int((now - retention(width)) // width)
+                if self._pruned.get(width) != oldest:
+                    self._conn.execute("DELETE FROM message_buckets WHERE width = ? AND bucket < ?", (width, oldest))
+                    self._pruned[width] = oldest
+            self._conn.commit()
+
+    def _load_counts(self, now):
+        for width in (HOUR, DAY):
+            rows = self._conn.execute(
+                "SELECT guild_id, bucket, member_id, count FROM message_buckets WHERE width = ? AND bucket > ?",
+                (width, int((now - retention(width)) // width))
+            )
+            for guild_id, bucket, member_id, count in rows:
+                self.counters.add_bucket(guild_id, width, bucket, member_id, count)
+
+    def _write_backfilled(self, guild_id, backfilled_at):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO backfilled_guilds (guild_id, backfilled_at) VALUES (?, ?)",
+                (guild_id, backfilled_at)
+            )
+            self._conn.commit()
+
+    def _delete_guild(self, guild_id):
+        with self._lock:
+            for table in ('member_activity', 'message_buckets', 'backfilled_guilds', 'channel_marks'):
+                self._conn.execute(f"DELETE FROM {table} WHERE guild_id = ?", (guild_id,))
+            self._conn.commit()
+
+    def _read_members(self, guild_id, member_ids):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT member_id, last_seen FROM member_activity"
+                f" WHERE guild_id = ? AND member_id IN ({','.join('?' * len(member_ids))})",
+                (guild_id, *member_ids)
+            ).fetchall()
+
+    def _read_guild(self, guild_id):
+        # Rows are streamed straight into the arrays; the primary key already returns them in member order
+        last_seen = LastSeen()
+        with self._lock:
+            for member_id, ts in self._conn.execute(
+                "SELECT member_id, last_seen FROM member_activity WHERE guild_id = ? ORDER BY member_id",
+                (guild_id,)
+            ):
+                last_seen.ids.append(member_id)
+                last_seen.times.append(ts)
+        return last_seen
+
+
+class _FlushLoop:
+    """Background task that flushes an ActivityIndex on an interval or when woken early"""
+
+    def __init__(self, index):
+        self._index = index
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    def wake(self):
+        self._wake.set()
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self._index.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self._index.flush()
+            except Exception as e:
+                print(f"Error flushing activity index: {e}")
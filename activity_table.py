@@ -0,0 +1,54 @@
+import bisect
+from array import array
+
+DAY = 86400
+
+
+class ActivityTable:
+    """Last-seen times for a guild's members in two parallel array columns.
+
+    A member costs 16 bytes (snowflake + epoch seconds) instead of a dict
+    holding the Member, its name and a datetime. Names are looked up only
+    for the members that end up in a report.
+    """
+
+    __slots__ = ('ids', 'last_seen')
+
+    def __init__(self):
+        self.ids = array('Q')  # Member snowflakes
+        self.last_seen = array('d')  # Epoch seconds of their newest message (or join date)
+
+    def add(self, member, seen, now):
+        """Append one non-bot member, last seen at their newest indexed message, else when they joined"""
+        if member.bot:
+            return
+        joined = member.joined_at.timestamp() if member.joined_at else now
+        ts = seen.get(member.id, 0)
+        self.ids.append(member.id)
+        self.last_seen.append(ts if ts > joined else joined)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def tiers(self, now, thresholds):
+        """Split members into inactivity tiers with a single sort.
+
+        thresholds are days, e.g. (30, 14, 7). Returns one list of row
+        positions per threshold, highest first: members inactive at least
+        that many days but less than the threshold before it, most inactive
+        first. Sorting by last seen puts every tier in one contiguous run,
+        so the tier boundaries are just binary searches.
+        """
+        order = sorted(range(len(self.last_seen)), key=self.last_seen.__getitem__)
+        sorted_seen = array('d', (self.last_seen[row] for row in order))
+        tiers = []
+        start = 0
+        for days in sorted(thresholds, reverse=True):
+            end = bisect.bisect_right(sorted_seen, now - days * DAY)
+            tiers.append(order[start:end])
+            start = end
+        return tiers
+
+    def days_inactive(self, row, now):
+        """Whole days since a row's member was last seen"""
+        return int((now - self.last_seen[row]) // DAY)
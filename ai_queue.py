@@ -0,0 +1,123 @@
+import asyncio
+import random
+import time
+from collections import deque
+
+import metrics
+
+
+class AIQueueFull(Exception):
+    """Raised when the AI queue is at capacity and a new job is rejected"""
+
+
+class RateLimited(Exception):
+    """Raised by a job when the upstream API answered 429"""
+
+    def __init__(self, retry_after=None):
+        super().__init__(f"rate limited (retry after {retry_after}s)")
+        self.retry_after = retry_after
+
+
+class AIScheduler:
+    """Global job queue for AI requests with a fixed pool of workers.
+
+    Jobs are queued per guild and workers take them round-robin across guilds,
+    so one busy server can't starve the others. Once max_queue jobs are
+    waiting, new jobs are rejected straight away with AIQueueFull. Jobs that
+    raise RateLimited are retried with jittered exponential backoff. Queue
+    depth, running jobs and wait times are exported in metrics.py.
+    """
+
+    def __init__(self, workers, max_queue, max_retries, retry_base_delay):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self._queues = {}  # guild_id -> deque of (future, job, enqueued_at)
+        self._order = deque()  # Guild IDs with queued jobs, in round-robin order
+        self._queued = 0
+        self._running = 0
+        self._available = asyncio.Semaphore(0)  # Counts queued jobs
+        self._tasks = []
+
+    def start(self):
+        """Start the worker pool (safe to call more than once)"""
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    @property
+    def depth(self):
+        """Number of jobs waiting for a worker"""
+        return self._queued
+
+    async def run(self, guild_id, job):
+        """Queue job (an async callable) for guild_id and wait for its result"""
+        if self._queued >= self.max_queue:
+            metrics.ai_jobs.inc('rejected')
+            raise AIQueueFull(f"AI queue is full ({self._queued} waiting)")
+
+        future = asyncio.get_running_loop().create_future()
+        if guild_id not in self._queues:
+            self._queues[guild_id] = deque()
+            self._order.append(guild_id)
+        self._queues[guild_id].append((future, job, time.monotonic()))
+        self._queued += 1
+        metrics.ai_queue_depth.set(self._queued)
+        self._available.release()
+        return await future
+
+    def _next_job(self):
+        guild_id = self._order.popleft()
+        queue = self._queues[guild_id]
+        job = queue.popleft()
+        if queue:
+            self._order.append(guild_id)
+        else:
+            del self._queues[guild_id]
+        self._queued -= 1
+        metrics.ai_queue_depth.set(self._queued)
+        return job
+
+    async def _worker(self):
+        while True:
+            await self._available.acquire()
+            future, job, enqueued_at = self._next_job()
+            if future.cancelled():
+                # Caller gave up while waiting
+                continue
+
+            wait = time.monotonic() - enqueued_at
+            metrics.ai_queue_wait.observe(wait)
+            self._running += 1
+            metrics.ai_jobs_running.set(self._running)
+            try:
+                result = await self._run_with_retries(job)
+            except Exception as e:
+                metrics.ai_jobs.inc('failed')
+                if not future.done():
+                    future.set_exception(e)
+            else:
+                metrics.ai_jobs.inc('completed')
+                if not future.done():
+                    future.set_result(result)
+            finally:
+                self._running -= 1
+                metrics.ai_jobs_running.set(self._running)
+            print(f"AI job done after waiting {wait:.1f}s in queue ({self._queued} queued, {self._running} running)")
+
+    async def _run_with_retries(self, job):
+        attempt = 0
+        while True:
+            try:
+                return await job()
+            except RateLimited as e:
+                if attempt >= self.max_retries:
+                    raise
+                # Full jitter, but never sooner than the API asked for
+                delay = random.uniform(0, self.retry_base_delay * 2 ** attempt)
+                if e.retry_after:
+                    delay = max(delay, e.retry_after)
+                attempt += 1
+                metrics.ai_retries.inc()
+                print(f"AI request rate limited, retry {attempt}/{self.max_retries} in {delay:.1f}s")
+                await asyncio.sleep(delay)
@@ -0,0 +1,84 @@
+import asyncio
+import json
+import time
+
+DISCORD_MESSAGE_LIMIT = 2000  # Max characters in one Discord message
+
+
+async def iter_sse_deltas(response):
+    """Yield content chunks from an OpenAI-style server-sent event stream (OpenRouter)"""
+    async for raw_line in response.content:
+        line = raw_line.decode('utf-8').strip()
+        # Blank lines separate events; lines starting with ':' are keep-alive comments
+        if not line or line.startswith(':') or not line.startswith('data:'):
+            continue
+        payload = line[len('data:'):].strip()
+        if payload == '[DONE]':
+            return
+        event = json.loads(payload)
+        if 'error' in event:
+            raise RuntimeError(f"stream error: {event['error']}")
+        choices = event.get('choices') or [{}]
+        delta = (choices[0].get('delta') or {}).get('content')
+        if delta:
+            yield delta
+
+
+class ProgressiveMessage:
+    """A Discord message that grows as text streams in.
+
+    The message is posted as soon as there is text, then edited at most once
+    every min_interval seconds so a fast stream doesn't run into Discord's
+    edit rate limit (5 edits per 5 seconds per channel).
+    """
+
+    def __init__(self, channel, min_interval):
+        self.channel = channel
+        self.min_interval = min_interval
+        self.message = None
+        self._shown = ""  # Text currently visible in Discord
+        self._last_edit = 0.0
+
+    async def update(self, text):
+        """Show text if enough time has passed since the last edit"""
+        text = text[:DISCORD_MESSAGE_LIMIT]
+        if not text.strip() or text == self._shown:
+            return
+        if self.message is not None and time.monotonic() - self._last_edit < self.min_interval:
+            return
+        await self._show(text)
+
+    async def finish(self, text):
+        """Show the final text regardless of the edit interval"""
+        text = text[:DISCORD_MESSAGE_LIMIT]
+        if text.strip() and text != self._shown:
+            await self._show(text)
+
+    async def _show(self, text):
+        if self.message is None:
+            self.message = await self.channel.send(text)
+        else:
+            await self.message.edit(content=text)
+        self._shown = text
+        self._last_edit = time.monotonic()
+
+
+async def stream_to_message(response, channel, min_interval):
+    """Stream a chat completion into a new message, returning the text (None if nothing arrived).
+
+    If the stream times out part way, whatever arrived so far is kept and
+    marked as cut off instead of being thrown away.
+    """
+    progress = ProgressiveMessage(channel, min_interval)
+    text = ""
+    try:
+        async for delta in iter_sse_deltas(response):
+            text += delta
+            await progress.update(text)
+    except asyncio.TimeoutError:
+        if not text.strip():
+            raise
+        print(f"AI stream timed out after {len(text)} characters, keeping partial response")
+        text = text.rstrip() + " …"
+    await progress.finish(text)
+    return text if text.strip() else None
@@ -0,0 +1,307 @@
+"""Fake Discord objects for benchmarking the scan commands offline.
+
+Just enough of Guild, Member, TextChannel and Message for the command
+handlers and scanner to run unchanged. Every call that would hit the
+Discord API goes through FakeAPI, which counts it, waits a simulated
+round trip and enforces a simulated rate limit (waiting out "429s" the
+way discord.py does).
+"""
+import asyncio
+import itertools
+import random
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+import discord
+
+HISTORY_PAGE_SIZE = 100  # Messages per channel.history request, same as Discord
+MEMBER_PAGE_SIZE = 1000  # Members per guild.fetch_members request, same as Discord
+
+
+class FakeAPI:
+    """Counts simulated API requests and applies latency and a global rate limit"""
+
+    def __init__(self, latency=0.05, requests_per_second=50, retry_after=1.0):
+        self.latency = latency  # Seconds per request round trip
+        self.requests_per_second = requests_per_second  # 0 disables the rate limit
+        self.retry_after = retry_after  # Longest wait a 429 asks for
+        self.calls = Counter()  # route -> requests, including ones answered with 429
+        self.rate_limited = 0
+        self.messages_read = 0  # Messages returned by channel history
+        self._tokens = requests_per_second
+        self._updated = time.monotonic()
+
+    async def request(self, route):
+        """One API round trip on the given route"""
+        while True:
+            self.calls[route] += 1
+            wait = self._take_token()
+            if not wait:
+                break
+            # Answered with 429: wait it out and retry, like discord.py's HTTP client
+            self.rate_limited += 1
+            await asyncio.sleep(min(wait, self.retry_after))
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    def reset(self):
+        """Zero the counters between benchmark runs"""
+        self.calls.clear()
+        self.rate_limited = 0
+        self.messages_read = 0
+
+    @property
+    def total_calls(self):
+        return sum(self.calls.values())
+
+    def _take_token(self):
+        if not self.requests_per_second:
+            return 0
+        now = time.monotonic()
+        self._tokens = min(self.requests_per_second, self._tokens + (now - self._updated) * self.requests_per_second)
+        self._updated = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0
+        return (1 - self._tokens) / self.requests_per_second
+
+
+class Permissions:
+    """Every flag the handlers check, all granted"""
+    read_message_history = True
+    kick_members = True
+    administrator = False
+
+
+PERMISSIONS = Permissions()
+
+
+class FakeMember:
+    __slots__ = ('id', 'name', 'display_name', 'bot', 'joined_at', 'top_role', 'guild_permissions', 'mention',
+                 'guild', '_api')
+
+    def __init__(self, api, member_id, name, joined_at, bot=False, top_role=1, guild=None):
+        self.id = member_id
+        self.name = name
+        self.display_name = name
+        self.bot = bot
+        self.joined_at = joined_at
+        self.top_role = top_role  # Plain int so role comparisons work
+        self.guild_permissions = PERMISSIONS
+        self.mention = f"<@{member_id}>"
+        self.guild = guild
+        self._api = api
+
+    async def kick(self, reason=None):
+        await self._api.request('kick')
+        self.guild.members.remove(self)
+
+
+class FakeMessage:
+    __slots__ = ('id', 'author', 'created_at', 'content', 'channel', 'guild', 'embed', 'view', '_api')
+
+    def __init__(self, api, message_id, author, created_at, content="", channel=None, guild=None):
+        self.id = message_id
+        self.author = author
+        self.created_at = created_at
+        self.content = content
+        self.channel = channel
+        self.guild = guild
+        self.embed = None
+        self.view = None
+        self._api = api
+
+    async def edit(self, content=None, embed=None, view=None):
+        await self._api.request('edit_message')
+
+    async def delete(self):
+        await self._api.request('delete_message')
+
+    async def add_reaction(self, emoji):
+        await self._api.request('add_reaction')
+
+
+class FakeTextChannel:
+    """A channel whose history is generated page by page as it is read.
+
+    Messages are generated from a per-channel seed, newest first, spread
+    evenly back over history_days, with authors drawn from the guild's
+    weighted author list. Nothing is kept in memory between reads. Message
+    IDs grow with time like snowflakes, and new_messages() adds messages
+    newer than everything so far, for incremental scans to find.
+    """
+
+    def __init__(self, api, guild, channel_id, name, message_count, history_days, seed):
+        self._api = api
+        self.guild = guild
+        self.id = channel_id
+        self.name = name
+        self.message_count = message_count
+        self.history_days = history_days
+        self.seed = seed
+        self.added = 0  # Messages added after the generated history
+        self.sent = []  # Messages the bot posted here
+
+    def permissions_for(self, member):
+        return PERMISSIONS
+
+    def new_messages(self, count):
+        """Post `count` messages newer than the rest of the history"""
+        self.added += count
+
+    async def history(self, limit=100, after=None, oldest_first=None):
+        rng = random.Random(self.seed)
+        total = self.message_count + self.added
+        # Positions count back from the newest message (0); a message's ID grows with its age order
+        newest_position = 0
+        oldest_position = total
+        if after is not None:
+            oldest_position = max(0, min(total, total - (after.id - self.id * 1_000_000)))
+        count = oldest_position - newest_position
+        if limit is not None:
+            count = min(limit, count)
+        # Newest first, or oldest first (like discord.py) when reading after a message
+        if oldest_first is None:
+            oldest_first = after is not None
+        now = datetime.now(timezone.utc)
+        step = timedelta(days=self.history_days) / max(self.message_count, 1)
+        for page_start in range(0, count, HISTORY_PAGE_SIZE):
+            await self._api.request('channel_history')
+            page_size = min(HISTORY_PAGE_SIZE, count - page_start)
+            self._api.messages_read += page_size
+            authors = rng.choices(self.guild.authors, cum_weights=self.guild.author_weights, k=page_size)
+            for offset, author in enumerate(authors):
+                position = oldest_position - 1 - page_start - offset if oldest_first else page_start + offset
+                created_at = now - step * max(0, position - self.added)
+                yield FakeMessage(self._api, self.id * 1_000_000 + total - position, author, created_at)
+        if count == 0:
+            await self._api.request('channel_history')  # Still one request to find nothing new
+
+    async def send(self, content=None, embed=None, delete_after=None, view=None, file=None):
+        await self._api.request('send_message')
+        message = FakeMessage(self._api, len(self.sent) + 1, self.guild.me, datetime.now(timezone.utc),
+                              content or "", self, self.guild)
+        message.embed = embed  # Kept so a benchmark can page through a report's view
+        message.view = view
+        self.sent.append(message)
+        return message
+
+    def typing(self):
+        return _NoTyping()
+
+
+class _NoTyping:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakeGuild:
+    """A guild with generated members and channels.
+
+    Human members joined 30-59 days ago, so members with no messages in
+    the generated history fall into the 30+ day tier of !inactive without
+    becoming !nuke targets; only the stale_members (joined long ago, never
+    posted) are kicked. Message authors follow a Zipf distribution (a few
+    very active members, a long quiet tail), and bot_share of all messages
+    come from a bot.
+
+    With member_cache=False the guild behaves like one under a small member
+    cache (MEMBER_CACHE 'none'): it isn't chunked, get_member only knows the
+    bot, and members have to be fetched or queried through the API.
+    """
+
+    _ids = itertools.count(1)
+
+    def __init__(self, api, members, channels, messages_per_channel, history_days=59, bot_share=0.05,
+                 stale_members=0, seed=0, member_cache=True):
+        rng = random.Random(seed)
+        self._api = api
+        self.chunked = member_cache
+        now = datetime.now(timezone.utc)
+        self.id = next(self._ids)
+        self.name = f"bench-guild-{self.id}"
+        self.me = FakeMember(api, 1, "bench-bot", now, bot=True, top_role=1_000)
+
+        self.members = [self.me]
+        for number in range(members):
+            joined_at = now - timedelta(days=30 + rng.random() * 29)
+            self.members.append(FakeMember(api, 10_000 + number, f"member{number}", joined_at, guild=self))
+        humans = self.members[1:]
+
+        # Members who joined long ago and never appear in history (!nuke targets)
+        self.authors = humans[stale_members:] or humans
+        weights = [1 / rank for rank in range(1, len(self.authors) + 1)]
+        human_total = sum(weights)
+        self.authors.append(self.me)
+        weights.append(human_total * bot_share / (1 - bot_share) if bot_share < 1 else 1)
+        self.author_weights = list(itertools.accumulate(weights))
+        for member in humans[:stale_members]:
+            member.joined_at = now - timedelta(days=90 + rng.random() * 300)
+
+        self.text_channels = [
+            FakeTextChannel(api, self, self.id * 10_000 + number, f"channel-{number}", messages_per_channel,
+                            history_days, seed=f"{seed}-{number}")
+            for number in range(channels)
+        ]
+        self._members_by_id = None
+        # Where the benchmark posts commands; not part of the scanned channels
+        self.command_channel = FakeTextChannel(api, self, self.id * 10_000 + 9_999, "bench-commands", 0,
+                                               history_days, seed=0)
+
+
+    def get_member(self, member_id):
+        if not self.chunked:
+            return self.me if member_id == self.me.id else None
+        return self._lookup(member_id)
+
+    async def fetch_members(self, limit=None):
+        members = list(self.members)
+        for start in range(0, len(members), MEMBER_PAGE_SIZE):
+            await self._api.request('fetch_members')
+            for member in members[start:start + MEMBER_PAGE_SIZE]:
+                yield member
+
+    async def fetch_member(self, member_id):
+        await self._api.request('fetch_member')
+        member = self._lookup(member_id)
+        if member is None:
+            raise discord.NotFound(_NotFoundResponse(), "Unknown Member")
+        return member
+
+    async def query_members(self, user_ids, limit=5, cache=True):
+        await self._api.request('query_members')
+        return [member for member in map(self._lookup, user_ids[:limit]) if member is not None]
+
+    def _lookup(self, member_id):
+        if self._members_by_id is None or len(self._members_by_id) != len(self.members):
+            self._members_by_id = {member.id: member for member in self.members}
+        return self._members_by_id.get(member_id)
+
+
+class _NotFoundResponse:
+    status = 404
+    reason = "Not Found"
+
+
+class FakeReaction:
+    def __init__(self, emoji, message):
+        self.emoji = emoji
+        self.message = message
+
+
+class FakeClient:
+    """Stands in for discord.Client; confirms !nuke immediately"""
+
+    def __init__(self, confirming_user):
+        self.confirming_user = confirming_user
+        self.channel = None  # Channel whose newest message is being reacted to
+
+    async def wait_for(self, event, timeout=None, check=None):
+        reaction = FakeReaction("✅", self.channel.sent[-1])
+        if check is not None and not check(reaction, self.confirming_user):
+            raise TimeoutError
+        return reaction, self.confirming_user
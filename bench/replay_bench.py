@@ -0,0 +1,381 @@
+"""Load test for on_message: replay recorded message events against stubbed channels.
+
+Plays back a recording made with RECORD_EVENTS_PATH (see event_log.py), or
+synthetic traffic when no recording is given, through the bot's real
+on_message handler: the DM block, activity tracking, spam checks and
+command dispatch all run unchanged. Servers are generated guilds from
+fake_discord.py, so commands that scan (!topchatter, !inactive) do real
+work, and every reply goes through FakeAPI's simulated latency.
+
+Each event is dispatched as its own task, like discord.py does, at its
+recorded time divided by --speed (0 replays as fast as possible). Latency
+is measured from dispatch until on_message returns, so it includes time
+spent waiting behind other handlers. The report gives throughput, p50/p95/
+p99 latency per kind of event and how much memory grew over the replay.
+
+Recordings keep only the command word, so commands replay without their
+arguments, and ordinary messages replay as filler text of the recorded
+length.
+
+    python -m bench.replay_bench events.bin.gz --speed 10
+    python -m bench.replay_bench --synthesize 100000 --save synthetic.bin.gz
+    python -m bench.replay_bench events.bin.gz --tracemalloc --json replay.json
+"""
+import argparse
+import asyncio
+import contextlib
+import gc
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+# Keep the replay away from the bot's real activity index, checkpoints and snapshots
+# (must be set before config is imported)
+_db_dir = tempfile.TemporaryDirectory()
+os.environ['ACTIVITY_DB_PATH'] = os.path.join(_db_dir.name, 'activity.db')
+os.environ['NUKE_CHECKPOINT_DIR'] = os.path.join(_db_dir.name, 'nuke_checkpoints')
+os.environ['STATE_SNAPSHOT_PATH'] = os.path.join(_db_dir.name, 'safety_state.bin')
+os.environ.pop('RECORD_EVENTS_PATH', None)
+
+import discord  # noqa: E402
+
+import bot  # noqa: E402
+from event_log import Event, FLAG_BOT, FLAG_DM, FLAG_OWN, read_events, write_events  # noqa: E402
+from memstats import process_rss, format_bytes  # noqa: E402
+from services import activity_index  # noqa: E402
+from bench.fake_discord import FakeAPI, FakeGuild, FakeMember, FakeMessage  # noqa: E402
+
+SYNTHETIC_COMMANDS = ['!ping', '!help', '!meme', '!topchatter', '!roastme', '!inactive']
+_AUTHOR_IDS = 100_000_000  # Replayed authors get IDs from here up, clear of the generated guild members
+
+
+class SentCounter:
+    """Stands in for a channel's list of sent messages so a long replay doesn't keep them all"""
+
+    def __init__(self):
+        self.count = 0
+
+    def append(self, message):
+        self.count += 1
+
+    def __len__(self):
+        return self.count
+
+
+class ReplayDMChannel(discord.DMChannel):
+    """A DM channel as far as the DM check is concerned; replies go through FakeAPI"""
+
+    def __init__(self, api, channel_id):
+        self.id = channel_id
+        self._api = api
+        self.sent = SentCounter()
+
+    async def send(self, content=None, **kwargs):
+        await self._api.request('send_message')
+        self.sent.append(content)
+
+
+class ReplayWorld:
+    """Generated guilds, channels and authors standing in for the anonymous IDs in a recording"""
+
+    def __init__(self, api, members, channels, messages, seed):
+        self.api = api
+        self.members = members
+        self.channels = channels
+        self.messages = messages
+        self.seed = seed
+        self.me = FakeMember(api, 1, "bench-bot", datetime.now(timezone.utc), bot=True)
+        self._guilds = {}
+        self._channels = {}
+        self._authors = {}
+        self._message_ids = 0
+
+    def message(self, event):
+        """A message for one recorded event"""
+        if event.flags & FLAG_OWN:
+            author = self.me
+        else:
+            author = self._authors.get(event.author)
+            if author is None:
+                author = self._authors[event.author] = FakeMember(
+                    self.api, _AUTHOR_IDS + event.author, f"user{event.author}", datetime.now(timezone.utc),
+                    bot=bool(event.flags & FLAG_BOT),
+                )
+
+        if event.flags & FLAG_DM:
+            guild = None
+            channel = self._channels.get((0, event.channel))
+            if channel is None:
+                channel = self._channels[(0, event.channel)] = ReplayDMChannel(self.api, event.channel)
+        else:
+            guild = self._guild(event.guild)
+            channel = self._channels.get((event.guild, event.channel))
+            if channel is None:
+                channel = guild.text_channels[event.channel % len(guild.text_channels)]
+                self._channels[(event.guild, event.channel)] = channel
+
+        if event.command:
+            content = event.command
+        else:
+            content = "x" * event.length
+        self._message_ids += 1
+        return FakeMessage(self.api, self._message_ids, author, datetime.now(timezone.utc), content, channel, guild)
+
+    def sends(self):
+        return self.api.calls['send_message']
+
+    def _guild(self, number):
+        guild = self._guilds.get(number)
+        if guild is None:
+            guild = self._guilds[number] = FakeGuild(
+                self.api, self.members, self.channels, self.messages, seed=f"{self.seed}-{number}"
+            )
+            guild.me = self.me
+            for channel in guild.text_channels + [guild.command_channel]:
+                channel.sent = SentCounter()
+        return guild
+
+
+def synthesize(count, guilds, users, rate, command_share, spammers, seed):
+    """Synthetic traffic: Zipf-distributed authors, a share of commands, bots, DMs and a few spam bursts"""
+    rng = random.Random(seed)
+    weights = [1 / rank for rank in range(1, users + 1)]
+    events = []
+    burst = 0  # Messages left in the current spam burst
+    spammer = None
+    for _ in range(count):
+        if burst:
+            burst -= 1
+            author, delay = spammer, rng.uniform(0.05, 0.3)
+        else:
+            author = rng.choices(range(1, users + 1), weights)[0]
+            delay = rng.expovariate(rate)
+            if spammers and rng.random() < spammers / count:
+                spammer, burst = author, rng.randint(15, 40)
+        roll = rng.random()
+        if roll < 0.005:
+            flags, guild = FLAG_DM, 0
+        elif roll < 0.05:
+            flags, guild = FLAG_BOT, rng.randint(1, guilds)
+        else:
+            flags, guild = 0, 1 + author % guilds
+        command = rng.choice(SYNTHETIC_COMMANDS) if rng.random() < command_share and not flags & FLAG_BOT else ""
+        channel = rng.randint(1, 5) + guild * 100
+        events.append(Event(delay, guild, channel, author, flags, len(command) or rng.randint(1, 200), command))
+    return events
+
+
+def event_kind(event):
+    if event.flags & FLAG_OWN:
+        return "own"
+    if event.flags & FLAG_DM:
+        return "dm"
+    if event.flags & FLAG_BOT:
+        return "bot"
+    return event.command or "chat"
+
+
+class _Log:
+    """Swallows handler output, keeping the first few errors to show after the replay"""
+
+    def __init__(self, verbose, stdout):
+        self.verbose = verbose
+        self.stdout = stdout
+        self.errors = []
+        self.error_count = 0
+
+    def write(self, text):
+        if self.verbose:
+            self.stdout.write(text)
+        elif 'rror' in text:
+            self.error_count += 1
+            if len(self.errors) < 5:
+                self.errors.append(text.strip())
+        return len(text)
+
+    def flush(self):
+        pass
+
+
+def percentile(ordered, share):
+    if not ordered:
+        return 0
+    return ordered[min(len(ordered) - 1, int(len(ordered) * share))]
+
+
+async def replay(events, world, speed, log):
+    """Dispatch every event as a task at its (scaled) time.
+
+    Returns (wall seconds, [(kind, latency)], most handlers in flight, handler failures).
+    """
+    latencies = []
+    in_flight = set()
+    most_in_flight = 0
+    failures = 0
+
+    async def handle(kind, message, dispatched):
+        nonlocal failures
+        try:
+            await bot.on_message(message)
+        except Exception as e:
+            failures += 1
+            print(f"Replay error in {kind}: {e}")
+        latencies.append((kind, time.perf_counter() - dispatched))
+
+    loop = asyncio.get_running_loop()
+    start = time.perf_counter()
+    due = 0.0
+    with contextlib.redirect_stdout(log):
+        for count, event in enumerate(events, 1):
+            if speed:
+                due += event.delay / speed
+                wait = start + due - time.perf_counter()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+            elif count % 100 == 0:
+                await asyncio.sleep(0)  # Let handlers run, as the gateway's own reads would
+            task = loop.create_task(handle(event_kind(event), world.message(event), time.perf_counter()))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+            most_in_flight = max(most_in_flight, len(in_flight))
+        if in_flight:
+            await asyncio.gather(*in_flight)
+    return time.perf_counter() - start, latencies, most_in_flight, failures
+
+
+def summarize(latencies, wall):
+    """{kind: {events, p50_ms, p95_ms, p99_ms, max_ms}} plus an 'all' row"""
+    by_kind = {'all': []}
+    for kind, latency in latencies:
+        by_kind.setdefault(kind, []).append(latency)
+        by_kind['all'].append(latency)
+    rows = {}
+    for kind, values in sorted(by_kind.items(), key=lambda item: -len(item[1])):
+        values.sort()
+        rows[kind] = {
+            'events': len(values),
+            'events_per_second': round(len(values) / wall) if wall > 0 else 0,
+            'p50_ms': round(percentile(values, 0.50) * 1000, 2),
+            'p95_ms': round(percentile(values, 0.95) * 1000, 2),
+            'p99_ms': round(percentile(values, 0.99) * 1000, 2),
+            'max_ms': round(values[-1] * 1000, 2) if values else 0,
+        }
+    return rows
+
+
+async def main(args):
+    if args.events:
+        events = list(read_events(args.events))
+        source = args.events
+    else:
+        events = synthesize(args.synthesize, args.guilds, args.users, args.rate, args.command_share,
+                            args.spammers, args.seed)
+        source = f"{len(events)} synthetic events"
+        if args.save:
+            write_events(args.save, events)
+            print(f"Synthetic events written to {args.save}")
+    if args.limit:
+        events = events[:args.limit]
+
+    api = FakeAPI(args.latency, args.requests_per_second)
+    world = ReplayWorld(api, args.members, args.channels, args.messages, args.seed)
+    bot.client._connection.user = world.me  # So the bot's own messages are recognised and ignored
+    activity_index.start()
+
+    recorded = sum(event.delay for event in events)
+    print(f"Replaying {source}: {len(events)} events over {recorded:.0f}s recorded, "
+          f"{'as fast as possible' if not args.speed else f'at {args.speed:g}x'}, "
+          f"{args.latency * 1000:.0f}ms per reply")
+
+    gc.collect()
+    if args.tracemalloc:
+        tracemalloc.start()
+    rss_before = process_rss()[0]
+    traced_before = tracemalloc.get_traced_memory()[0] if args.tracemalloc else 0
+
+    log = _Log(args.verbose, sys.stdout)
+    try:
+        wall, latencies, most_in_flight, failures = await replay(events, world, args.speed, log)
+        gc.collect()
+        rss_after, rss_peak = process_rss()
+        traced_after, traced_peak = tracemalloc.get_traced_memory() if args.tracemalloc else (0, 0)
+    finally:
+        if args.tracemalloc:
+            tracemalloc.stop()
+        activity_index.close()
+
+    rows = summarize(latencies, wall)
+    print(f"{'kind':<14} {'events':>8} {'ev/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for kind, row in rows.items():
+        print(f"{kind:<14} {row['events']:>8} {row['events_per_second']:>8} {row['p50_ms']:>9.2f} "
+              f"{row['p95_ms']:>9.2f} {row['p99_ms']:>9.2f} {row['max_ms']:>9.2f}")
+    rss_growth = rss_after - rss_before if rss_before is not None and rss_after is not None else None
+    memory = {
+        'rss_before': rss_before,
+        'rss_after': rss_after,
+        'rss_growth': rss_growth,
+        'rss_peak': rss_peak,
+        'traced_growth': traced_after - traced_before if args.tracemalloc else None,
+        'traced_peak': traced_peak - traced_before if args.tracemalloc else None,
+    }
+    print(f"Wall {wall:.2f}s, {len(events) / wall:.0f} events/s, {world.sends()} replies sent, "
+          f"at most {most_in_flight} handlers in flight, {failures} handler failures")
+    print(f"Memory: resident {format_bytes(rss_before)} -> {format_bytes(rss_after)} "
+          f"(growth {format_bytes(rss_growth)}, peak {format_bytes(rss_peak)})")
+    if args.tracemalloc:
+        print(f"Python heap: grew {format_bytes(memory['traced_growth'])}, "
+              f"peak {format_bytes(memory['traced_peak'])} above the start")
+    if log.error_count:
+        print(f"{log.error_count} error lines from the handlers, first ones:")
+        for line in log.errors:
+            print(f"  {line}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({
+                'settings': vars(args),
+                'wall_seconds': round(wall, 3),
+                'events': len(events),
+                'replies': world.sends(),
+                'most_in_flight': most_in_flight,
+                'failures': failures,
+                'latency': rows,
+                'memory': memory,
+            }, f, indent=2)
+        print(f"Results written to {args.json}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('events', nargs='?', help="recording made with RECORD_EVENTS_PATH (synthetic traffic if omitted)")
+    parser.add_argument('--speed', type=float, default=0,
+                        help="replay speed: 1 is real time, 10 is ten times faster, 0 as fast as possible")
+    parser.add_argument('--limit', type=int, default=0, help="replay only the first N events")
+    parser.add_argument('--latency', type=float, default=0.05, help="simulated seconds per reply sent")
+    parser.add_argument('--requests-per-second', type=float, default=0,
+                        help="simulated global rate limit on replies, 0 for none")
+    parser.add_argument('--members', type=int, default=200, help="members in each generated guild")
+    parser.add_argument('--channels', type=int, default=5, help="text channels in each generated guild")
+    parser.add_argument('--messages', type=int, default=100, help="messages of history per channel")
+    parser.add_argument('--synthesize', type=int, default=20_000, metavar='N', help="synthetic events to generate")
+    parser.add_argument('--guilds', type=int, default=5, help="servers in the synthetic traffic")
+    parser.add_argument('--users', type=int, default=2_000, help="authors in the synthetic traffic")
+    parser.add_argument('--rate', type=float, default=50, help="average synthetic events per second (recorded time)")
+    parser.add_argument('--command-share', type=float, default=0.05, help="share of synthetic messages that are commands")
+    parser.add_argument('--spammers', type=int, default=5, help="spam bursts in the synthetic traffic")
+    parser.add_argument('--save', metavar='PATH', help="write the synthetic events as a recording")
+    parser.add_argument('--seed', type=int, default=0, help="seed for the synthetic traffic and generated guilds")
+    parser.add_argument('--tracemalloc', action='store_true',
+                        help="also trace Python allocations (slower, but shows heap growth precisely)")
+    parser.add_argument('--json', metavar='PATH', help="also write the results as JSON")
+    parser.add_argument('--verbose', action='store_true', help="show the handlers' own log output")
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    asyncio.run(main(parse_args()))
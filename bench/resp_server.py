@@ -0,0 +1,212 @@
+"""A tiny in-memory Redis stand-in for trying STATE_STORE=redis locally.
+
+Serves just the commands state_store.RedisStore uses (strings with TTLs,
+hashes, WATCH/MULTI/EXEC) over the Redis protocol. Nothing is persisted and
+there is no auth; use a real Redis in production.
+
+    python -m bench.resp_server --port 6379
+"""
+import argparse
+import asyncio
+import time
+
+from state_store import RespError, _encode, _read_reply
+
+
+class Store:
+    """Keys with lazy expiry and a version per key for WATCH"""
+
+    def __init__(self):
+        self.data = {}  # key -> str or dict
+        self.expires = {}  # key -> monotonic deadline
+        self.versions = {}  # key -> bumped on every write
+
+    def get(self, key):
+        deadline = self.expires.get(key)
+        if deadline is not None and deadline <= time.monotonic():
+            self.delete(key)
+        return self.data.get(key)
+
+    def touch(self, key):
+        self.versions[key] = self.versions.get(key, 0) + 1
+
+    def delete(self, key):
+        existed = self.data.pop(key, None) is not None
+        self.expires.pop(key, None)
+        self.touch(key)
+        return existed
+
+
+class Session:
+    """One client connection: its WATCHed keys and queued MULTI commands"""
+
+    def __init__(self, store):
+        self.store = store
+        self.watched = {}  # key -> version when watched
+        self.queue = None  # Commands queued since MULTI, else None
+
+    def handle(self, args):
+        name = args[0].upper()
+        if self.queue is not None and name not in ('EXEC', 'DISCARD', 'MULTI', 'WATCH'):
+            self.queue.append(args)
+            return 'QUEUED'
+        handler = getattr(self, 'cmd_' + name.lower(), None)
+        if handler is None:
+            return RespError(f"ERR unknown command '{args[0]}'")
+        try:
+            return handler(*args[1:])
+        except (TypeError, ValueError) as e:
+            return RespError(f"ERR {e}")
+
+    def cmd_ping(self, *args):
+        return args[0] if args else 'PONG'
+
+    def cmd_auth(self, *args):
+        return 'OK'
+
+    def cmd_select(self, db):
+        return 'OK'
+
+    def cmd_get(self, key):
+        value = self.store.get(key)
+        if isinstance(value, dict):
+            return RespError('WRONGTYPE Operation against a key holding the wrong kind of value')
+        return value
+
+    def cmd_set(self, key, value, *options):
+        self.store.delete(key)
+        self.store.data[key] = value
+        for option, amount in zip(options[::2], options[1::2]):
+            option = option.upper()
+            if option == 'PX':
+                self.store.expires[key] = time.monotonic() + int(amount) / 1000
+            elif option == 'EX':
+                self.store.expires[key] = time.monotonic() + int(amount)
+        return 'OK'
+
+    def cmd_del(self, *keys):
+        return sum(self.store.delete(key) for key in keys)
+
+    def cmd_hmget(self, key, *fields):
+        value = self.store.get(key) or {}
+        return [value.get(field) for field in fields]
+
+    def cmd_hset(self, key, *pairs):
+        value = self.store.get(key)
+        if value is None:
+            value = self.store.data[key] = {}
+        added = 0
+        for field, item in zip(pairs[::2], pairs[1::2]):
+            added += field not in value
+            value[field] = item
+        self.store.touch(key)
+        return added
+
+    def cmd_pexpire(self, key, milliseconds):
+        if self.store.get(key) is None:
+            return 0
+        self.store.expires[key] = time.monotonic() + int(milliseconds) / 1000
+        self.store.touch(key)
+        return 1
+
+    def cmd_pttl(self, key):
+        if self.store.get(key) is None:
+            return -2
+        deadline = self.store.expires.get(key)
+        if deadline is None:
+            return -1
+        return max(0, int((deadline - time.monotonic()) * 1000))
+
+    def cmd_watch(self, *keys):
+        if self.queue is not None:
+            return RespError('ERR WATCH inside MULTI is not allowed')
+        for key in keys:
+            self.store.get(key)  # Apply a pending expiry first, as Redis does
+            self.watched.setdefault(key, self.store.versions.get(key, 0))
+        return 'OK'
+
+    def cmd_unwatch(self):
+        self.watched = {}
+        return 'OK'
+
+    def cmd_multi(self):
+        if self.queue is not None:
+            return RespError('ERR MULTI calls can not be nested')
+        self.queue = []
+        return 'OK'
+
+    def cmd_discard(self):
+        self.queue = None
+        self.watched = {}
+        return 'OK'
+
+    def cmd_exec(self):
+        if self.queue is None:
+            return RespError('ERR EXEC without MULTI')
+        queue, self.queue = self.queue, None
+        changed = any(self.store.versions.get(key, 0) != version for key, version in self.watched.items())
+        self.watched = {}
+        if changed:
+            return None  # Aborted: a watched key was written since WATCH
+        return [self.handle(args) for args in queue]
+
+    def cmd_flushall(self):
+        for key in list(self.store.data):
+            self.store.delete(key)
+        return 'OK'
+
+
+async def start_server(host, port):
+    """Start serving on host:port (port 0 picks a free one) and return the asyncio Server"""
+    store = Store()
+
+    async def client_connected(reader, writer):
+        session = Session(store)
+        try:
+            while True:
+                args = await _read_reply(reader)
+                if not isinstance(args, list) or not args:
+                    break
+                if args[0].upper() == 'QUIT':
+                    writer.write(_encode_reply('OK'))
+                    break
+                writer.write(_encode_reply(session.handle(args)))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(client_connected, host, port)
+
+
+async def serve(host, port):
+    server = await start_server(host, port)
+    print(f"RESP stand-in listening on {host}:{port}")
+    async with server:
+        await server.serve_forever()
+
+
+def _encode_reply(reply):
+    if reply is None:
+        return b'$-1\r\n'
+    if isinstance(reply, RespError):
+        return b'-%s\r\n' % str(reply).encode()
+    if isinstance(reply, int):
+        return b':%d\r\n' % reply
+    if isinstance(reply, list):
+        return b'*%d\r\n' % len(reply) + b''.join(_encode_reply(item) for item in reply)
+    if reply in ('OK', 'PONG', 'QUEUED'):
+        return b'+%s\r\n' % reply.encode()
+    return _encode((reply,))[len(b'*1\r\n'):]  # Bulk string
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=6379)
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
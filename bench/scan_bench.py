@@ -0,0 +1,168 @@
+"""Offline benchmark for the scan commands (!inactive, !topchatter, !nuke).
+
+Runs the real command handlers against a generated guild (see
+fake_discord.py) and reports wall time, messages read per second, peak
+Python memory and Discord API calls for each command. Handlers are called
+directly, so the dispatcher's rate limits and cooldowns don't apply.
+
+Each command first runs cold, on a guild nobody has scanned, and then warm
+on the same guild (scan cache and activity index already filled). With
+--expire-cache the in-memory scan cache is dropped and --new-messages are
+posted to every channel before each warm run, which measures an
+incremental rescan from the stored watermarks instead of a cache hit.
+
+    python -m bench.scan_bench --scenario large
+    python -m bench.scan_bench --members 5000 --channels 20 --latency 0.1 --json baseline.json
+    python -m bench.scan_bench --scenario medium --no-member-cache --stale-members 100
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+# Keep the benchmark away from the bot's real activity index and nuke checkpoints
+# (must be set before config is imported)
+_db_dir = tempfile.TemporaryDirectory()
+os.environ['ACTIVITY_DB_PATH'] = os.path.join(_db_dir.name, 'activity.db')
+os.environ['NUKE_CHECKPOINT_DIR'] = os.path.join(_db_dir.name, 'nuke_checkpoints')
+
+import commands  # noqa: E402
+from config import NUKE_OWNER_ID, MESSAGE_SCAN_LIMIT, SCAN_CONCURRENCY, SCAN_PAGES_PER_SECOND  # noqa: E402
+from services import activity_index, guild_settings, scan_cache  # noqa: E402
+from bench.fake_discord import FakeAPI, FakeClient, FakeGuild, FakeMember, FakeMessage  # noqa: E402
+
+SCENARIOS = {
+    'small': {'members': 500, 'channels': 10, 'messages': 300},
+    'medium': {'members': 5_000, 'channels': 50, 'messages': 1_000},
+    'large': {'members': 50_000, 'channels': 200, 'messages': 1_000},
+}
+SCAN_COMMANDS = ('inactive', 'topchatter', 'nuke')
+
+
+async def run_command(name, guild, api, verbose):
+    """Run one command handler against the guild and measure it"""
+    owner = FakeMember(api, NUKE_OWNER_ID, "bench-owner", datetime.now(timezone.utc))
+    message = FakeMessage(api, 0, owner, datetime.now(timezone.utc), f"!{name}", guild.command_channel, guild)
+    client = FakeClient(owner)
+    client.channel = guild.command_channel
+    ctx = commands.CommandContext(client, message, commands.COMMANDS[name], [], guild_settings.get(guild.id))
+
+    api.reset()
+    tracemalloc.reset_peak()
+    memory_before = tracemalloc.get_traced_memory()[0]
+    output = io.StringIO()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(output):
+        await commands.COMMANDS[name].handler(ctx)
+    wall = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] - memory_before
+
+    log = output.getvalue()
+    if verbose:
+        print(log, end="")
+    else:
+        # Handlers report failures by printing them; don't hide those
+        for line in log.splitlines():
+            if 'rror' in line:
+                print(f"  [{name}] {line}")
+
+    return {
+        'command': name,
+        'wall_seconds': round(wall, 3),
+        'messages_read': api.messages_read,
+        'messages_per_second': round(api.messages_read / wall) if wall > 0 else 0,
+        'peak_memory_mb': round(peak / 1_048_576, 1),
+        'api_calls': api.total_calls,
+        'rate_limited': api.rate_limited,
+        'calls_by_route': dict(api.calls),
+    }
+
+
+def print_row(run, result):
+    routes = " ".join(f"{route}={count}" for route, count in sorted(result['calls_by_route'].items()))
+    print(f"{result['command']:<11} {run:<5} {result['wall_seconds']:>8.2f} {result['messages_read']:>9} "
+          f"{result['messages_per_second']:>9} {result['peak_memory_mb']:>8.1f} {result['api_calls']:>6} "
+          f"{result['rate_limited']:>5}  {routes}")
+
+
+async def main(args):
+    scan_cache.limit = args.scan_limit
+    scan_cache.concurrency = args.concurrency
+    scan_cache.pages_per_second = args.pages_per_second
+    api = FakeAPI(args.latency, args.requests_per_second)
+
+    print(f"{args.members} members, {args.channels} channels x {args.messages} messages "
+          f"(reading up to {args.scan_limit} per channel), {args.latency * 1000:.0f}ms per request, "
+          f"{args.requests_per_second} requests/s, pacing {args.pages_per_second} pages/s, "
+          f"{args.concurrency} scan workers")
+    print(f"{'command':<11} {'run':<5} {'wall s':>8} {'messages':>9} {'msgs/s':>9} {'peak MB':>8} {'calls':>6} {'429s':>5}  calls by route")
+
+    tracemalloc.start()
+    results = []
+    try:
+        for name in args.commands:
+            # A fresh guild per command, so every command starts cold
+            guild = FakeGuild(api, args.members, args.channels, args.messages, stale_members=args.stale_members,
+                              seed=args.seed, member_cache=not args.no_member_cache)
+            for run in ['cold'] + ['warm'] * args.warm_runs:
+                if run == 'warm' and args.expire_cache:
+                    scan_cache.invalidate(guild.id)
+                    for channel in guild.text_channels:
+                        channel.new_messages(args.new_messages)
+                result = await run_command(name, guild, api, args.verbose)
+                result['run'] = run
+                results.append(result)
+                print_row(run, result)
+            scan_cache.invalidate(guild.id)
+    finally:
+        tracemalloc.stop()
+        activity_index.close()
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'settings': vars(args), 'results': results}, f, indent=2)
+        print(f"Results written to {args.json}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--scenario', choices=SCENARIOS, default='small',
+                        help="preset guild size (the flags below override it)")
+    parser.add_argument('--members', type=int, help="human members in the guild")
+    parser.add_argument('--channels', type=int, help="text channels in the guild")
+    parser.add_argument('--messages', type=int, help="messages of history per channel")
+    parser.add_argument('--stale-members', type=int, default=0,
+                        help="members who joined long ago and never posted (!nuke kicks these)")
+    parser.add_argument('--latency', type=float, default=0.05, help="simulated seconds per API request")
+    parser.add_argument('--requests-per-second', type=float, default=50,
+                        help="simulated global rate limit, 0 for none (Discord's is 50)")
+    parser.add_argument('--scan-limit', type=int, default=MESSAGE_SCAN_LIMIT, help="messages read per channel")
+    parser.add_argument('--concurrency', type=int, default=SCAN_CONCURRENCY, help="channels scanned at once")
+    parser.add_argument('--pages-per-second', type=float, default=SCAN_PAGES_PER_SECOND,
+                        help="history page pacing shared by the scan workers")
+    parser.add_argument('--commands', nargs='+', choices=SCAN_COMMANDS, default=list(SCAN_COMMANDS))
+    parser.add_argument('--warm-runs', type=int, default=1, help="runs after the cold one, on the same guild")
+    parser.add_argument('--expire-cache', action='store_true',
+                        help="drop the in-memory scan cache before warm runs (measures incremental rescans)")
+    parser.add_argument('--new-messages', type=int, default=0,
+                        help="messages posted to each channel before each warm run (with --expire-cache)")
+    parser.add_argument('--no-member-cache', action='store_true',
+                        help="act like MEMBER_CACHE=none: members are fetched from the API instead of the cache")
+    parser.add_argument('--seed', type=int, default=0, help="seed for the generated guild and history")
+    parser.add_argument('--json', metavar='PATH', help="also write the results as JSON")
+    parser.add_argument('--verbose', action='store_true', help="show the handlers' own log output")
+    args = parser.parse_args()
+    for key, value in SCENARIOS[args.scenario].items():
+        if getattr(args, key) is None:
+            setattr(args, key, value)
+    return args
+
+
+if __name__ == '__main__':
+    asyncio.run(main(parse_args()))
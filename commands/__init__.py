@@ -0,0 +1,171 @@
+"""Command registry and dispatcher.
+
+Every command is registered here with its metadata, but the module holding
+its handler is only imported the first time the command is used, so adding
+commands doesn't slow down startup or the message hot path. Dispatch is a
+single dict lookup, followed by the middleware chain (rate limit, owner
+check, cooldown, timing) and then the handler.
+"""
+import importlib
+import time
+
+import metrics
+from config import OWNER_ID
+from safety import check_rate_limit, check_command_cooldown
+from services import watchdog, guild_settings
+
+COMMANDS = {}  # name -> Command, in registration order (used by !help)
+MIDDLEWARE = []  # async fn(ctx, call_next), run in order around every handler
+
+
+class Command:
+    """Metadata for one command plus its lazily imported handler"""
+
+    __slots__ = ('name', 'module', 'function', 'owners', 'owner_subcommands', 'denied_message', 'cooldown', 'cost',
+                 'cooldown_message', 'cooldown_delete_after', '_handler')
+
+    def __init__(self, name, module, function='run', owners=None, owner_subcommands=None, denied_message=None,
+                 cooldown=None, cost=1, cooldown_message=None, cooldown_delete_after=None):
+        self.name = name
+        self.module = module  # Module holding the handler
+        self.function = function  # Name of the `async def handler(ctx)` in that module
+        self.owners = owners  # User IDs allowed to run it, the name of a per-server setting holding them, or None for everyone
+        self.owner_subcommands = owner_subcommands or {}  # First argument -> owners for that subcommand, same forms as owners
+        self.denied_message = denied_message or "❌ Permission Denied. This command is owner-only."
+        self.cooldown = cooldown  # Cooldown bucket name for expensive commands, or None
+        self.cost = cost  # Cost against the per-server and global expensive command budgets
+        self.cooldown_message = cooldown_message or "⏱️ This command is on cooldown. Please wait {wait:.1f} seconds."
+        self.cooldown_delete_after = cooldown_delete_after
+        self._handler = None
+
+    @property
+    def handler(self):
+        if self._handler is None:
+            self._handler = getattr(importlib.import_module(self.module), self.function)
+        return self._handler
+
+
+class CommandContext:
+    """What a handler gets: the client, the message, the command, its arguments and the server's settings"""
+
+    __slots__ = ('client', 'message', 'command', 'args', 'settings')
+
+    def __init__(self, client, message, command, args, settings):
+        self.client = client
+        self.message = message
+        self.command = command
+        self.args = args
+        self.settings = settings  # guild_settings.Settings for the server the command was sent in
+
+
+def register(name, module, **metadata):
+    """Add a command to the registry (its module is imported on first use)"""
+    COMMANDS[name] = Command(name, module, **metadata)
+
+
+def middleware(func):
+    """Decorator adding func to the end of the middleware chain"""
+    MIDDLEWARE.append(func)
+    return func
+
+
+async def dispatch(client, message):
+    """Run the command in a '!' message, if it is one we know"""
+    parts = message.content.split()
+    if not parts:
+        return
+    command = COMMANDS.get(parts[0][1:])
+    if command is None:
+        return
+    print(f"Command received: '{command.name}' from message: '{message.content}'")
+    watchdog.relabel(f"!{command.name}")
+
+    ctx = CommandContext(client, message, command, parts[1:], guild_settings.get(message.guild.id if message.guild else None))
+
+    async def call(index):
+        if index == len(MIDDLEWARE):
+            await command.handler(ctx)
+        else:
+            await MIDDLEWARE[index](ctx, lambda: call(index + 1))
+
+    await call(0)
+
+
+@middleware
+async def rate_limit(ctx, call_next):
+    """Basic cooldown between any commands per user"""
+    message = ctx.message
+    can_proceed, wait_time = await check_rate_limit(message.author.id, ctx.settings.command_policy)
+    if not can_proceed:
+        try:
+            await message.channel.send(
+                f"⏱️ {message.author.mention} Please wait {wait_time:.1f} seconds before using another command.",
+                delete_after=5
+            )
+        except:
+            pass
+        return
+    await call_next()
+
+
+@middleware
+async def require_owner(ctx, call_next):
+    """Owner-only commands stop here for everyone else"""
+    message = ctx.message
+    owners = ctx.command.owners
+    if ctx.args and ctx.command.owner_subcommands:
+        owners = ctx.command.owner_subcommands.get(ctx.args[0].lower(), owners)
+    if isinstance(owners, str):
+        owners = getattr(ctx.settings, owners)
+    if owners is not None and message.author.id not in owners:
+        await message.channel.send(ctx.command.denied_message)
+        print(f"!{ctx.command.name} denied for user {message.author.name} (ID: {message.author.id})")
+        return
+    await call_next()
+
+
+@middleware
+async def cooldown(ctx, call_next):
+    """Per-user cooldown plus server and global budgets for expensive commands"""
+    message = ctx.message
+    if ctx.command.cooldown is not None:
+        guild_id = message.guild.id if message.guild else None
+        can_proceed, wait_time = await check_command_cooldown(
+            message.author.id, guild_id, ctx.command.cooldown, ctx.command.cost, ctx.settings.cooldown_policy
+        )
+        if not can_proceed:
+            await message.channel.send(
+                ctx.command.cooldown_message.format(mention=message.author.mention, wait=wait_time),
+                delete_after=ctx.command.cooldown_delete_after
+            )
+            return
+    await call_next()
+
+
+@middleware
+async def timing(ctx, call_next):
+    """Log and record how long each handler took"""
+    start = time.perf_counter()
+    try:
+        await call_next()
+    finally:
+        elapsed = time.perf_counter() - start
+        metrics.command_latency.observe(elapsed, ctx.command.name)
+        metrics.commands_total.inc(ctx.command.name)
+        print(f"!{ctx.command.name} handled in {elapsed * 1000:.0f}ms")
+
+
+register('help', 'commands.basic', function='help_command')
+register('ping', 'commands.basic', function='ping_command')
+register('meme', 'commands.meme')
+register('roastme', 'commands.roast', cooldown='roast', cost=1,
+         cooldown_message="🔥 {mention} The roaster needs to cool down! Wait {wait:.1f} seconds.",
+         cooldown_delete_after=10)
+register('inactive', 'commands.inactive', owners='admins', cooldown='inactive', cost=2)
+register('topchatter', 'commands.topchatter', owner_subcommands={'export': 'admins'}, cooldown='topchatter', cost=2,
+         denied_message="❌ Permission Denied. Exporting member activity is owner-only.")
+register('memory', 'commands.memory', owners=OWNER_ID)
+register('profile', 'commands.profile', owners=OWNER_ID)
+register('config', 'commands.config', owners=OWNER_ID)
+register('nuke', 'commands.nuke', owners='nuke_owners', cooldown='nuke', cost=5,
+         denied_message="❌ **Permission Denied.** This is a destructive command - owner only.")
@@ -0,0 +1,10 @@
+from commands import COMMANDS
+
+
+async def help_command(ctx):
+    commands_list = ', '.join(f'!{name}' for name in COMMANDS)
+    await ctx.message.channel.send(f'Current commands: {commands_list}')
+
+
+async def ping_command(ctx):
+    await ctx.message.channel.send('You pinged? :)')
@@ -0,0 +1,76 @@
+from guild_settings import SETTINGS, format_value
+from services import guild_settings, scan_cache
+
+USAGE = (
+    "❌ Usage: `!config` | `!config set <setting> <value>` | `!config reset <setting|all>` | `!config reload`\n"
+    "Settings: " + ", ".join(f"`{name}`" for name in SETTINGS)
+)
+
+
+async def run(ctx):
+    """!config [set <setting> <value> | reset <setting|all> | reload] - this server's limits and owners (owner check is applied by the dispatcher)"""
+    message = ctx.message
+    if not message.guild:
+        await message.channel.send("❌ This command only works in a server!")
+        return
+    guild_id = message.guild.id
+    action = ctx.args[0].lower() if ctx.args else 'show'
+
+    try:
+        if action == 'show':
+            await message.channel.send(settings_report(guild_id))
+        elif action == 'set' and len(ctx.args) >= 3:
+            name = ctx.args[1].lower()
+            if not await may_change(ctx, [name]):
+                return
+            value = await guild_settings.set(guild_id, name, " ".join(ctx.args[2:]))
+            if name == 'scan_limit':
+                # Only drops the cached result: stored totals keep counting on from the watermarks, so a higher limit never reads older history
+                scan_cache.invalidate(guild_id)
+            print(f"Guild settings: {name} = {format_value(value)} in {message.guild.name} (by {message.author.id})")
+            await message.channel.send(f"✅ `{name}` is now `{format_value(value)}` in this server.")
+        elif action == 'reset' and len(ctx.args) == 2:
+            name = ctx.args[1].lower()
+            if not await may_change(ctx, guild_settings.overrides(guild_id) if name == 'all' else [name]):
+                return
+            await guild_settings.reset(guild_id, None if name == 'all' else name)
+            if name in ('scan_limit', 'all'):
+                scan_cache.invalidate(guild_id)
+            print(f"Guild settings: reset {name} in {message.guild.name} (by {message.author.id})")
+            await message.channel.send(f"✅ Reset `{name}` to the default.")
+        elif action == 'reload':
+            servers, changed = await guild_settings.reload()
+            for changed_guild_id, names in changed.items():
+                if 'scan_limit' in names:
+                    scan_cache.invalidate(changed_guild_id)
+            print(f"Guild settings: reloaded from disk, {len(changed)} servers changed (by {message.author.id})")
+            await message.channel.send(f"🔄 Reloaded settings from disk ({servers} servers with their own settings).")
+        else:
+            await message.channel.send(USAGE)
+    except ValueError as e:
+        await message.channel.send(f"❌ {e}\n{USAGE}")
+
+
+async def may_change(ctx, names):
+    """Check the author may change every one of these settings, telling them if not"""
+    for name in names:
+        changed_by = SETTINGS[name][2] if name in SETTINGS else None
+        if changed_by is not None and ctx.message.author.id not in getattr(ctx.settings, changed_by):
+            print(f"!config: {ctx.message.author.id} denied changing {name} in {ctx.message.guild.name}")
+            await ctx.message.channel.send(f"❌ Permission Denied. Only `{changed_by}` can change `{name}`.")
+            return False
+    return True
+
+
+def settings_report(guild_id):
+    """Every setting with this server's value, marking the ones it has changed"""
+    settings = guild_settings.get(guild_id)
+    overrides = guild_settings.overrides(guild_id)
+    lines = []
+    for name, (_, description, _) in SETTINGS.items():
+        marker = "✏️" if name in overrides else "  "
+        lines.append(f"{marker} {name} = {format_value(getattr(settings, name))}\n     {description}")
+    return (
+        "⚙️ **Server settings** (✏️ = changed here, the rest are the bot's defaults)\n"
+        "```\n" + "\n".join(lines) + "\n```"
+    )
@@ -0,0 +1,215 @@
+import time
+import traceback
+from datetime import datetime, timezone
+
+import discord
+
+from config import REPORT_PAGE_SIZE, REPORT_VIEW_TIMEOUT
+from activity_table import DAY
+from exports import FORMATS, send_export
+from members import display_names, iter_members
+from paginator import PageView, field_value
+from services import report_scheduler, activity_index, backfill_activity_index, INACTIVE_TOP_PER_TIER
+
+# Field titles for each tier of INACTIVE_TIERS
+TIER_LABELS = ("🔴 Inactive 30+ Days", "🟡 Inactive 14-29 Days", "🟢 Inactive 7-13 Days")
+EXPORT_FIELDS = ('member_id', 'name', 'last_message', 'days_inactive', 'messages_30d')
+EXPORT_LOOKUP_BATCH = 500  # Members whose activity is read from the index together while exporting
+
+
+async def run(ctx):
+    """!inactive [--fresh] | !inactive export [csv|jsonl] - report members by how long since their last message (owner check and cooldown are applied by the dispatcher)"""
+    message = ctx.message
+    print(f"!inactive command triggered by {message.author.name} (ID: {message.author.id})")
+
+    # Make sure this is in a guild (server), not a DM
+    if not message.guild:
+        await message.channel.send("❌ This command only works in a server!")
+        return
+
+    guild = message.guild
+
+    if ctx.args and ctx.args[0].lower() == 'export':
+        fmt = ctx.args[1].lower() if len(ctx.args) > 1 else 'csv'
+        if fmt not in FORMATS:
+            await message.channel.send(f"❌ Unknown export format. Use one of: {', '.join(FORMATS)}")
+            return
+        try:
+            await export_activity(message, fmt)
+        except Exception as e:
+            print(f"Error in !inactive export: {e}")
+            traceback.print_exc()
+            await message.channel.send(f"❌ An error occurred: {str(e)}")
+        return
+
+    # Answer from the background snapshot unless a live report was asked for
+    snapshot = None if '--fresh' in ctx.args else report_scheduler.snapshot(guild.id)
+    if snapshot is not None:
+        print(f"Sending inactivity snapshot ({snapshot.age():.0f}s old)")
+        await send_report(message, snapshot)
+        return
+
+    # Send a "processing" message since this might take a moment
+    try:
+        status_msg = await message.channel.send(
+            "🔍 **Scanning entire server for inactive members...**\n"
+            "This will check ALL channels (results posted here privately).\n"
+            "Please wait, this may take 10-30 seconds..."
+        )
+    except Exception as e:
+        print(f"Failed to send status message: {e}")
+        return
+
+    try:
+        # Get all members in the server
+        print(f"Fetching members from guild: {guild.name}")
+        await status_msg.edit(content="🔍 Fetching all server members...")
+
+        if guild.chunked and not any(not member.bot for member in guild.members):
+            await status_msg.edit(content="❌ No members found. Make sure the bot has the Server Members Intent enabled!")
+            return
+
+        async def progress(text):
+            await status_msg.edit(content=text)
+
+        report = await report_scheduler.refresh(guild, progress)
+
+        # Delete the status message and send the report
+        await status_msg.delete()
+        await send_report(message, report)
+        print("Inactivity report sent successfully!")
+
+    except discord.Forbidden as e:
+        print(f"Permission error: {e}")
+        try:
+            await status_msg.edit(content="❌ Error: I don't have permission to read message history or access server members. Make sure Server Members Intent and Read Message History are enabled!")
+        except:
+            await message.channel.send("❌ Error: I don't have permission to read message history or access server members.")
+    except Exception as e:
+        print(f"Error in !inactive command: {e}")
+        traceback.print_exc()
+        try:
+            await status_msg.edit(content=f"❌ An error occurred: {str(e)}")
+        except:
+            await message.channel.send(f"❌ An error occurred: {str(e)}")
+
+
+async def build_embed(report, guild):
+    """Render a report's first page, looking up names only for the members listed"""
+    description = f"{report.summary}\nTotal server members: {report.member_count}"
+    age = report.age()
+    if age >= 60:
+        description += f"\n📸 Snapshot from {format_age(age)} ago - use `!inactive --fresh` for a live report"
+
+    # Create an embed for the report
+    embed = report_embed(report, description)
+
+    # Add fields for each category
+    for label, (ids, days) in zip(TIER_LABELS, report.tiers):
+        if not ids:
+            continue
+        shown = min(len(ids), INACTIVE_TOP_PER_TIER)
+        lines = await member_lines(guild, ids, days, 0, shown)
+        if len(ids) > shown:
+            lines.append(f"... and {len(ids) - shown} more")
+        embed.add_field(name=f"{label} ({len(ids)} users)", value=field_value(lines) or "None", inline=False)
+
+    # If no inactive users found
+    if not any(ids for ids, _ in report.tiers):
+        embed.description = f"{description}\n\n✅ No inactive users found in the specified timeframes!"
+
+    embed.set_footer(text=f"Total members analyzed: {report.member_count}")
+    return embed
+
+
+async def send_report(message, report):
+    """Send a report as pages: the summary first, then every member of each tier REPORT_PAGE_SIZE at a time"""
+    guild = message.guild
+    pages = [None]  # Page 0 is the summary; the rest are (tier, first row)
+    if any(len(ids) > INACTIVE_TOP_PER_TIER for ids, _ in report.tiers):
+        for tier, (ids, _) in enumerate(report.tiers):
+            pages.extend((tier, start) for start in range(0, len(ids), REPORT_PAGE_SIZE))
+
+    async def render(page):
+        if page == 0:
+            embed = await build_embed(report, guild)
+        else:
+            tier, start = pages[page]
+            ids, days = report.tiers[tier]
+            end = min(start + REPORT_PAGE_SIZE, len(ids))
+            embed = report_embed(report, report.summary)
+            embed.add_field(
+                name=f"{TIER_LABELS[tier]} ({len(ids)} users) - {start + 1}-{end}",
+                value=field_value(await member_lines(guild, ids, days, start, end)),
+                inline=False
+            )
+        if len(pages) > 1:
+            embed.set_footer(text=f"Page {page + 1}/{len(pages)} | Total members analyzed: {report.member_count}")
+        return embed
+
+    view = PageView(len(pages), render, message.author.id, REPORT_VIEW_TIMEOUT)
+    await view.send(message.channel)
+
+
+async def export_activity(message, fmt):
+    """Every member as a row: last message, days inactive and messages in the last 30 days, in member list order"""
+    guild = message.guild
+    if not activity_index.is_backfilled(guild.id):
+        await message.channel.send("🔍 First run: scanning message history before exporting...")
+        await backfill_activity_index(guild)
+    now = time.time()
+
+    async def rows():
+        # Activity is looked up a batch of members at a time, so memory doesn't grow with the guild
+        batch = []
+        async for member in iter_members(guild):
+            if member.bot:
+                continue
+            batch.append(member)
+            if len(batch) >= EXPORT_LOOKUP_BATCH:
+                for row in await activity_rows(guild.id, batch, now):
+                    yield row
+                batch = []
+        for row in await activity_rows(guild.id, batch, now):
+            yield row
+
+    await send_export(message.channel, f"inactive-{guild.id}", rows(), EXPORT_FIELDS, fmt)
+
+
+async def activity_rows(guild_id, members, now):
+    """Export rows for a batch of members"""
+    if not members:
+        return []
+    member_ids = [member.id for member in members]
+    last_seen = await activity_index.last_seen_for_members(guild_id, member_ids)
+    messages = activity_index.message_counts_for(guild_id, '30d', member_ids)
+    rows = []
+    for member in members:
+        joined = member.joined_at.timestamp() if member.joined_at else now
+        seen = last_seen.get(member.id)
+        since = seen if seen is not None and seen > joined else joined
+        last_message = datetime.fromtimestamp(seen, timezone.utc).isoformat() if seen is not None else ""
+        rows.append((member.id, member.display_name, last_message, int((now - since) // DAY), messages.get(member.id, 0)))
+    return rows
+
+
+def report_embed(report, description):
+    return discord.Embed(
+        title="📊 User Inactivity Report",
+        description=description,
+        color=discord.Color.blue(),
+        timestamp=datetime.fromtimestamp(report.created_at, timezone.utc)
+    )
+
+
+async def member_lines(guild, ids, days, start, end):
+    names = await display_names(guild, ids[start:end])
+    return [f"• {names[ids[row]]} ({days[row]} days)" for row in range(start, end)]
+
+
+def format_age(seconds):
+    if seconds < 3600:
+        return f"{seconds / 60:.0f} min"
+    if seconds < 86400:
+        return f"{seconds / 3600:.1f} h"
+    return f"{seconds / 86400:.1f} days"
@@ -0,0 +1,23 @@
+from config import HUMOR_API_KEY
+from services import meme_buffer
+
+
+async def run(ctx):
+    """!meme - post a random meme, straight from the prefetch buffer when possible"""
+    message = ctx.message
+    if not HUMOR_API_KEY:
+        await message.channel.send("❌ Humor API key is not configured.")
+        return
+
+    try:
+        url = meme_buffer.pop()
+        if url is None:
+            # Buffer is empty, fetch one directly (fails straight away while the API is backing off)
+            status, url = await meme_buffer.fetch()
+            if url is None:
+                await message.channel.send(f"Failed to fetch meme: {status}")
+                return
+        await message.channel.send(url)
+    except Exception as e:
+        print(f"Error fetching meme: {e}")
+        await message.channel.send("❌ An error occurred while fetching a meme.")
@@ -0,0 +1,46 @@
+from config import MEMBER_CACHE, MESSAGE_CACHE_SIZE, CHUNK_GUILDS_AT_STARTUP, MEMORY_SAMPLE_SIZE
+from memstats import measure, process_rss, format_bytes
+from safety import state_store
+from services import activity_index, scan_cache, report_scheduler, meme_buffer
+
+
+async def run(ctx):
+    """!memory - process memory and the estimated size of every cache and table (owner check is applied by the dispatcher)"""
+    client = ctx.client
+    connection = client._connection
+
+    # Guilds, channels and the client itself are shared by everything else; don't charge them to any one cache
+    seen = {id(client), id(connection), id(connection.http), id(client.loop)}
+    for guild in client.guilds:
+        seen.add(id(guild))
+        seen.update(id(channel) for channel in guild.channels)
+
+    tables = [
+        ("Members (discord.py)", [guild._members for guild in client.guilds]),
+        ("Users (discord.py)", [connection._users]),
+        ("Messages (discord.py)", [connection._messages] if connection._messages is not None else []),
+        ("Activity index, unflushed", [activity_index._pending, activity_index._pending_counts]),
+        ("Message counters", [activity_index.counters._rings]),
+        ("Scan cache", [scan_cache._results]),
+        ("Report snapshots", [report_scheduler._snapshots]),
+        ("Meme buffer", [meme_buffer._memes]),
+    ]
+    limiter = getattr(state_store, 'limiter', None)
+    if limiter is not None:
+        tables.append(("Rate limits and mutes", list(limiter._buckets.values()) + [limiter._blocked]))
+
+    lines = [f"{'Cache':<28}{'Entries':>10}{'~Size':>12}"]
+    for name, containers in tables:
+        entries, size = measure(containers, seen, MEMORY_SAMPLE_SIZE)
+        lines.append(f"{name:<28}{entries:>10}{format_bytes(size):>12}")
+
+    current, peak = process_rss()
+    settings = (
+        f"Member cache: {MEMBER_CACHE} | Message cache: {MESSAGE_CACHE_SIZE or 'off'} | "
+        f"Chunk at startup: {'on' if CHUNK_GUILDS_AT_STARTUP and MEMBER_CACHE == 'all' else 'off'}"
+    )
+    await ctx.message.channel.send(
+        f"🧠 **Memory** - resident {format_bytes(current)} (peak {format_bytes(peak)})\n"
+        f"{settings}\n"
+        "```\n" + "\n".join(lines) + "\n```"
+    )
@@ -0,0 +1,315 @@
+import time
+import traceback
+from datetime import datetime, timezone
+
+import discord
+
+from config import (
+    NUKE_KICK_CONCURRENCY, NUKE_PROGRESS_INTERVAL, NUKE_CHECKPOINT_DIR, NUKE_CHECKPOINT_MAX_AGE,
+    REPORT_PAGE_SIZE, REPORT_VIEW_TIMEOUT,
+)
+from kicker import KickCheckpoint, run_kicks
+from members import build_activity_table, resolve_members
+from paginator import PageView, field_value
+from safety import refund_command_cooldown
+from services import (
+    activity_index, backfill_activity_index, catch_up_activity_index, kick_pacer, report_scheduler, scan_cache, watchdog,
+)
+
+INACTIVE_DAYS = 60  # Members inactive this long are kicked
+_running = set()  # Guild IDs with a nuke in progress (one at a time per server, so two never share a checkpoint)
+
+
+async def run(ctx):
+    """!nuke - kick members inactive for 60+ days (STRICT owner check and cooldown are applied by the dispatcher)"""
+    message = ctx.message
+    print(f"!nuke command triggered by {message.author.name} (ID: {message.author.id})")
+
+    # Make sure this is in a guild (server), not a DM
+    if not message.guild:
+        await message.channel.send("❌ This command only works in a server!")
+        return
+
+    # Check if bot has kick permissions
+    if not message.guild.me.guild_permissions.kick_members:
+        await refund_command_cooldown(
+            message.author.id, message.guild.id, ctx.command.cooldown, ctx.command.cost, ctx.settings.cooldown_policy
+        )
+        await message.channel.send("❌ I don't have permission to kick members! Grant me 'Kick Members' permission.")
+        return
+
+    guild = message.guild
+    if guild.id in _running:
+        await refund_command_cooldown(
+            message.author.id, guild.id, ctx.command.cooldown, ctx.command.cost, ctx.settings.cooldown_policy
+        )
+        await message.channel.send("⏳ A nuke is already running in this server.")
+        return
+    _running.add(guild.id)
+    try:
+        await nuke_guild(ctx, guild)
+    finally:
+        _running.discard(guild.id)
+
+
+async def nuke_guild(ctx, guild):
+    """Confirm, then kick (or resume kicking) a guild's inactive members"""
+    message = ctx.message
+    client = ctx.client
+
+    # An interrupted nuke (crash or restart part way) picks up where it stopped, unless it is too old to trust
+    checkpoint = KickCheckpoint.load(NUKE_CHECKPOINT_DIR, guild.id)
+    discarded = ""
+    if checkpoint is not None and checkpoint.age(time.time()) > NUKE_CHECKPOINT_MAX_AGE:
+        print(f"NUKE: Discarding an interrupted nuke for {guild.name} older than {NUKE_CHECKPOINT_MAX_AGE}s")
+        checkpoint.finish()
+        checkpoint = None
+        discarded = "An interrupted nuke was too old to resume and has been discarded.\n"
+
+    # Send a warning confirmation message
+    try:
+        if checkpoint is not None:
+            warning_msg = await message.channel.send(
+                "⚠️ **INTERRUPTED NUKE FOUND**\n"
+                f"Started {format_age(checkpoint.age(time.time()))} ago. "
+                f"{len(checkpoint.targets) - len(checkpoint.remaining())} of {len(checkpoint.targets)} members were already handled; "
+                f"anyone active since then will be skipped.\n"
+                "React with ✅ within 15 seconds to resume it, or ❌ to discard it."
+            )
+        else:
+            warning_msg = await message.channel.send(
+                "⚠️ **WARNING: NUKE COMMAND INITIATED**\n"
+                f"{discarded}"
+                f"This will kick all members inactive for {INACTIVE_DAYS}+ days.\n"
+                "React with ✅ within 15 seconds to confirm, or ❌ to cancel."
+            )
+        await warning_msg.add_reaction("✅")
+        await warning_msg.add_reaction("❌")
+    except Exception as e:
+        print(f"Failed to send warning message: {e}")
+        return
+
+    # Wait for confirmation
+    def check(reaction, user):
+        return user.id in ctx.settings.nuke_owners and str(reaction.emoji) in ["✅", "❌"] and reaction.message.id == warning_msg.id
+
+    try:
+        with watchdog.waiting_for_user():  # Waiting on a person isn't a slow handler
+            reaction, user = await client.wait_for('reaction_add', timeout=15.0, check=check)
+
+        if str(reaction.emoji) == "❌":
+            if checkpoint is not None:
+                checkpoint.finish()
+                await warning_msg.edit(content="❌ **INTERRUPTED NUKE DISCARDED** - No more members will be kicked.")
+            else:
+                await warning_msg.edit(content="❌ **NUKE CANCELLED** - No members were kicked.")
+            return
+
+        # Confirmed - proceed with nuke
+        await warning_msg.edit(content="☢️ **NUKE ACTIVATED** - Scanning server...")
+
+    except TimeoutError:
+        await warning_msg.edit(content="⏱️ **NUKE TIMED OUT** - No confirmation received. Cancelled for safety.")
+        return
+
+    try:
+        current_time = datetime.now(timezone.utc)
+
+        if checkpoint is None:
+            checkpoint, members = await find_targets(guild, warning_msg, current_time, ctx.settings.nuke_owners)
+            if checkpoint is None:
+                return
+        else:
+            if activity_index.needs_catch_up(guild.id):
+                unread = await catch_up_activity_index(guild, log_prefix="NUKE: ")
+                if unread:
+                    await warning_msg.edit(content=catch_up_failed_message(guild, unread))
+                    return
+            skipped = await skip_active_targets(guild, checkpoint, current_time.timestamp())
+            print(f"NUKE: Resuming with {len(checkpoint.remaining())} of {len(checkpoint.targets)} targets left"
+                  f" ({skipped} active again, skipped)")
+            # One member query per batch rather than a fetch per target (see MEMBER_CACHE)
+            members = await resolve_members(guild, [member_id for member_id, _, _ in checkpoint.remaining()])
+
+        # Show targets and start kicking
+        await warning_msg.edit(
+            content=f"☢️ **NUKE IN PROGRESS** - Found {len(checkpoint.targets)} members inactive 60+ days.\n"
+                    f"Kicking members now..."
+        )
+
+        async def show_progress(checkpoint):
+            done = len(checkpoint.targets) - len(checkpoint.remaining())
+            await warning_msg.edit(
+                content=f"☢️ **NUKE IN PROGRESS** - {done}/{len(checkpoint.targets)} members handled\n"
+                        f"✅ Kicked: {len(checkpoint.kicked)} | ⚠️ Failed: {len(checkpoint.failed)}"
+            )
+
+        def precheck(member):
+            if member.guild_permissions.administrator:
+                return "Admin"
+            if member.top_role >= guild.me.top_role:
+                return "Higher role"
+            return None
+
+        try:
+            await run_kicks(
+                guild, checkpoint, kick_pacer, NUKE_KICK_CONCURRENCY, precheck,
+                "Inactive for {days} days - Auto-kicked by !nuke command", show_progress, NUKE_PROGRESS_INTERVAL,
+                members
+            )
+        finally:
+            checkpoint.close()
+        kicked_members = checkpoint.kicked
+        failed_kicks = checkpoint.failed
+
+        # Kicked members are gone, so cached scan results and the precomputed !inactive report are stale
+        if kicked_members:
+            scan_cache.invalidate(guild.id)
+            report_scheduler.forget(guild.id)
+
+        await warning_msg.delete()
+        await send_final_report(message, checkpoint, current_time)
+        checkpoint.finish()
+        print(f"NUKE: Complete - {len(kicked_members)} kicked, {len(failed_kicks)} failed")
+
+    except Exception as e:
+        print(f"NUKE: Critical error: {e}")
+        traceback.print_exc()
+        try:
+            await warning_msg.edit(content=f"❌ **NUKE FAILED** - Critical error: {str(e)}")
+        except:
+            pass
+
+
+async def send_final_report(message, checkpoint, current_time):
+    """Send the outcome of a nuke: a summary page, then every kicked and failed member REPORT_PAGE_SIZE at a time"""
+    kicked_members = checkpoint.kicked
+    failed_kicks = checkpoint.failed
+    kicked_lines = [f"• {name} ({days} days)" for name, days in kicked_members]
+    failed_lines = [f"• {name} ({reason})" for name, reason in failed_kicks]
+
+    pages = [None]  # Page 0 is the summary; the rest are (field title, lines, first line)
+    if len(kicked_lines) > 25 or len(failed_lines) > 10:
+        for title, lines in ((f"✅ Kicked ({len(kicked_lines)} members)", kicked_lines),
+                             (f"⚠️ Could Not Kick ({len(failed_lines)} members)", failed_lines)):
+            pages.extend((title, lines, start) for start in range(0, len(lines), REPORT_PAGE_SIZE))
+
+    async def render(page):
+        embed = discord.Embed(
+            title="☢️ NUKE COMPLETE",
+            description=checkpoint.summary,
+            color=discord.Color.red(),
+            timestamp=current_time
+        )
+        if page == 0:
+            if kicked_lines:
+                shown = kicked_lines[:25]
+                if len(kicked_lines) > 25:
+                    shown.append(f"... and {len(kicked_lines) - 25} more")
+                embed.add_field(name=f"✅ Kicked ({len(kicked_lines)} members)", value=field_value(shown), inline=False)
+            if failed_lines:
+                shown = failed_lines[:10]
+                if len(failed_lines) > 10:
+                    shown.append(f"... and {len(failed_lines) - 10} more")
+                embed.add_field(name=f"⚠️ Could Not Kick ({len(failed_lines)} members)", value=field_value(shown), inline=False)
+        else:
+            title, lines, start = pages[page]
+            end = min(start + REPORT_PAGE_SIZE, len(lines))
+            embed.add_field(name=f"{title} - {start + 1}-{end}", value=field_value(lines[start:end]), inline=False)
+        footer = f"Total targets: {len(checkpoint.targets)} | Kicked: {len(kicked_members)} | Failed: {len(failed_kicks)}"
+        if checkpoint.skipped:
+            footer += f" | Skipped (active again): {len(checkpoint.skipped)}"
+        if len(pages) > 1:
+            footer = f"Page {page + 1}/{len(pages)} | {footer}"
+        embed.set_footer(text=footer)
+        return embed
+
+    view = PageView(len(pages), render, message.author.id, REPORT_VIEW_TIMEOUT)
+    await view.send(message.channel)
+
+
+async def find_targets(guild, warning_msg, current_time, owners):
+    """Find members inactive for 60+ days and save them to a new checkpoint.
+
+    Returns (checkpoint, {member_id: Member} for the targets), or (None, None) if there are none.
+    """
+    # Get all members in the server
+    print(f"NUKE: Fetching members from guild: {guild.name}")
+    await warning_msg.edit(content="☢️ **NUKE ACTIVE** - Analyzing all server members...")
+
+    if guild.chunked and not any(not member.bot for member in guild.members):
+        await warning_msg.edit(content="❌ No members found.")
+        return None, None
+
+    message_count = 0
+    channels_scanned = 0
+
+    # One-time backfill of the activity index, same as !inactive
+    if not activity_index.is_backfilled(guild.id):
+        await warning_msg.edit(content="☢️ **NUKE ACTIVE** - First run: scanning message history...")
+        scan = await backfill_activity_index(guild, log_prefix="NUKE: ")
+        message_count = scan.messages_read
+        channels_scanned = scan.channels_scanned
+    elif activity_index.needs_catch_up(guild.id):
+        # Someone who posted while the bot was offline is not inactive
+        await warning_msg.edit(content="☢️ **NUKE ACTIVE** - Catching up on messages sent while the bot was offline...")
+        unread = await catch_up_activity_index(guild, log_prefix="NUKE: ")
+        if unread:
+            await warning_msg.edit(content=catch_up_failed_message(guild, unread))
+            return None, None
+
+    # Each member's last activity: their newest message in the index, falling back to their join date
+    now = current_time.timestamp()
+    last_seen = await activity_index.last_seen_for_guild(guild.id)
+    table = await build_activity_table(guild, last_seen, now)
+    print(f"NUKE: Found {len(table)} non-bot members")
+
+    if channels_scanned:
+        scan_summary = f"Scanned {message_count} messages across {channels_scanned} channels"
+    else:
+        scan_summary = f"Activity index: {len(last_seen)} members with recorded messages"
+
+    # Find members inactive for 60+ days, most inactive first (never the owners)
+    rows = [row for row in table.tiers(now, (INACTIVE_DAYS,))[0] if table.ids[row] not in owners]
+    members = await resolve_members(guild, [table.ids[row] for row in rows])
+    targets = []
+    for row in rows:
+        member = members.get(table.ids[row])
+        if member is None:
+            continue  # Left since the member list was read
+        targets.append([member.id, member.display_name, table.days_inactive(row, now)])
+
+    if len(targets) == 0:
+        await warning_msg.edit(content="✅ **NUKE COMPLETE** - No members were inactive for 60+ days. Server is clean!")
+        return None, None
+
+    # Save the targets before the first kick so an interruption can resume
+    checkpoint = KickCheckpoint(NUKE_CHECKPOINT_DIR, guild.id)
+    checkpoint.begin(targets, scan_summary, now)
+    return checkpoint, members
+
+
+async def skip_active_targets(guild, checkpoint, now):
+    """Take members who have posted since an interrupted nuke picked them off its list, returning how many"""
+    last_seen = await activity_index.last_seen_for_guild(guild.id)
+    cutoff = now - INACTIVE_DAYS * 86400
+    skipped = 0
+    for member_id, name, days in checkpoint.remaining():
+        if last_seen.get(member_id, 0) >= cutoff:
+            checkpoint.record(member_id, name, 'skipped', "Active since the nuke started")
+            skipped += 1
+    return skipped
+
+
+def catch_up_failed_message(guild, unread):
+    return (
+        f"❌ **NUKE ABORTED** - {unread} channels had more messages while the bot was offline than the scan limit "
+        f"({scan_cache.limit_for(guild.id)}) reads, so members who only posted then can't be told apart from inactive ones. "
+        "Nobody was kicked this time. Raise `scan_limit` with `!config set` and try again."
+    )
+
+
+def format_age(seconds):
+    if seconds < 3600:
+        return f"{seconds / 60:.0f} minutes"
+    return f"{seconds / 3600:.1f} hours"
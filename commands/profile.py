@@ -0,0 +1,67 @@
+import asyncio
+import os
+import time
+from datetime import datetime, timezone
+
+from config import PROFILE_DIR, PROFILE_SAMPLE_INTERVAL, PROFILE_MAX_SECONDS
+from loop_watchdog import profile, write_folded, top_functions
+from services import watchdog
+
+_profiling = False  # Only one profile runs at a time
+
+
+async def run(ctx):
+    """!profile [seconds] | !profile slow - sample what the event loop is busy with, or list recent stalls and slow handlers (owner check is applied by the dispatcher)"""
+    global _profiling
+    message = ctx.message
+
+    if ctx.args and ctx.args[0].lower() == 'slow':
+        await message.channel.send(slow_events_report())
+        return
+
+    try:
+        seconds = float(ctx.args[0]) if ctx.args else 10
+    except ValueError:
+        await message.channel.send("❌ Usage: `!profile [seconds]` or `!profile slow`")
+        return
+    seconds = max(1, min(seconds, PROFILE_MAX_SECONDS))
+
+    if _profiling:
+        await message.channel.send("⏳ A profile is already running.")
+        return
+    _profiling = True
+    try:
+        await message.channel.send(f"🔬 Profiling the event loop for {seconds:.0f}s...")
+        samples = await profile(seconds, PROFILE_SAMPLE_INTERVAL)
+        path = os.path.join(PROFILE_DIR, f"profile-{datetime.now(timezone.utc):%Y%m%d-%H%M%S}.folded")
+        await asyncio.to_thread(write_folded, samples, path)
+    finally:
+        _profiling = False
+
+    lines = [f"{share:6.1%}  {function}" for function, share in top_functions(samples, 10)]
+    print(f"Profile written to {path} ({sum(samples.values())} samples)")
+    await message.channel.send(
+        f"🔬 **Profile** - {sum(samples.values())} samples over {seconds:.0f}s, saved to `{path}`\n"
+        "Where the event loop spent its CPU time (own time per function):\n"
+        "```\n" + "\n".join(lines)[:1700] + "\n```"
+    )
+
+
+def slow_events_report():
+    """Recent stalls and slow handlers, newest first, with the stack of the newest one"""
+    events = list(watchdog.events)
+    if not events:
+        return "✅ No event loop stalls or slow handlers recorded."
+    now = time.time()
+    lines = []
+    for event in reversed(events):
+        duration = f"{event.duration:.1f}s" if event.duration is not None else "still going"
+        kind = "🧱 loop blocked" if event.kind == 'stall' else "🐢 slow handler"
+        lines.append(f"{kind}: {event.label} - {duration}, {(now - event.started_at) / 60:.0f} min ago")
+    newest = events[-1]
+    text = "**Recent stalls and slow handlers**\n" + "\n".join(lines)
+    if newest.stack:
+        stack = newest.stack[-(1900 - len(text)):] if len(text) < 1800 else ""
+        if stack:
+            text += f"\nNewest stack:\n```\n{stack}\n```"
+    return text[:2000]
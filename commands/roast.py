@@ -0,0 +1,101 @@
+import asyncio
+
+import aiohttp
+
+import http_client
+from ai_queue import AIQueueFull, RateLimited
+from ai_stream import stream_to_message
+from config import AI_API_TOKEN, AI_MODEL, AI_STREAM_ROASTS, AI_STREAM_EDIT_INTERVAL
+from safety import refund_command_cooldown
+from services import ai_scheduler
+
+
+def post_roast_request(user_name, stream=False):
+    """Start an OpenRouter chat completion asking for a roast"""
+    return http_client.session().post(
+        "https://openrouter.ai/api/v1/chat/completions",
+        headers={
+            "Authorization": f"Bearer {AI_API_TOKEN}",
+            "Content-Type": "application/json",
+        },
+        json={
+            "model": AI_MODEL,
+            "messages": [
+                {
+                    "role": "user",
+                    "content": f"Write a short, brutal, funny roast for Discord user {user_name}. Keep it Discord-safe, under 50 words."
+                }
+            ],
+            "stream": stream,
+        }
+    )
+
+
+def raise_if_rate_limited(response):
+    """Let the AI scheduler back off and retry when OpenRouter answers 429"""
+    if response.status == 429:
+        retry_after = response.headers.get("Retry-After")
+        raise RateLimited(float(retry_after) if retry_after and retry_after.isdigit() else None)
+
+
+async def fetch_roast(user_name):
+    """Ask OpenRouter for a roast, returning (status, roast or None)"""
+    async with post_roast_request(user_name) as response:
+        raise_if_rate_limited(response)
+        if response.status != 200:
+            return response.status, None
+        return response.status, (await response.json())['choices'][0]['message']['content']
+
+
+async def stream_roast(user_name, channel):
+    """Stream a roast into channel as it is generated, returning (status, roast or None)"""
+    async with post_roast_request(user_name, stream=True) as response:
+        raise_if_rate_limited(response)
+        if response.status != 200:
+            return response.status, None
+        return response.status, await stream_to_message(response, channel, AI_STREAM_EDIT_INTERVAL)
+
+
+async def run(ctx):
+    """!roastme - get roasted by AI (cooldown is applied by the dispatcher)"""
+    message = ctx.message
+
+    # Check if AI API token is configured
+    if not AI_API_TOKEN:
+        await message.channel.send("❌ AI API is not configured. Contact the bot owner.")
+        return
+
+    try:
+        # Queue behind other AI requests; show typing while we wait
+        async with message.channel.typing():
+            if AI_STREAM_ROASTS:
+                # The roast is posted and edited in place while it streams in
+                status, roast = await ai_scheduler.run(
+                    message.guild.id, lambda: stream_roast(message.author.name, message.channel)
+                )
+            else:
+                status, roast = await ai_scheduler.run(
+                    message.guild.id, lambda: fetch_roast(message.author.name)
+                )
+        if roast is None:
+            await message.channel.send(f"Oof, roast failed: {status}. Try again later.")
+        elif not AI_STREAM_ROASTS:
+            await message.channel.send(roast)
+    except AIQueueFull:
+        # Rejected before doing any work, so don't charge the user a cooldown
+        await refund_command_cooldown(
+            message.author.id, message.guild.id, ctx.command.cooldown, ctx.command.cost, ctx.settings.cooldown_policy
+        )
+        await message.channel.send(
+            f"🔥 {message.author.mention} The roaster is swamped right now ({ai_scheduler.depth} roasts in line). Try again in a minute."
+        )
+    except RateLimited:
+        await message.channel.send("Oof, roast failed: 429. Try again later.")
+    except asyncio.TimeoutError:
+        await message.channel.send("⏱️ The AI took too long to respond. Try again later.")
+    except aiohttp.ClientError as e:
+        await message.channel.send("❌ Network error occurred. Try again later.")
+        print(f"Request error in !roastme: {e}")
+    except Exception as e:
+        await message.channel.send("❌ An unexpected error occurred.")
+        print(f"Error in !roastme: {e}")
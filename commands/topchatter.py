@@ -0,0 +1,140 @@
+import time
+from datetime import datetime, timezone
+
+import discord
+
+from activity_table import DAY
+from exports import FORMATS, send_export
+from members import display_names
+from message_counters import WINDOWS
+from services import activity_index, scan_cache
+
+EXPORT_FIELDS = ('member_id', 'name', 'last_message', 'days_inactive', 'messages')
+
+
+async def run(ctx):
+    """!topchatter [24h|7d|30d] | !topchatter export [csv|jsonl] - rank members by messages in recent history or a time window (cooldown, and the owner check on export, are applied by the dispatcher)"""
+    message = ctx.message
+
+    if ctx.args and ctx.args[0].lower() == 'export':
+        fmt = ctx.args[1].lower() if len(ctx.args) > 1 else 'csv'
+        if fmt not in FORMATS:
+            await message.channel.send(f"❌ Unknown export format. Use one of: {', '.join(FORMATS)}")
+            return
+        try:
+            await export_chatters(message, fmt)
+        except Exception as e:
+            print(f"Error in !topchatter export: {e}")
+            await message.channel.send(f"❌ An error occurred: {str(e)}")
+        return
+
+    if ctx.args:
+        window = ctx.args[0].lower()
+        if window not in WINDOWS:
+            await message.channel.send(f"❌ Unknown time window. Use `!topchatter`, `!topchatter export` or one of: {', '.join(WINDOWS)}")
+            return
+        try:
+            await send_window_report(message, window)
+        except Exception as e:
+            print(f"Error in !topchatter {window}: {e}")
+            try:
+                await message.channel.send(f"❌ An error occurred: {str(e)}")
+            except:
+                pass
+        return
+
+    # Send a "processing" message
+    try:
+        status_msg = await message.channel.send(
+            "🔍 **Calculating top chatters...**\n"
+            "Scanning new channel history (this may take a moment)..."
+        )
+    except Exception as e:
+        print(f"Failed to send status message: {e}")
+        return
+
+    try:
+        guild = message.guild
+
+        # Message totals per user across all channels, from every scan so far plus whatever is new since the last one
+        scan = await scan_cache.get(guild)
+        user_names = scan.names
+
+        # Sort by message count
+        sorted_chatters = sorted(scan.message_counts.items(), key=lambda x: x[1], reverse=True)
+
+        # Create embed
+        embed = discord.Embed(
+            title="🏆 Top Chatters (Since Tracking Began)",
+            description=f"{scan.message_count} messages counted since the bot started scanning this server "
+                        f"({scan.messages_read} new ones read across {scan.channels_scanned} channels just now).",
+            color=discord.Color.gold(),
+            timestamp=datetime.now(timezone.utc)
+        )
+
+        if sorted_chatters:
+            top_list = ""
+            for i, (user_id, count) in enumerate(sorted_chatters[:10], 1):
+                name = user_names.get(user_id, "Unknown")
+                medal = "🥇" if i == 1 else "🥈" if i == 2 else "🥉" if i == 3 else f"{i}."
+                top_list += f"{medal} **{name}**: {count} messages\n"
+
+            embed.add_field(name="Most Active Users", value=top_list, inline=False)
+        else:
+            embed.description += "\n\n❌ No messages found in the scanned history."
+
+        await status_msg.delete()
+        await message.channel.send(embed=embed)
+
+    except Exception as e:
+        print(f"Error in !topchatter: {e}")
+        try:
+            await status_msg.edit(content=f"❌ An error occurred: {str(e)}")
+        except:
+            pass
+
+
+async def send_window_report(message, window):
+    """Answer from the rolling message counters - no scan needed"""
+    guild = message.guild
+    top, total, since = activity_index.top_chatters(guild.id, window, 10)
+
+    embed = discord.Embed(
+        title=f"🏆 Top Chatters (Last {window})",
+        description=f"Counted {total} messages in the last {window}.",
+        color=discord.Color.gold(),
+        timestamp=datetime.now(timezone.utc)
+    )
+
+    if top:
+        names = await display_names(guild, [user_id for user_id, _ in top])
+        top_list = ""
+        for i, (user_id, count) in enumerate(top, 1):
+            name = names[user_id]
+            medal = "🥇" if i == 1 else "🥈" if i == 2 else "🥉" if i == 3 else f"{i}."
+            top_list += f"{medal} **{name}**: {count} messages\n"
+
+        embed.add_field(name="Most Active Users", value=top_list, inline=False)
+        embed.set_footer(text="Counting since")
+        embed.timestamp = datetime.fromtimestamp(since, timezone.utc)
+    else:
+        embed.description += "\n\n❌ No messages counted in this window yet."
+
+    await message.channel.send(embed=embed)
+
+
+async def export_chatters(message, fmt):
+    """Every member in the scanned history as a row, most messages first"""
+    guild = message.guild
+    scan = await scan_cache.get(guild)
+    now = time.time()
+    order = sorted(scan.message_counts, key=scan.message_counts.__getitem__, reverse=True)
+
+    async def rows():
+        for member_id in order:
+            seen = scan.last_seen.get(member_id)
+            last_message = seen.isoformat() if seen is not None else ""
+            days = int((now - seen.timestamp()) // DAY) if seen is not None else ""
+            yield member_id, scan.names.get(member_id, "Unknown"), last_message, days, scan.message_counts[member_id]
+
+    await send_export(message.channel, f"topchatter-{guild.id}", rows(), EXPORT_FIELDS, fmt)
@@ -0,0 +1,109 @@
+import os
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+TOKEN = os.getenv('DISCORD_TOKEN')
+AI_API_TOKEN = os.getenv('OPENROUTER_API_KEY')  # Or change to 'OpenRouterAPIKey' if that's your .env name
+HUMOR_API_KEY = os.getenv('HUMOR_API_KEY')
+
+# IMPORTANT: Replace this with your Discord User ID(s)
+# To get your ID: Enable Developer Mode in Discord settings, right-click your name, "Copy User ID"
+OWNER_ID = [172342196945551361, 376786371672801280]  # List of authorized user IDs for !inactive command
+NUKE_OWNER_ID = 172342196945551361  # Only this user can use !nuke command
+
+# AI MODEL CONFIGURATION
+AI_MODEL = "meta-llama/llama-3.3-70b-instruct:free"
+AI_WORKERS = 2  # OpenRouter requests allowed in flight at once
+AI_MAX_QUEUE = 20  # AI requests allowed to wait for a worker before new ones are turned away
+AI_MAX_RETRIES = 3  # Retries when OpenRouter answers 429
+AI_RETRY_BASE_DELAY = 2  # Seconds; backoff doubles with each retry (with jitter)
+AI_STREAM_ROASTS = False  # Post roasts while they are generated, editing the message as tokens arrive
+AI_STREAM_EDIT_INTERVAL = 1.2  # Minimum seconds between edits of a streaming message
+
+# Safety Configuration
+RATE_LIMIT_SECONDS = 3  # Minimum seconds between commands per user
+COOLDOWN_EXPENSIVE_COMMANDS = 30  # Cooldown for AI/expensive commands (seconds)
+MAX_MESSAGES_PER_MINUTE = 10  # Maximum messages from one user per minute
+SPAM_MUTE_DURATION = 60  # Seconds to ignore a spammer
+GUILD_EXPENSIVE_BUDGET = 10  # Expensive command cost one server can spend per minute
+GLOBAL_EXPENSIVE_BUDGET = 40  # Expensive command cost the whole bot can spend per minute
+RATE_LIMIT_MAX_KEYS = 50000  # Memory bound: most users/servers tracked per kind of limit
+SAFETY_SWEEP_INTERVAL = 300  # Seconds between sweeps that drop expired rate limit and mute entries
+STATE_SNAPSHOT_PATH = os.getenv('STATE_SNAPSHOT_PATH', 'safety_state.bin')  # Cooldowns and mutes saved here so restarts keep them
+STATE_SNAPSHOT_INTERVAL = 60  # Seconds between snapshots (one is also written on shutdown)
+
+# Sharding Configuration (see launcher.py for running shards in several processes)
+SHARD_COUNT = int(os.getenv('SHARD_COUNT', '0'))  # Total gateway shards across every process; 0 runs unsharded
+SHARD_IDS = [int(i) for i in os.getenv('SHARD_IDS', '').split(',') if i.strip()] or None  # Shards this process runs, e.g. "0,1"; unset means all
+SHARD_PROCESSES = int(os.getenv('SHARD_PROCESSES', '1'))  # Bot processes launcher.py splits the shards across
+STATE_STORE = os.getenv('STATE_STORE', 'memory')  # Where rate limits and mutes live: 'memory' (one process) or 'redis' (shared)
+REDIS_URL = os.getenv('REDIS_URL', 'redis://127.0.0.1:6379/0')  # Used when STATE_STORE is 'redis'
+
+# Memory Budget Configuration (MEMORY_BUDGET=1 switches the defaults below to keep as little cached as possible)
+MEMORY_BUDGET = os.getenv('MEMORY_BUDGET', '0') == '1'
+MEMBER_CACHE = os.getenv('MEMBER_CACHE', 'none' if MEMORY_BUDGET else 'all')  # 'all' caches every member, 'joined' only those who join while the bot runs, 'none' none; scans fetch the rest on demand
+MESSAGE_CACHE_SIZE = int(os.getenv('MESSAGE_CACHE_SIZE', '0' if MEMORY_BUDGET else '1000'))  # Recent messages discord.py keeps for edit/delete events; 0 keeps none
+CHUNK_GUILDS_AT_STARTUP = os.getenv('CHUNK_GUILDS_AT_STARTUP', '0' if MEMORY_BUDGET else '1') == '1'  # Download every server's member list on connect (needs MEMBER_CACHE 'all')
+MEMORY_SAMPLE_SIZE = 500  # Entries per cache the !memory diagnostic measures, scaling up for the rest
+
+# Scanning Configuration
+MESSAGE_SCAN_LIMIT = 1000  # Number of messages to scan per channel for !inactive and !nuke
+SCAN_CONCURRENCY = 5  # Channels scanned in parallel
+SCAN_PAGES_PER_SECOND = 40  # History requests per second across all scan workers (Discord's global limit is 50)
+SCAN_CACHE_TTL = 300  # Seconds a guild scan is reused by !inactive, !topchatter and !nuke before rescanning
+
+# Report Precomputation Configuration
+REPORT_PRECOMPUTE_INTERVAL = 3600  # Seconds between background rebuilds of every server's !inactive report
+REPORT_OFF_PEAK_HOURS = ()  # UTC hours background rebuilds may run in, e.g. (2, 3, 4, 5); empty means any hour
+REPORT_GUILD_PAGE_BUDGET = 2000  # History pages background rebuilds may read per server per day
+
+# Report Paging Configuration
+REPORT_PAGE_SIZE = 20  # Members listed per page of a long report (keeps each embed field under 1024 characters)
+REPORT_VIEW_TIMEOUT = 600  # Seconds a report's page buttons keep working before they are removed
+
+# Export Configuration (!inactive export, !topchatter export)
+EXPORT_SPOOL_SIZE = 1024 * 1024  # Bytes of an export kept in memory before it spills to a temporary file
+EXPORT_COMPRESS_OVER = 1024 * 1024  # Exports bigger than this many bytes are gzipped
+EXPORT_MAX_BYTES = 10 * 1024 * 1024  # Largest attachment Discord accepts from the bot
+
+# !nuke Configuration
+NUKE_KICK_CONCURRENCY = 3  # Kicks in flight at once (paced by Discord's rate limit headers)
+NUKE_PROGRESS_INTERVAL = 5  # Minimum seconds between progress updates while kicking
+NUKE_CHECKPOINT_DIR = os.getenv('NUKE_CHECKPOINT_DIR', 'nuke_checkpoints')  # Where nukes in progress are saved so they can resume
+NUKE_CHECKPOINT_MAX_AGE = 86400  # Seconds an interrupted nuke can still be resumed; older ones are discarded
+
+# Outbound HTTP Configuration (humorapi, OpenRouter)
+HTTP_TIMEOUT = 10  # Total seconds allowed per outbound request
+HTTP_MAX_CONNECTIONS = 20  # Pooled connections across all hosts
+HTTP_MAX_CONNECTIONS_PER_HOST = 5  # Pooled connections per API host
+HTTP_KEEPALIVE_TIMEOUT = 60  # Seconds an idle pooled connection is kept open
+
+# Meme Prefetch Configuration
+MEME_BUFFER_SIZE = 10  # Memes kept ready in memory for !meme
+MEME_LOW_WATER = 3  # Refill the buffer when fewer than this many are left
+MEME_MAX_AGE = 6 * 3600  # Seconds before a prefetched meme is thrown away unused (not replaced until !meme is used again)
+MEME_MAX_BACKOFF = 900  # Longest pause (seconds) after API errors or an exhausted quota
+
+# Metrics Configuration
+METRICS_HOST = '127.0.0.1'  # Only reachable from the droplet itself (scrape locally or through a tunnel)
+METRICS_PORT = int(os.getenv('METRICS_PORT', '9108'))  # Prometheus endpoint at /metrics; 0 disables it
+LOOP_LAG_INTERVAL = 0.5  # Seconds between event loop lag measurements
+
+# Watchdog and Profiler Configuration
+WATCHDOG_INTERVAL = 0.1  # Seconds between watchdog heartbeats and checks
+WATCHDOG_STALL_THRESHOLD = 0.5  # Seconds the event loop can be blocked before the blocking stack is captured
+WATCHDOG_HANDLER_THRESHOLD = 5  # Seconds an on_message call can run before its stack is captured and it counts as slow
+WATCHDOG_EVENTS_KEPT = 20  # Recent stalls and slow handlers kept for !profile slow
+PROFILE_DIR = os.getenv('PROFILE_DIR', 'profiles')  # Where !profile writes its folded stack files
+PROFILE_SAMPLE_INTERVAL = 0.005  # Seconds between stack samples while profiling
+PROFILE_MAX_SECONDS = 120  # Longest profile !profile will run
+
+# Event Recording Configuration
+RECORD_EVENTS_PATH = os.getenv('RECORD_EVENTS_PATH')  # Record anonymized message events here for bench/replay_bench.py; unset disables it
+RECORD_EVENTS_LIMIT = int(os.getenv('RECORD_EVENTS_LIMIT', '1000000'))  # Stop recording after this many events
+
+# Activity Index Configuration
+ACTIVITY_DB_PATH = os.getenv('ACTIVITY_DB_PATH', 'activity.db')  # SQLite file holding last-seen times per member
+ACTIVITY_FLUSH_INTERVAL = 30  # Seconds between batched writes of pending activity to disk
+ACTIVITY_FLUSH_BATCH = 500  # Flush early once this many members have pending updates
@@ -0,0 +1,123 @@
+"""Compact, anonymized recordings of incoming messages, for load testing on_message.
+
+With RECORD_EVENTS_PATH set the bot appends every message event it receives
+to a gzipped file that bench/replay_bench.py can play back. Nothing that
+identifies anyone is kept:
+- server, channel and user IDs are replaced by small numbers handed out in
+  the order they are first seen
+- message text is reduced to its length
+- for commands, only the command word (e.g. "!topchatter") is kept, and
+  only for the bot's own commands; any other text starting with "!" is
+  recorded as just "!"
+
+Each event is a fixed 19-byte record plus the command word:
+    u32 milliseconds since the previous event
+    u32 server, u32 channel, u32 author (0 = none, e.g. a DM has no server)
+    u8 flags (FLAG_BOT, FLAG_DM, FLAG_OWN)
+    u16 content length
+    u8 command word length, then the command word
+"""
+import gzip
+import struct
+import time
+
+MAGIC = b'EVT1'
+_RECORD = struct.Struct('<IIIIBHB')
+
+FLAG_BOT = 1  # Author is a bot
+FLAG_DM = 2  # Sent in a DM
+FLAG_OWN = 4  # Sent by this bot itself
+
+
+class Event:
+    __slots__ = ('delay', 'guild', 'channel', 'author', 'flags', 'length', 'command')
+
+    def __init__(self, delay, guild, channel, author, flags, length, command):
+        self.delay = delay  # Seconds since the previous event
+        self.guild = guild
+        self.channel = channel
+        self.author = author
+        self.flags = flags
+        self.length = length
+        self.command = command  # e.g. "!ping", or "" for a normal message
+
+
+class EventRecorder:
+    """Appends anonymized message events to a file until `limit` have been written.
+
+    `commands` holds the command names (without "!") whose word may be recorded.
+    """
+
+    def __init__(self, path, limit, commands):
+        self.path = path
+        self.limit = limit
+        self.commands = commands
+        self.count = 0
+        self._ids = ({}, {}, {})  # Real guild, channel and user IDs -> anonymous numbers
+        self._last = None  # monotonic time of the previous event
+        self._file = gzip.open(path, 'wb')
+        self._file.write(MAGIC)
+        print(f"Recording message events to {path} (up to {limit})")
+
+    def record(self, message, own):
+        if self._file is None:
+            return
+        now = time.monotonic()
+        delay = 0 if self._last is None else min(int((now - self._last) * 1000), 0xFFFFFFFF)
+        self._last = now
+        content = message.content
+        command = b''
+        if content.startswith('!'):
+            word = content.split(maxsplit=1)[0]
+            command = word.encode() if word[1:] in self.commands else b'!'
+        flags = (FLAG_BOT if message.author.bot else 0) | (FLAG_DM if message.guild is None else 0) | (FLAG_OWN if own else 0)
+        self._file.write(_RECORD.pack(
+            delay,
+            self._anonymize(0, message.guild.id) if message.guild is not None else 0,
+            self._anonymize(1, message.channel.id),
+            self._anonymize(2, message.author.id),
+            flags,
+            min(len(content), 0xFFFF),
+            len(command),
+        ) + command)
+        self.count += 1
+        if self.count >= self.limit:
+            print(f"Recorded {self.count} message events, stopping")
+            self.close()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _anonymize(self, kind, real_id):
+        ids = self._ids[kind]
+        anonymous = ids.get(real_id)
+        if anonymous is None:
+            anonymous = ids[real_id] = len(ids) + 1
+        return anonymous
+
+
+def write_events(path, events):
+    """Write Events to a recording (used to make synthetic ones)"""
+    with gzip.open(path, 'wb') as f:
+        f.write(MAGIC)
+        for event in events:
+            command = event.command.encode()
+            f.write(_RECORD.pack(
+                int(event.delay * 1000), event.guild, event.channel, event.author, event.flags, event.length, len(command)
+            ) + command)
+
+
+def read_events(path):
+    """Yield the Events in a recording, oldest first"""
+    with gzip.open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a message event recording")
+        while True:
+            header = f.read(_RECORD.size)
+            if len(header) < _RECORD.size:
+                return  # End of file (or a record cut off by a crash)
+            delay, guild, channel, author, flags, length, command_length = _RECORD.unpack(header)
+            command = f.read(command_length).decode(errors='replace')
+            yield Event(delay / 1000, guild, channel, author, flags, length, command)
@@ -0,0 +1,85 @@
+import asyncio
+import csv
+import gzip
+import io
+import json
+import shutil
+import tempfile
+from datetime import datetime, timezone
+
+import discord
+
+from config import EXPORT_SPOOL_SIZE, EXPORT_COMPRESS_OVER, EXPORT_MAX_BYTES
+
+FORMATS = ('csv', 'jsonl')
+_BATCH = 500  # Rows encoded together before they are written to the spool
+_FORMULA_STARTS = ('=', '+', '-', '@')  # A CSV cell starting with one of these runs as a formula in spreadsheets
+
+
+async def spool_rows(rows, fields, fmt):
+    """Write an async iterable of row tuples to a spooled temp file as CSV (with a header) or JSON lines.
+
+    Rows are encoded a batch at a time, and the spool holds EXPORT_SPOOL_SIZE
+    bytes in memory before moving to disk, so memory stays flat however many
+    rows there are. Returns the file, rewound.
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_SIZE)
+    text = io.StringIO()
+    writer = csv.writer(text) if fmt == 'csv' else None
+    if writer is not None:
+        writer.writerow(fields)
+    pending = 0
+    async for row in rows:
+        if writer is not None:
+            writer.writerow([_defuse(cell) for cell in row])
+        else:
+            text.write(json.dumps(dict(zip(fields, row)), ensure_ascii=False))
+            text.write('\n')
+        pending += 1
+        if pending >= _BATCH:
+            spool.write(text.getvalue().encode())
+            text.seek(0)
+            text.truncate()
+            pending = 0
+    spool.write(text.getvalue().encode())
+    spool.seek(0)
+    return spool
+
+
+def _defuse(cell):
+    """Quote text (e.g. a display name) a spreadsheet would otherwise run as a formula"""
+    if isinstance(cell, str) and cell.startswith(_FORMULA_STARTS):
+        return "'" + cell
+    return cell
+
+
+def _gzip(spool):
+    """Compress a spooled file into a new one, a chunk at a time"""
+    packed = tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_SIZE)
+    with gzip.GzipFile(fileobj=packed, mode='wb', mtime=0) as gz:
+        shutil.copyfileobj(spool, gz, 64 * 1024)
+    spool.close()
+    packed.seek(0)
+    return packed
+
+
+async def send_export(channel, name, rows, fields, fmt):
+    """Stream rows into a file named `name`-<date>.<fmt> and attach it, gzipped if it is large"""
+    spool = await spool_rows(rows, fields, fmt)
+    try:
+        size = spool.seek(0, io.SEEK_END)
+        spool.seek(0)
+        filename = f"{name}-{datetime.now(timezone.utc):%Y%m%d-%H%M}.{fmt}"
+        if size > EXPORT_COMPRESS_OVER:
+            spool = await asyncio.to_thread(_gzip, spool)
+            filename += '.gz'
+            packed_size = spool.seek(0, io.SEEK_END)
+            spool.seek(0)
+            print(f"Export {filename}: {size} bytes, {packed_size} gzipped")
+            size = packed_size
+        if size > EXPORT_MAX_BYTES:
+            await channel.send(f"❌ The export is {size / (1024 * 1024):.1f} MB, over Discord's attachment limit.")
+            return
+        await channel.send(f"📄 Export ready: `{filename}`", file=discord.File(spool, filename=filename))
+    finally:
+        spool.close()
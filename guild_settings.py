@@ -0,0 +1,185 @@
+import asyncio
+import sqlite3
+import threading
+
+from safety import limit_policy
+
+
+def _parse_ids(value):
+    """'123, 456' -> frozenset of user IDs"""
+    ids = frozenset(int(part) for part in value.replace(',', ' ').split())
+    if not ids:
+        raise ValueError("give at least one user ID")
+    return ids
+
+
+def _positive(kind, largest):
+    def parse(value):
+        number = kind(value)
+        if not 0 < number <= largest:
+            raise ValueError(f"must be above 0 and at most {largest}")
+        return number
+    return parse
+
+
+# name -> (parser for the value given to !config set, description,
+#          setting holding the user IDs allowed to change it, or None for anyone who can run !config)
+SETTINGS = {
+    'admins': (_parse_ids, "User IDs allowed to run !inactive", None),
+    # Otherwise any !config user could make themselves a nuke owner
+    'nuke_owners': (_parse_ids, "User IDs allowed to run and confirm !nuke (never kicked by it)", 'nuke_owners'),
+    'rate_limit_seconds': (_positive(float, 3600), "Minimum seconds between commands per user", None),
+    'cooldown_seconds': (_positive(float, 86400), "Cooldown for AI/expensive commands per user", None),
+    'max_messages_per_minute': (_positive(int, 1000), "Messages a user can send per minute before being muted", None),
+    'scan_limit': (_positive(int, 100_000), "Messages scanned per channel for !inactive, !nuke and !topchatter", None),
+}
+
+
+class Settings:
+    """One server's effective settings, with the rate limit policies they map to worked out in advance"""
+
+    __slots__ = tuple(SETTINGS) + ('spam_policy', 'command_policy', 'cooldown_policy')
+
+    def __init__(self, values):
+        for name in SETTINGS:
+            setattr(self, name, values[name])
+        self.spam_policy = limit_policy('spam', self.max_messages_per_minute, 60)
+        self.command_policy = limit_policy('command', 1, self.rate_limit_seconds)
+        self.cooldown_policy = limit_policy('cooldown', 1, self.cooldown_seconds)
+
+
+class GuildSettings:
+    """Per-server overrides of the defaults in config.py, stored in SQLite and cached in memory.
+
+    Every stored override is read once at startup, and each server with any
+    gets a Settings object built from the defaults plus its overrides; every
+    other server shares the defaults' Settings object. get() is a single
+    dict lookup, cheap enough for every message. Changing a server's
+    settings writes them to disk and then replaces its cached Settings, so
+    the next message already sees them.
+    """
+
+    def __init__(self, path, defaults):
+        self.path = path
+        self.defaults = Settings(defaults)
+        self._default_values = dict(defaults)
+        self._lock = threading.Lock()  # Serializes access to the SQLite connection
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS guild_settings ("
+            " guild_id INTEGER NOT NULL,"
+            " name TEXT NOT NULL,"
+            " value TEXT NOT NULL,"
+            " PRIMARY KEY (guild_id, name)"
+            ") WITHOUT ROWID"
+        )
+        self._conn.commit()
+        self._overrides = {}  # guild_id -> {name: parsed value}
+        self._settings = {}  # guild_id -> Settings, only for servers with overrides
+        self._load(self._read())
+
+    def get(self, guild_id):
+        """A server's Settings (the defaults for DMs and servers without overrides)"""
+        return self._settings.get(guild_id, self.defaults)
+
+    def override(self, guild_id, name):
+        """A server's own value for a setting, or None if it uses the default"""
+        overrides = self._overrides.get(guild_id)
+        return overrides.get(name) if overrides is not None else None
+
+    def overrides(self, guild_id):
+        return dict(self._overrides.get(guild_id, {}))
+
+    async def set(self, guild_id, name, value):
+        """Store an override and apply it right away (raises ValueError for an unknown setting or bad value)"""
+        if name not in SETTINGS:
+            raise ValueError(f"unknown setting '{name}'")
+        parsed = SETTINGS[name][0](value)
+        await asyncio.to_thread(self._write, guild_id, name, format_value(parsed))
+        self._overrides.setdefault(guild_id, {})[name] = parsed
+        self._rebuild(guild_id)
+        return parsed
+
+    async def reset(self, guild_id, name=None):
+        """Drop one override (or all of a server's) so the default applies again"""
+        if name is not None and name not in SETTINGS:
+            raise ValueError(f"unknown setting '{name}'")
+        await asyncio.to_thread(self._delete, guild_id, name)
+        if name is None:
+            self._overrides.pop(guild_id, None)
+        else:
+            self._overrides.get(guild_id, {}).pop(name, None)
+        self._rebuild(guild_id)
+
+    async def reload(self):
+        """Throw the cache away and read every override from disk again (for edits made outside the bot).
+
+        Returns (servers with overrides, {guild_id: names of the settings whose value changed}).
+        """
+        rows = await asyncio.to_thread(self._read)
+        before = self._overrides
+        self._overrides = {}
+        self._settings.clear()
+        servers = self._load(rows)
+        changed = {}
+        for guild_id in before.keys() | self._overrides.keys():
+            old, new = before.get(guild_id, {}), self._overrides.get(guild_id, {})
+            names = {name for name in SETTINGS if old.get(name) != new.get(name)}
+            if names:
+                changed[guild_id] = names
+        return servers, changed
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _load(self, rows):
+        skipped = 0
+        for guild_id, name, value in rows:
+            try:
+                self._overrides.setdefault(guild_id, {})[name] = SETTINGS[name][0](value)
+            except (KeyError, ValueError):
+                skipped += 1  # A setting that no longer exists or a value edited by hand into nonsense
+        for guild_id in self._overrides:
+            self._rebuild(guild_id)
+        if skipped:
+            print(f"Guild settings: ignored {skipped} unknown or invalid stored values")
+        return len(self._overrides)
+
+    def _rebuild(self, guild_id):
+        overrides = self._overrides.get(guild_id)
+        if not overrides:
+            self._overrides.pop(guild_id, None)
+            self._settings.pop(guild_id, None)
+            return
+        self._settings[guild_id] = Settings({**self._default_values, **overrides})
+
+    def _read(self):
+        with self._lock:
+            return self._conn.execute("SELECT guild_id, name, value FROM guild_settings").fetchall()
+
+    def _write(self, guild_id, name, value):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO guild_settings (guild_id, name, value) VALUES (?, ?, ?)"
+                " ON CONFLICT (guild_id, name) DO UPDATE SET value = excluded.value",
+                (guild_id, name, value)
+            )
+            self._conn.commit()
+
+    def _delete(self, guild_id, name):
+        with self._lock:
+            if name is None:
+                self._conn.execute("DELETE FROM guild_settings WHERE guild_id = ?", (guild_id,))
+            else:
+                self._conn.execute("DELETE FROM guild_settings WHERE guild_id = ? AND name = ?", (guild_id, name))
+            self._conn.commit()
+
+
+def format_value(value):
+    """A setting's value as stored text (and as !config shows it)"""
+    if isinstance(value, frozenset):
+        return ", ".join(str(user_id) for user_id in sorted(value))
+    return str(value)  # Not :g for floats, which rounds to 6 significant digits
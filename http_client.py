@@ -0,0 +1,38 @@
+import aiohttp
+
+# Shared connection-pooled session for every outbound HTTP call (humorapi, OpenRouter).
+# Created in setup_hook once the event loop is running and closed when the bot shuts down.
+_session = None
+
+
+def start(limit, limit_per_host, timeout, keepalive_timeout, trace_configs=None):
+    """Create the shared session (safe to call more than once)"""
+    global _session
+    if _session is None or _session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=limit,  # Total open connections
+            limit_per_host=limit_per_host,  # So one slow API can't take the whole pool
+            keepalive_timeout=keepalive_timeout,  # Reuse idle connections instead of reconnecting
+            ttl_dns_cache=300,
+        )
+        _session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=timeout),
+            trace_configs=trace_configs,  # Hooks for per-request metrics
+        )
+    return _session
+
+
+def session():
+    """Return the shared session, failing loudly if the bot hasn't started it"""
+    if _session is None or _session.closed:
+        raise RuntimeError("HTTP client is not running - call http_client.start() first")
+    return _session
+
+
+async def close():
+    """Close the shared session and its pooled connections"""
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
@@ -0,0 +1,225 @@
+import asyncio
+import json
+import os
+import re
+import time
+
+import discord
+
+_KICK_PATH = re.compile(r'/guilds/(\d+)/members/\d+$')  # DELETE on this route is a kick
+
+
+class KickPacer:
+    """Paces kicks from the rate limit headers Discord sends back.
+
+    Every kick response carries how many requests are left in its bucket and
+    when the bucket resets. Kicks go out as fast as that allows and wait for
+    the reset once the bucket is empty, instead of sleeping a fixed second
+    after each one. Until the first response comes back nothing is known,
+    so the first few kicks go straight out.
+    """
+
+    def __init__(self):
+        self._buckets = {}  # guild_id -> [requests remaining, monotonic time the bucket resets]
+
+    def attach(self, trace):
+        """Watch the responses going through discord.py's http_trace TraceConfig"""
+        trace.on_request_end.append(self._on_request_end)
+
+    def update(self, guild_id, remaining, reset_after, now):
+        """Record what Discord said about a guild's kick bucket"""
+        self._buckets[guild_id] = [remaining, now + reset_after]
+
+    async def wait(self, guild_id):
+        """Wait until the guild's kick bucket has room, then claim a request from it"""
+        while True:
+            bucket = self._buckets.get(guild_id)
+            now = time.monotonic()
+            if bucket is None or now >= bucket[1]:
+                return
+            if bucket[0] > 0:
+                bucket[0] -= 1
+                return
+            await asyncio.sleep(bucket[1] - now)
+
+    async def _on_request_end(self, session, ctx, params):
+        if params.method != 'DELETE':
+            return
+        match = _KICK_PATH.search(params.url.path)
+        if match is None:
+            return
+        headers = params.response.headers
+        guild_id = int(match.group(1))
+        if params.response.status == 429:
+            self.update(guild_id, 0, float(headers.get('Retry-After', 1)), time.monotonic())
+        elif 'X-RateLimit-Remaining' in headers:
+            self.update(guild_id, int(headers['X-RateLimit-Remaining']),
+                        float(headers.get('X-RateLimit-Reset-After', 0)), time.monotonic())
+
+
+class KickCheckpoint:
+    """On-disk record of a nuke in progress, so an interrupted one can resume.
+
+    A JSON-lines file per guild: the first line lists every target and when
+    they were picked, and each line after that is one finished target,
+    appended as soon as it is done. A crash loses at most the kicks that were
+    in flight, and those members are gone from the server on resume, so they
+    are counted as kicked.
+    """
+
+    def __init__(self, directory, guild_id):
+        self.path = os.path.join(directory, f"nuke-{guild_id}.jsonl")
+        self.summary = ""  # How the targets were found, for the final report
+        self.created_at = None  # Unix time the targets were picked (None in checkpoints written before it was saved)
+        self.targets = []  # [member_id, name, days inactive]
+        self.kicked = []  # (name, days)
+        self.failed = []  # (name, reason)
+        self.skipped = []  # (name, reason) - no longer targets when the nuke resumed
+        self._done = set()  # Member IDs with an outcome
+        self._file = None
+
+    @classmethod
+    def load(cls, directory, guild_id):
+        """The unfinished checkpoint for a guild, or None if there isn't one"""
+        checkpoint = cls(directory, guild_id)
+        try:
+            with open(checkpoint.path) as f:
+                lines = f.read().splitlines()
+        except FileNotFoundError:
+            return None
+        for line in lines:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue  # Half-written line from a crash
+            if 'targets' in entry:
+                checkpoint.summary = entry['summary']
+                checkpoint.created_at = entry.get('created_at')
+                checkpoint.targets = entry['targets']
+            else:
+                checkpoint._apply(entry)
+        if not checkpoint.targets:
+            return None
+        return checkpoint
+
+    def begin(self, targets, summary, created_at):
+        """Start a new checkpoint for the given [member_id, name, days] targets"""
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        self.summary = summary
+        self.targets = targets
+        self.created_at = created_at
+        with open(self.path, 'w') as f:
+            f.write(json.dumps({'summary': summary, 'created_at': created_at, 'targets': targets}) + '\n')
+
+    def age(self, now):
+        """Seconds since the targets were picked (infinite if the checkpoint doesn't say)"""
+        return now - self.created_at if self.created_at is not None else float('inf')
+
+    def record(self, member_id, name, outcome, detail):
+        """Save one finished target; outcome is 'kicked' (detail = days), 'failed' or 'skipped' (detail = reason)"""
+        entry = {'id': member_id, 'name': name, 'outcome': outcome, 'detail': detail}
+        self._apply(entry)
+        if self._file is None:
+            self._file = open(self.path, 'a')
+        self._file.write(json.dumps(entry) + '\n')
+        self._file.flush()
+
+    def remaining(self):
+        """Targets without an outcome yet"""
+        return [target for target in self.targets if target[0] not in self._done]
+
+    def finish(self):
+        """The nuke is over; delete the checkpoint"""
+        self.close()
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _apply(self, entry):
+        self._done.add(entry['id'])
+        if entry['outcome'] == 'kicked':
+            self.kicked.append((entry['name'], entry['detail']))
+        elif entry['outcome'] == 'skipped':
+            self.skipped.append((entry['name'], entry['detail']))
+        else:
+            self.failed.append((entry['name'], entry['detail']))
+
+
+async def run_kicks(guild, checkpoint, pacer, concurrency, precheck, reason, on_progress, progress_interval, members):
+    """Kick every remaining checkpoint target with a bounded pool of workers.
+
+    members is {member_id: Member} for targets already resolved while
+    finding them; anyone else is looked up in the cache or fetched one at
+    a time. precheck(member) returns why a member can't be kicked, or None. Progress
+    is reported through on_progress(checkpoint) at most once every
+    progress_interval seconds, plus once at the end.
+    """
+    queue = asyncio.Queue()
+    for target in checkpoint.remaining():
+        queue.put_nowait(target)
+
+    async def worker():
+        while True:
+            try:
+                member_id, name, days = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            member = members.get(member_id) or guild.get_member(member_id)
+            if member is None and not guild.chunked:
+                try:
+                    member = await guild.fetch_member(member_id)  # Not cached (see MEMBER_CACHE)
+                except discord.NotFound:
+                    pass
+                except discord.HTTPException as e:
+                    checkpoint.record(member_id, name, 'failed', str(e))
+                    continue
+            if member is None:
+                # Already left, or kicked just before an interruption
+                checkpoint.record(member_id, name, 'kicked', days)
+                continue
+            blocked = precheck(member)
+            if blocked:
+                print(f"NUKE: Cannot kick {name} - {blocked}")
+                checkpoint.record(member_id, name, 'failed', blocked)
+                continue
+            try:
+                await pacer.wait(guild.id)
+                await member.kick(reason=reason.format(days=days))
+                checkpoint.record(member_id, name, 'kicked', days)
+                print(f"NUKE: Kicked {name} ({days} days inactive)")
+            except discord.Forbidden:
+                checkpoint.record(member_id, name, 'failed', "No permission")
+                print(f"NUKE: Failed to kick {name} - permission denied")
+            except Exception as e:
+                checkpoint.record(member_id, name, 'failed', str(e))
+                print(f"NUKE: Error kicking {name}: {e}")
+
+    async def report():
+        shown = None
+        while True:
+            await asyncio.sleep(progress_interval)
+            done = len(checkpoint.targets) - len(checkpoint.remaining())
+            if done != shown:
+                shown = done
+                await _show_progress(on_progress, checkpoint)
+
+    reporter = asyncio.create_task(report())
+    try:
+        await asyncio.gather(*(worker() for _ in range(min(concurrency, queue.qsize()))))
+    finally:
+        reporter.cancel()
+    await _show_progress(on_progress, checkpoint)
+
+
+async def _show_progress(on_progress, checkpoint):
+    try:
+        await on_progress(checkpoint)
+    except Exception as e:
+        # A failed progress edit shouldn't stop the kicks
+        print(f"NUKE: Could not update progress: {e}")
@@ -0,0 +1,94 @@
+"""Run the bot's gateway shards across several processes.
+
+Each child is a normal `python bot.py` with SHARD_COUNT and its own
+SHARD_IDS set, so every process holds only its share of the guilds. Rate
+limits and mutes must then live in Redis (STATE_STORE=redis) so a user's
+cooldown follows them across shards; activity and scan data stay in the
+shared SQLite file, which is safe because each guild belongs to exactly one
+shard. A child that crashes is restarted after RESTART_DELAY seconds, and
+SIGTERM/SIGINT are passed on so every child shuts down cleanly.
+
+    SHARD_COUNT=4 SHARD_PROCESSES=2 STATE_STORE=redis python launcher.py
+"""
+import asyncio
+import os
+import signal
+import sys
+
+from config import SHARD_COUNT, SHARD_PROCESSES, STATE_STORE, METRICS_PORT, RECORD_EVENTS_PATH
+
+RESTART_DELAY = 10  # Seconds before a crashed shard process is started again
+
+
+def split_shards(shard_count, processes):
+    """Contiguous runs of shard ids, one per process, as even as possible"""
+    per_process, extra = divmod(shard_count, processes)
+    groups = []
+    start = 0
+    for i in range(processes):
+        size = per_process + (1 if i < extra else 0)
+        groups.append(list(range(start, start + size)))
+        start += size
+    return groups
+
+
+def numbered_path(path, index):
+    """'events.bin.gz' -> 'events.1.bin.gz'"""
+    directory, name = os.path.split(path)
+    stem, dot, extensions = name.partition('.')
+    return os.path.join(directory, f"{stem}.{index}{dot}{extensions}")
+
+
+async def run_shard(index, shard_ids, shard_count, stopping):
+    """Keep one bot process running its shards until the launcher is stopped"""
+    env = dict(os.environ)
+    env['SHARD_COUNT'] = str(shard_count)
+    env['SHARD_IDS'] = ','.join(str(i) for i in shard_ids)
+    if METRICS_PORT:
+        env['METRICS_PORT'] = str(METRICS_PORT + index)  # One /metrics endpoint per process
+    if RECORD_EVENTS_PATH:
+        env['RECORD_EVENTS_PATH'] = numbered_path(RECORD_EVENTS_PATH, index)  # Each process writes its own recording
+    bot_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bot.py')
+    while not stopping.is_set():
+        print(f"Launcher: starting process {index} with shards {shard_ids}")
+        process = await asyncio.create_subprocess_exec(sys.executable, bot_path, env=env)
+        stopper = asyncio.create_task(stopping.wait())
+        waiter = asyncio.create_task(process.wait())
+        await asyncio.wait((stopper, waiter), return_when=asyncio.FIRST_COMPLETED)
+        if stopping.is_set():
+            waiter.cancel()
+            if process.returncode is None:
+                process.terminate()  # bot.py closes cleanly on SIGTERM
+                await process.wait()
+            print(f"Launcher: process {index} stopped")
+            return
+        stopper.cancel()
+        print(f"Launcher: process {index} exited with code {process.returncode}, restarting in {RESTART_DELAY}s")
+        try:
+            await asyncio.wait_for(stopping.wait(), RESTART_DELAY)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def main():
+    shard_count = SHARD_COUNT or SHARD_PROCESSES
+    processes = min(SHARD_PROCESSES, shard_count)
+    if processes > 1 and STATE_STORE != 'redis':
+        print("Launcher: several processes need STATE_STORE=redis so rate limits and mutes are shared")
+        sys.exit(1)
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        try:
+            loop.add_signal_handler(sig, stopping.set)
+        except NotImplementedError:
+            pass  # Signal handlers are not available on Windows
+    print(f"Launcher: {shard_count} shards across {processes} processes")
+    await asyncio.gather(*(
+        run_shard(index, shard_ids, shard_count, stopping)
+        for index, shard_ids in enumerate(split_shards(shard_count, processes))
+    ))
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
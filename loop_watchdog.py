@@ -0,0 +1,215 @@
+"""Finds out what the bot is doing when it stops responding.
+
+Two things can freeze it: code that blocks the event loop (a synchronous
+call, a long loop without an await), and handlers that take a long time
+because they keep awaiting something slow. The Watchdog catches both:
+
+- A heartbeat task stamps the time on every loop iteration it gets, and a
+  separate thread checks the stamp. If the loop hasn't run for
+  stall_threshold seconds the thread grabs the loop thread's Python stack,
+  which is exactly the code that is blocking it.
+- on_message calls are tracked while they run. One still running after
+  handler_threshold seconds has its coroutine chain captured, showing the
+  await it is stuck on. Time spent inside waiting_for_user() (a command
+  waiting for someone to confirm) doesn't count.
+
+Stalls and slow handlers (with the command they ran) go into a ring buffer
+for !profile slow. profile() is the on-demand sampling profiler behind
+!profile, writing folded stacks that flamegraph.pl or speedscope can read.
+"""
+import asyncio
+import os
+import signal
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, deque
+from contextlib import contextmanager
+
+import metrics
+
+
+class SlowEvent:
+    """One stall or slow handler, with the stack captured while it was happening"""
+
+    __slots__ = ('kind', 'label', 'started_at', 'duration', 'stack')
+
+    def __init__(self, kind, label, started_at, duration, stack):
+        self.kind = kind  # 'stall' (blocked loop) or 'handler' (slow on_message)
+        self.label = label  # Command name, or what was running
+        self.started_at = started_at  # Epoch seconds
+        self.duration = duration  # Seconds, None while still going
+        self.stack = stack  # Formatted stack, or None if it finished before one was taken
+
+
+class Watchdog:
+    def __init__(self, interval, stall_threshold, handler_threshold, kept):
+        self.interval = interval
+        self.stall_threshold = stall_threshold
+        self.handler_threshold = handler_threshold
+        self.events = deque(maxlen=kept)  # Newest last
+        self.loop_thread_id = None
+        self._beat = time.monotonic()
+        self._active = {}  # Task -> [monotonic start, label, stack or None]
+        self._thread = None
+        self._stop = threading.Event()
+
+    def start(self):
+        """Start watching the running event loop (safe to call more than once)"""
+        if self._thread is not None:
+            return
+        self.loop_thread_id = threading.get_ident()
+        self._beat = time.monotonic()
+        asyncio.create_task(self._heartbeat())
+        self._thread = threading.Thread(target=self._watch, name='loop-watchdog', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def begin(self, label):
+        """Track the current task as a handler until end() (label is what shows in reports)"""
+        task = asyncio.current_task()
+        if task is not None:
+            self._active[task] = [time.monotonic(), label, None]
+
+    def relabel(self, label):
+        """Name what the current handler turned out to be, e.g. the command it dispatched"""
+        entry = self._active.get(asyncio.current_task())
+        if entry is not None:
+            entry[1] = label
+
+    @contextmanager
+    def waiting_for_user(self):
+        """Stop the current handler's clock inside this block, e.g. while a command waits for a reaction"""
+        task = asyncio.current_task()
+        entry = self._active.pop(task, None)
+        paused_at = time.monotonic()
+        try:
+            yield
+        finally:
+            if entry is not None:
+                entry[0] += time.monotonic() - paused_at
+                self._active[task] = entry
+
+    def end(self):
+        entry = self._active.pop(asyncio.current_task(), None)
+        if entry is None:
+            return
+        start, label, stack = entry
+        duration = time.monotonic() - start
+        if duration >= self.handler_threshold:
+            self.events.append(SlowEvent('handler', label, time.time() - duration, duration, stack))
+            metrics.slow_handlers.inc(label)
+            print(f"Watchdog: {label} took {duration:.1f}s")
+
+    async def _heartbeat(self):
+        while True:
+            self._beat = time.monotonic()
+            for task, entry in list(self._active.items()):
+                if entry[2] is None and self._beat - entry[0] >= self.handler_threshold:
+                    entry[2] = ''.join(traceback.format_list(coroutine_stack(task.get_coro())))
+                    print(f"Watchdog: {entry[1]} still running after {self.handler_threshold:.1f}s, waiting at:\n{entry[2]}")
+            await asyncio.sleep(self.interval)
+
+    def _watch(self):
+        stall = None
+        stalled_since = 0.0
+        while not self._stop.wait(self.interval):
+            beat = self._beat
+            blocked = time.monotonic() - beat - self.interval  # How late the next heartbeat is
+            if stall is None and blocked >= self.stall_threshold:
+                frame = sys._current_frames().get(self.loop_thread_id)
+                stack = ''.join(traceback.format_stack(frame)) if frame is not None else None
+                stalled_since = beat + self.interval
+                stall = SlowEvent('stall', _innermost(frame), time.time() - blocked, None, stack)
+                self.events.append(stall)
+                metrics.loop_stalls.inc()  # The loop thread is blocked, so nothing else is touching metrics
+                print(f"Watchdog: event loop blocked for {blocked:.1f}s in:\n{stack}")
+            elif stall is not None and beat > stalled_since:
+                stall.duration = beat - stalled_since
+                print(f"Watchdog: event loop running again after {stall.duration:.1f}s")
+                stall = None
+
+
+def coroutine_stack(coro):
+    """FrameSummaries from a coroutine down the chain of awaits it is suspended in"""
+    frames = []
+    while coro is not None:
+        frame = getattr(coro, 'cr_frame', None) or getattr(coro, 'gi_frame', None)
+        if frame is None:
+            break
+        frames.append(traceback.FrameSummary(frame.f_code.co_filename, frame.f_lineno, frame.f_code.co_name))
+        coro = getattr(coro, 'cr_await', None) or getattr(coro, 'gi_yieldfrom', None)
+    return frames
+
+
+def _innermost(frame):
+    if frame is None:
+        return "unknown"
+    return f"{frame.f_code.co_name} ({os.path.basename(frame.f_code.co_filename)}:{frame.f_lineno})"
+
+
+async def profile(seconds, interval):
+    """Sample the event loop thread's stack for `seconds`: Counter of folded stack -> samples.
+
+    Where it can, a SIGPROF timer interrupts the loop every `interval`
+    seconds of CPU time and the handler records the interrupted stack, so
+    samples land wherever the CPU actually is and idle time isn't sampled.
+    Elsewhere (Windows, or a loop off the main thread) a thread samples the
+    loop's stack instead; that only sees it at points where it releases the
+    GIL, so busy code that awaits often mostly shows up as `select`.
+    """
+    samples = Counter()
+    if hasattr(signal, 'setitimer') and threading.current_thread() is threading.main_thread():
+        def on_sample(signum, frame):
+            samples[_fold(frame)] += 1
+
+        previous = signal.signal(signal.SIGPROF, on_sample)
+        signal.setitimer(signal.ITIMER_PROF, interval, interval)
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            signal.setitimer(signal.ITIMER_PROF, 0)
+            signal.signal(signal.SIGPROF, previous)
+    else:
+        samples.update(await asyncio.to_thread(_sample_thread, threading.get_ident(), seconds, interval))
+    return samples
+
+
+def _sample_thread(thread_id, seconds, interval):
+    samples = Counter()
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        frame = sys._current_frames().get(thread_id)
+        if frame is not None:
+            samples[_fold(frame)] += 1
+        time.sleep(interval)
+    return samples
+
+
+def _fold(frame):
+    """A stack as one line, outermost call first: "main (bot.py:10);run (scanner.py:40)"."""
+    names = []
+    while frame is not None:
+        names.append(f"{frame.f_code.co_name} ({os.path.basename(frame.f_code.co_filename)}:{frame.f_code.co_firstlineno})")
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+def write_folded(samples, path):
+    """Write samples in the folded format flamegraph.pl and speedscope read"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w') as f:
+        for stack, count in samples.most_common():
+            f.write(f"{stack} {count}\n")
+
+
+def top_functions(samples, count):
+    """[(function, share of samples it was running in itself), ...], busiest first"""
+    own = Counter()
+    for stack, hits in samples.items():
+        own[stack.rsplit(';', 1)[-1]] += hits
+    total = sum(own.values()) or 1
+    return [(function, hits / total) for function, hits in own.most_common(count)]
@@ -0,0 +1,61 @@
+import asyncio
+
+import discord
+
+from activity_table import ActivityTable
+
+QUERY_BATCH = 100  # Most user IDs Discord resolves in one member query
+
+
+async def iter_members(guild):
+    """Every member of a guild, without building a list of them.
+
+    Comes straight from the member cache when it holds the whole guild;
+    with a smaller cache (see MEMBER_CACHE) the members are fetched from the
+    API a page at a time and not cached.
+    """
+    if guild.chunked:
+        for member in guild.members:
+            yield member
+    else:
+        async for member in guild.fetch_members(limit=None):
+            yield member
+
+
+async def build_activity_table(guild, last_seen, now):
+    """An ActivityTable of a guild's members, wherever they come from"""
+    table = ActivityTable()
+    async for member in iter_members(guild):
+        table.add(member, last_seen, now)
+    return table
+
+
+async def resolve_members(guild, member_ids):
+    """{member_id: Member} for the given IDs, from the cache or a member query for the rest (left members are missing)"""
+    found = {}
+    missing = []
+    for member_id in member_ids:
+        member = guild.get_member(member_id)
+        if member is not None:
+            found[member_id] = member
+        else:
+            missing.append(member_id)
+    for start in range(0, len(missing), QUERY_BATCH):
+        batch = missing[start:start + QUERY_BATCH]
+        try:
+            members = await guild.query_members(user_ids=batch, limit=len(batch), cache=False)
+        except (asyncio.TimeoutError, discord.ClientException) as e:
+            print(f"Member query failed in '{guild.name}': {e}")
+            break
+        for member in members:
+            found[member.id] = member
+    return found
+
+
+async def display_names(guild, member_ids):
+    """{member_id: display name} for the given IDs, "Unknown" for anyone not found"""
+    members = await resolve_members(guild, member_ids)
+    return {
+        member_id: members[member_id].display_name if member_id in members else "Unknown"
+        for member_id in member_ids
+    }
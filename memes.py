@@ -0,0 +1,146 @@
+import asyncio
+import random
+import time
+from collections import deque
+
+import http_client
+
+MEME_API_URL = "https://api.humorapi.com/memes/random"
+
+
+class MemeBuffer:
+    """Bounded buffer of prefetched meme URLs so !meme can answer from memory.
+
+    A background task fills the buffer once at startup and then refills it
+    in bulk when pop() leaves it below low_water, backing off when the API
+    reports errors or an exhausted quota. Memes that have been sitting
+    around longer than max_age are dropped but not replaced: an idle bot
+    shouldn't spend its API quota keeping a buffer fresh that nobody reads,
+    so the buffer only fills again once !meme is used.
+    """
+
+    def __init__(self, api_key, size, low_water, max_age, max_backoff):
+        self.api_key = api_key
+        self.size = size
+        self.low_water = low_water
+        self.max_age = max_age
+        self.max_backoff = max_backoff
+        self._memes = deque()  # (fetched_at, url), oldest first
+        self._wake = asyncio.Event()
+        self._wanted = True  # Refill when low; set by pop(), cleared once the buffer has been refilled
+        self._retry_at = 0.0  # Don't call the API again before this monotonic time
+        self._backoff = 0  # Current backoff in seconds, 0 when healthy
+        self._failure_status = None  # Status of the failure behind the current backoff (None for a network error)
+        self._task = None
+
+    def start(self):
+        """Start the background refill task (safe to call more than once)"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def pop(self):
+        """Return a prefetched meme URL, or None if the buffer is empty"""
+        self._drop_stale()
+        url = self._memes.popleft()[1] if self._memes else None
+        if len(self._memes) < self.low_water:
+            self._wanted = True
+            self._wake.set()
+        return url
+
+    async def fetch(self):
+        """Fetch one meme straight from the API, returning (status, url or None).
+
+        While backing off (errors, an exhausted quota or Retry-After) the API
+        isn't called at all and the status that started the backoff comes back.
+        """
+        if time.monotonic() < self._retry_at:
+            return self._failure_status or "unavailable", None
+        status, url, retry_after = await self._request()
+        if url is None or status == 402:
+            self._note_failure(status, retry_after)
+        return status, url
+
+    async def _request(self):
+        async with http_client.session().get(MEME_API_URL, params={"api-key": self.api_key}) as response:
+            retry_after = response.headers.get("Retry-After")
+            if response.status != 200:
+                return response.status, None, retry_after
+            data = await response.json()
+            if response.headers.get("X-API-Quota-Left") == "0":
+                # This was the last call the quota allows; report it like an exhausted quota
+                return 402, data['url'], retry_after
+            return response.status, data['url'], retry_after
+
+    async def _run(self):
+        while True:
+            self._drop_stale()
+            now = time.monotonic()
+            if self._wanted and len(self._memes) < self.low_water and now >= self._retry_at:
+                await self._refill()
+                continue
+
+            # Sleep until woken by pop(), the backoff ends, or the oldest meme goes stale
+            timeout = None
+            if self._memes:
+                timeout = max(0, self._memes[0][0] + self.max_age - now)
+            if self._wanted and now < self._retry_at:
+                timeout = self._retry_at - now if timeout is None else min(timeout, self._retry_at - now)
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _refill(self):
+        """Top the buffer up to size with concurrent requests"""
+        needed = self.size - len(self._memes)
+        results = await asyncio.gather(*(self._request() for _ in range(needed)), return_exceptions=True)
+
+        fetched = 0
+        failure = None  # (status, retry_after) of the worst failure in this batch
+        seen = {url for _, url in self._memes}
+        for result in results:
+            if isinstance(result, Exception):
+                print(f"Error prefetching meme: {result}")
+                failure = failure or (None, None)
+                continue
+            status, url, retry_after = result
+            if status != 200 and (failure is None or status == 402):
+                failure = (status, retry_after)
+            if url is not None and url not in seen:
+                self._memes.append((time.monotonic(), url))
+                seen.add(url)
+                fetched += 1
+
+        if len(self._memes) >= self.low_water:
+            self._wanted = False
+        if failure is not None:
+            # One backoff step per batch, not one per failed request
+            self._note_failure(*failure)
+        elif fetched == needed:
+            self._backoff = 0
+        elif fetched == 0:
+            # Only duplicates came back; don't spin on the API
+            self._note_failure(None, None)
+        print(f"Meme buffer refilled with {fetched}/{needed} memes ({len(self._memes)} buffered)")
+
+    def _note_failure(self, status, retry_after):
+        """Back off exponentially, or for as long as the API asks"""
+        if status == 402:
+            # humorapi answers 402 once the daily quota is used up
+            delay = self.max_backoff
+        elif retry_after is not None and retry_after.isdigit():
+            delay = int(retry_after)
+        else:
+            delay = min(self.max_backoff, max(5, self._backoff * 2))
+        self._backoff = max(self._backoff, delay)
+        self._failure_status = status
+        # Jitter so a restart doesn't line every retry up on the same second
+        self._retry_at = max(self._retry_at, time.monotonic() + delay * random.uniform(1, 1.25))
+        if status is not None:
+            print(f"Meme API returned {status}, pausing prefetch for {delay}s")
+
+    def _drop_stale(self):
+        cutoff = time.monotonic() - self.max_age
+        while self._memes and self._memes[0][0] < cutoff:
+            self._memes.popleft()
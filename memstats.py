@@ -0,0 +1,93 @@
+"""Rough memory accounting for the !memory diagnostic.
+
+deep_size() follows an object's references (dict entries, sequence items,
+__dict__ and __slots__) and adds up sys.getsizeof for everything it reaches
+that hasn't been counted yet. Big caches are measured on a sample of their
+entries and scaled up, so a report stays cheap enough to run on the event
+loop even with tens of thousands of members cached.
+"""
+import itertools
+import sys
+import types
+from array import array
+
+_LEAVES = (str, bytes, bytearray, int, float, complex, type(None), array, range)
+_NOT_DATA = (
+    type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType, types.MethodType,
+    types.CodeType, types.FrameType, types.CoroutineType, types.GeneratorType,
+)
+
+
+def deep_size(obj, seen):
+    """Bytes held by obj and everything it references, skipping object ids in seen (which it adds to)"""
+    total = 0
+    stack = [obj]
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or isinstance(obj, _NOT_DATA):
+            continue
+        seen.add(id(obj))
+        total += sys.getsizeof(obj)
+        if isinstance(obj, _LEAVES):
+            continue
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)) or hasattr(obj, 'popleft'):
+            stack.extend(obj)
+        else:
+            attrs = getattr(obj, '__dict__', None)
+            if attrs is not None:
+                stack.append(attrs)
+            for cls in type(obj).__mro__:
+                slots = cls.__dict__.get('__slots__', ())
+                for slot in (slots,) if isinstance(slots, str) else slots:
+                    value = getattr(obj, slot, None)
+                    if value is not None:
+                        stack.append(value)
+    return total
+
+
+def measure(containers, seen, sample):
+    """(entries, estimated bytes) for one or more dicts/lists/deques/sets, measuring at most `sample` entries"""
+    count = sum(len(container) for container in containers)
+    overhead = sum(sys.getsizeof(container) for container in containers)
+    entries = itertools.chain.from_iterable(
+        container.items() if isinstance(container, dict) else ((entry,) for entry in container)
+        for container in containers
+    )  # Each entry as the parts to measure: (key, value) for a dict, (item,) otherwise
+    measured = taken = 0
+    for parts in itertools.islice(entries, sample):
+        measured += sum(deep_size(part, seen) for part in parts)
+        taken += 1
+    if taken:
+        overhead += measured * count // taken
+    return count, overhead
+
+
+def process_rss():
+    """(current, peak) resident set size in bytes; current is None where /proc isn't available"""
+    current = None
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    current = int(line.split()[1]) * 1024
+                    break
+    except OSError:
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        peak *= 1 if sys.platform == 'darwin' else 1024  # Bytes on macOS, KiB on Linux
+    except ImportError:
+        peak = None  # Not available on Windows
+    return current, peak
+
+
+def format_bytes(size):
+    if size is None:
+        return "n/a"
+    if size < 1024 * 1024:
+        return f"{size / 1024:.1f} KB"
+    return f"{size / (1024 * 1024):.1f} MB"
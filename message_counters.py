@@ -0,0 +1,120 @@
+import heapq
+from operator import itemgetter
+
+HOUR = 3600
+DAY = 86400
+
+# Window name -> (bucket width in seconds, number of buckets merged)
+WINDOWS = {
+    '24h': (HOUR, 24),
+    '7d': (DAY, 7),
+    '30d': (DAY, 30),
+}
+
+
+class _Ring:
+    """A fixed number of time buckets of one width, reused in rotation.
+
+    Bucket n (epoch seconds // width) lives in slot n % size. When a slot is
+    reached again it still holds the bucket from `size` buckets ago, which
+    is thrown away, so old counts drop out without any cleanup pass.
+    """
+
+    __slots__ = ('width', 'size', '_epochs', '_counts')
+
+    def __init__(self, width, size):
+        self.width = width
+        self.size = size
+        self._epochs = [-1] * size  # Bucket number held in each slot
+        self._counts = [None] * size  # member_id -> messages in that bucket
+
+    def add(self, epoch, member_id, amount):
+        slot = epoch % self.size
+        if self._epochs[slot] != epoch:
+            if epoch < self._epochs[slot]:
+                return  # Older than anything the ring still holds
+            self._epochs[slot] = epoch
+            self._counts[slot] = {}
+        counts = self._counts[slot]
+        counts[member_id] = counts.get(member_id, 0) + amount
+
+    def buckets(self, current, count):
+        """(bucket number, counts) for the last `count` buckets up to `current` that have data"""
+        for epoch in range(current - count + 1, current + 1):
+            slot = epoch % self.size
+            if self._epochs[slot] == epoch:
+                yield epoch, self._counts[slot]
+
+
+class MessageCounters:
+    """Per-guild, per-member message counts in hourly and daily ring buckets.
+
+    Counting a message is two dict increments. A windowed top-k merges at
+    most 30 buckets and picks the top members with a heap, so it costs the
+    same no matter how much history the window covers.
+    """
+
+    def __init__(self):
+        self._rings = {}  # (guild_id, width) -> _Ring
+
+    def add(self, guild_id, member_id, timestamp, amount=1):
+        """Count `amount` messages by a member at the given epoch timestamp"""
+        for width in (HOUR, DAY):
+            self.add_bucket(guild_id, width, int(timestamp // width), member_id, amount)
+
+    def add_bucket(self, guild_id, width, epoch, member_id, amount):
+        """Add to one bucket directly (used when loading saved counts)"""
+        ring = self._rings.get((guild_id, width))
+        if ring is None:
+            ring = self._rings[(guild_id, width)] = _Ring(width, _ring_size(width))
+        ring.add(epoch, member_id, amount)
+
+    def top(self, guild_id, window, k, now):
+        """Top k members in a window: ([(member_id, count), ...], total messages, start of the oldest bucket with data)"""
+        totals, oldest = self.totals(guild_id, window, now)
+        top = heapq.nlargest(k, totals.items(), key=itemgetter(1))
+        return top, sum(totals.values()), oldest
+
+    def totals(self, guild_id, window, now):
+        """Every member's count in a window: ({member_id: count}, start of the oldest bucket with data)"""
+        width, count = WINDOWS[window]
+        ring = self._rings.get((guild_id, width))
+        if ring is None:
+            return {}, None
+        totals = {}
+        oldest = None
+        for epoch, counts in ring.buckets(int(now // width), count):
+            if oldest is None:
+                oldest = epoch * width
+            for member_id, amount in counts.items():
+                totals[member_id] = totals.get(member_id, 0) + amount
+        return totals, oldest
+
+    def counts_for(self, guild_id, window, member_ids, now):
+        """{member_id: count} in a window for just the given members (those with no messages are left out)"""
+        width, count = WINDOWS[window]
+        ring = self._rings.get((guild_id, width))
+        counts = {}
+        if ring is None:
+            return counts
+        for _, bucket in ring.buckets(int(now // width), count):
+            for member_id in member_ids:
+                amount = bucket.get(member_id)
+                if amount:
+                    counts[member_id] = counts.get(member_id, 0) + amount
+        return counts
+
+    def forget_guild(self, guild_id):
+        """Drop every count for a guild"""
+        for width in (HOUR, DAY):
+            self._rings.pop((guild_id, width), None)
+
+
+def _ring_size(width):
+    """Buckets needed for the longest window using this width"""
+    return max(count for window_width, count in WINDOWS.values() if window_width == width)
+
+
+def retention(width):
+    """Seconds of history the ring for a bucket width keeps"""
+    return width * _ring_size(width)
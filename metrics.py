@@ -0,0 +1,189 @@
+"""Prometheus-style metrics served over a small local HTTP endpoint.
+
+Just enough of the Prometheus text format for counters, gauges and
+histograms, so there is no extra dependency. Metrics are module-level
+objects that other modules import and update directly.
+"""
+import asyncio
+import bisect
+import time
+
+import aiohttp
+from aiohttp import web
+
+_metrics = []  # Every metric, in the order it was created
+_runner = None  # aiohttp AppRunner while the endpoint is up
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(labels)
+        self._values = {}  # label values tuple -> value
+        _metrics.append(self)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} {self.kind}']
+        for label_values, value in sorted(self._values.items()):
+            lines.append(f'{self.name}{_format_labels(self.label_names, label_values)} {value}')
+        return lines
+
+
+class Counter(_Metric):
+    """A value that only goes up"""
+    kind = 'counter'
+
+    def inc(self, *label_values, amount=1):
+        self._values[label_values] = self._values.get(label_values, 0) + amount
+
+
+class Gauge(_Metric):
+    """A value that can go up and down"""
+    kind = 'gauge'
+
+    def set(self, value, *label_values):
+        self._values[label_values] = value
+
+
+class Histogram(_Metric):
+    """Observations counted into cumulative buckets, plus their sum and count"""
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *label_values):
+        state = self._values.get(label_values)
+        if state is None:
+            # Per-bucket (non-cumulative) counts, then sum and count
+            state = self._values[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        state[0][bisect.bisect_left(self.buckets, value)] += 1
+        state[1] += value
+        state[2] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} {self.kind}']
+        for label_values, (counts, total, count) in sorted(self._values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.label_names, label_values, f'le="{bound}"')
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = _format_labels(self.label_names, label_values)
+            lines.append(f'{self.name}_sum{labels} {total}')
+            lines.append(f'{self.name}_count{labels} {count}')
+        return lines
+
+
+def render():
+    """All metrics in the Prometheus text exposition format"""
+    lines = []
+    for metric in _metrics:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+# Metrics updated from around the bot
+command_latency = Histogram('bot_command_duration_seconds', 'Time spent handling a command', ['command'])
+commands_total = Counter('bot_commands_total', 'Commands dispatched', ['command'])
+scan_messages = Counter('bot_scan_messages_total', 'Messages read by history scans', ['guild', 'channel'])
+scan_rate = Gauge('bot_scan_messages_per_second', 'Messages per second in the last scan of each channel', ['guild', 'channel'])
+discord_requests = Counter('bot_discord_requests_total', 'Discord REST API calls by status', ['status'])
+discord_rate_limits = Counter('bot_discord_rate_limited_total', 'Discord REST API calls answered with 429')
+http_latency = Histogram('bot_http_request_duration_seconds', 'Outbound HTTP latency by host', ['host'])
+http_requests = Counter('bot_http_requests_total', 'Outbound HTTP calls by host and status', ['host', 'status'])
+spam_mutes = Counter('bot_spam_mutes_total', 'Users muted for spamming')
+slow_handlers = Counter('bot_slow_handlers_total', 'on_message calls slower than the watchdog threshold', ['handler'])
+loop_stalls = Counter('bot_event_loop_stalls_total', 'Times the event loop was blocked past the watchdog threshold')
+loop_lag = Gauge('bot_event_loop_lag_seconds', 'Most recent event loop lag measurement')
+loop_lag_histogram = Histogram('bot_event_loop_lag_distribution_seconds', 'Event loop lag measurements',
+                               buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5))
+ai_queue_depth = Gauge('bot_ai_queue_depth', 'AI jobs waiting for a worker')
+ai_jobs_running = Gauge('bot_ai_jobs_running', 'AI jobs being worked on')
+ai_queue_wait = Histogram('bot_ai_queue_wait_seconds', 'Time AI jobs waited for a worker',
+                          buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120))
+ai_jobs = Counter('bot_ai_jobs_total', 'AI jobs by outcome (completed, failed, rejected)', ['outcome'])
+ai_retries = Counter('bot_ai_retries_total', 'AI requests retried after a 429')
+
+
+def http_trace(requests_counter, latency_histogram=None, rate_limit_counter=None):
+    """aiohttp TraceConfig counting requests by status (and timing them by host, if given a histogram)"""
+
+    async def on_request_start(session, ctx, params):
+        ctx.start = time.perf_counter()
+
+    async def on_request_end(session, ctx, params):
+        status = params.response.status
+        host = params.url.host
+        if latency_histogram is not None:
+            latency_histogram.observe(time.perf_counter() - ctx.start, host)
+            requests_counter.inc(host, status)
+        else:
+            requests_counter.inc(status)
+        if status == 429 and rate_limit_counter is not None:
+            rate_limit_counter.inc()
+
+    async def on_request_exception(session, ctx, params):
+        if latency_histogram is not None:
+            latency_histogram.observe(time.perf_counter() - ctx.start, params.url.host)
+            requests_counter.inc(params.url.host, 'error')
+        else:
+            requests_counter.inc('error')
+
+    trace = aiohttp.TraceConfig()
+    trace.on_request_start.append(on_request_start)
+    trace.on_request_end.append(on_request_end)
+    trace.on_request_exception.append(on_request_exception)
+    return trace
+
+
+async def measure_loop_lag(interval):
+    """Sleep for interval over and over; however much later than that we wake up is loop lag"""
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lag = max(0.0, time.perf_counter() - start - interval)
+        loop_lag.set(lag)
+        loop_lag_histogram.observe(lag)
+
+
+async def start_server(host, port):
+    """Serve /metrics on host:port"""
+    global _runner
+    if _runner is not None:
+        return
+
+    async def handle_metrics(request):
+        return web.Response(text=render(), content_type='text/plain', charset='utf-8')
+
+    app = web.Application()
+    app.router.add_get('/metrics', handle_metrics)
+    _runner = web.AppRunner(app, access_log=None)
+    await _runner.setup()
+    await web.TCPSite(_runner, host, port).start()
+    print(f"Metrics available at http://{host}:{port}/metrics")
+
+
+async def stop_server():
+    """Shut the metrics endpoint down"""
+    global _runner
+    if _runner is not None:
+        await _runner.cleanup()
+        _runner = None
@@ -0,0 +1,86 @@
+import discord
+
+FIELD_LIMIT = 1024  # Discord's limit on one embed field value
+
+
+def field_value(lines):
+    """Join lines into one embed field value, cut at a line break if it would be over the limit"""
+    value = "\n".join(lines)
+    if len(value) <= FIELD_LIMIT:
+        return value
+    cut = value.rfind("\n", 0, FIELD_LIMIT - 2)
+    return value[:cut if cut > 0 else FIELD_LIMIT - 2] + "\n…"
+
+
+class PageView(discord.ui.View):
+    """Buttons that page through a long report, rendering each page when it is shown.
+
+    `await render(page)` builds the embed for a page number, so members on
+    pages nobody opens never get their names looked up. Only the member who
+    ran the command can turn pages. On timeout the buttons are removed and the
+    view drops render (and the report data it holds).
+    """
+
+    def __init__(self, page_count, render, user_id, timeout):
+        super().__init__(timeout=timeout)
+        self.page_count = page_count
+        self.render = render  # async fn(page number) -> discord.Embed
+        self.user_id = user_id
+        self.page = 0
+        self.message = None  # The message showing the view, once sent
+        self._update_buttons()
+
+    async def send(self, channel):
+        """Send the first page, with buttons only if there is more than one"""
+        if self.page_count <= 1:
+            self.stop()
+            return await channel.send(embed=await self.render(0))
+        self.message = await channel.send(embed=await self.render(0), view=self)
+        return self.message
+
+    async def interaction_check(self, interaction):
+        if interaction.user.id != self.user_id:
+            await interaction.response.send_message("❌ Only the person who ran this command can turn its pages.", ephemeral=True)
+            return False
+        return True
+
+    @discord.ui.button(label="⏮", style=discord.ButtonStyle.secondary)
+    async def first(self, interaction, button):
+        await self._show(interaction, 0)
+
+    @discord.ui.button(label="◀", style=discord.ButtonStyle.secondary)
+    async def back(self, interaction, button):
+        await self._show(interaction, self.page - 1)
+
+    @discord.ui.button(label="1/1", style=discord.ButtonStyle.secondary, disabled=True)
+    async def position(self, interaction, button):
+        pass  # Just shows the page number
+
+    @discord.ui.button(label="▶", style=discord.ButtonStyle.secondary)
+    async def forward(self, interaction, button):
+        await self._show(interaction, self.page + 1)
+
+    @discord.ui.button(label="⏭", style=discord.ButtonStyle.secondary)
+    async def last(self, interaction, button):
+        await self._show(interaction, self.page_count - 1)
+
+    async def on_timeout(self):
+        self.render = None
+        if self.message is not None:
+            try:
+                await self.message.edit(view=None)
+            except discord.HTTPException:
+                pass  # Message was deleted; nothing to clean up
+            self.message = None
+
+    async def _show(self, interaction, page):
+        self.page = max(0, min(self.page_count - 1, page))
+        self._update_buttons()
+        # Acknowledge the click first: Discord fails the interaction if rendering (member lookups) takes over 3 seconds
+        await interaction.response.defer()
+        await interaction.edit_original_response(embed=await self.render(self.page), view=self)
+
+    def _update_buttons(self):
+        self.first.disabled = self.back.disabled = self.page == 0
+        self.forward.disabled = self.last.disabled = self.page >= self.page_count - 1
+        self.position.label = f"{self.page + 1}/{self.page_count}"
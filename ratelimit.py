@@ -0,0 +1,230 @@
+import struct
+from collections import OrderedDict
+
+SNAPSHOT_MAGIC = b'RLS1'  # Format marker and version of RateLimiter.snapshot() output
+_COUNT = struct.Struct('<I')
+_INT = struct.Struct('<q')
+_LENGTH = struct.Struct('<H')
+_BUCKET = struct.Struct('<dd')  # tokens, updated_at
+_UNTIL = struct.Struct('<d')
+
+
+class RateLimiter:
+    """Token-bucket rate limiting for every safety check the bot makes.
+
+    Each named policy is a kind of bucket (per user, per guild, global, ...)
+    holding up to `capacity` tokens that refill evenly over `per_seconds`.
+    Refill is lazy: a bucket only stores its token count and when it was
+    last touched, and the refill is worked out on the next check, so there
+    are no timers and a check is a couple of dict lookups. A bucket that has
+    refilled completely is the same as no bucket, which is what lets sweep()
+    throw idle ones away.
+    """
+
+    def __init__(self, max_keys):
+        self.max_keys = max_keys  # Memory bound per policy; least recently used keys go first
+        self._policies = {}  # name -> (capacity, tokens refilled per second)
+        self._buckets = {}  # name -> OrderedDict key -> [tokens, updated_at], least recently used first
+        self._blocked = {}  # (name, key) -> time the block ends
+
+    def add_policy(self, name, capacity, per_seconds):
+        """Allow `capacity` tokens for each key of this policy, refilled over `per_seconds`"""
+        self._policies[name] = (capacity, capacity / per_seconds)
+        self._buckets[name] = OrderedDict()
+
+    def acquire(self, now, *requests):
+        """Take `cost` tokens from every (policy, key, cost) bucket, or from none of them.
+
+        Returns (True, 0, None) on success, otherwise (False, seconds until the
+        request would succeed, name of the policy that refused it).
+        """
+        levels = []
+        wait = 0
+        limited_by = None
+        for name, key, cost in requests:
+            tokens = self._tokens(name, key, now)
+            if tokens < cost:
+                needed = (cost - tokens) / self._policies[name][1]
+                if needed > wait:
+                    wait, limited_by = needed, name
+            levels.append(tokens)
+        if limited_by is not None:
+            return False, wait, limited_by
+
+        for (name, key, cost), tokens in zip(requests, levels):
+            self._store(name, key, tokens - cost, now)
+        return True, 0, None
+
+    def refund(self, now, *requests):
+        """Give back tokens taken by acquire() for work that never happened"""
+        for name, key, cost in requests:
+            capacity = self._policies[name][0]
+            self._store(name, key, min(capacity, self._tokens(name, key, now) + cost), now)
+
+    def block(self, name, key, seconds, now):
+        """Refuse everything for key under this policy for the given number of seconds"""
+        self._blocked[(name, key)] = now + seconds
+
+    def blocked_for(self, name, key, now):
+        """Seconds left on a block, or 0 if the key isn't blocked"""
+        until = self._blocked.get((name, key))
+        if until is None:
+            return 0
+        if now >= until:
+            del self._blocked[(name, key)]
+            return 0
+        return until - now
+
+    def sweep(self, now):
+        """Drop full buckets and expired blocks, returning how many entries were dropped"""
+        dropped = 0
+        for name, buckets in self._buckets.items():
+            capacity = self._policies[name][0]
+            for key in [key for key in buckets if self._tokens(name, key, now) >= capacity]:
+                del buckets[key]
+                dropped += 1
+        for block_key in [block_key for block_key, until in self._blocked.items() if now >= until]:
+            del self._blocked[block_key]
+            dropped += 1
+        return dropped
+
+    def snapshot(self, now):
+        """Pack the buckets still refilling and the blocks still running into bytes for restore().
+
+        Per policy: its name, then each bucket's key, tokens and last update;
+        then every block's (policy, key) and end time. Keys are ints, strings,
+        None or tuples of those, each written with a one-byte type tag.
+        """
+        out = [SNAPSHOT_MAGIC, _COUNT.pack(len(self._buckets))]
+        for name, buckets in self._buckets.items():
+            capacity = self._policies[name][0]
+            live = [(key, bucket) for key, bucket in buckets.items() if self._tokens(name, key, now) < capacity]
+            _pack_key(name, out)
+            out.append(_COUNT.pack(len(live)))
+            for key, (tokens, updated_at) in live:
+                _pack_key(key, out)
+                out.append(_BUCKET.pack(tokens, updated_at))
+        blocks = [(block_key, until) for block_key, until in self._blocked.items() if until > now]
+        out.append(_COUNT.pack(len(blocks)))
+        for block_key, until in blocks:
+            _pack_key(block_key, out)
+            out.append(_UNTIL.pack(until))
+        return b''.join(out)
+
+    def restore(self, state, now):
+        """Merge decoded snapshot state (see decode_snapshot) in, returning how many entries were kept.
+
+        Buckets that have refilled and blocks that have ended since the
+        snapshot are dropped, as are policies that no longer exist. Entries
+        already made since startup are newer, so they win over the snapshot.
+        """
+        buckets_by_policy, blocks = state
+        restored = 0
+        for name, saved in buckets_by_policy.items():
+            if name not in self._policies:
+                continue
+            capacity, rate = self._policies[name]
+            current = self._buckets[name]
+            merged = OrderedDict()  # Oldest first, so the LRU bound drops snapshot entries before live ones
+            for key, tokens, updated_at in sorted(saved, key=lambda entry: entry[2]):
+                if key not in current and tokens + (now - updated_at) * rate < capacity:
+                    merged[key] = [tokens, updated_at]
+            restored += len(merged)
+            merged.update(current)
+            self._buckets[name] = merged
+            while len(merged) > self.max_keys:
+                merged.popitem(last=False)
+        for name, key, until in blocks:
+            if name in self._policies and until > now and until > self._blocked.get((name, key), 0):
+                self._blocked[(name, key)] = until
+                restored += 1
+        return restored
+
+    def __len__(self):
+        return sum(len(buckets) for buckets in self._buckets.values()) + len(self._blocked)
+
+    def _tokens(self, name, key, now):
+        capacity, rate = self._policies[name]
+        bucket = self._buckets[name].get(key)
+        if bucket is None:
+            return capacity
+        return min(capacity, bucket[0] + (now - bucket[1]) * rate)
+
+    def _store(self, name, key, tokens, now):
+        buckets = self._buckets[name]
+        bucket = buckets.get(key)
+        if bucket is not None:
+            bucket[0] = tokens
+            bucket[1] = now
+            buckets.move_to_end(key)
+            return
+        buckets[key] = [tokens, now]
+        if len(buckets) > self.max_keys:
+            buckets.popitem(last=False)
+
+
+def decode_snapshot(data):
+    """Unpack RateLimiter.snapshot() bytes into ({policy: [(key, tokens, updated_at), ...]}, [(policy, key, until), ...])"""
+    if data[:len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+        raise ValueError("not a rate limiter snapshot")
+    pos = len(SNAPSHOT_MAGIC)
+    (policies,) = _COUNT.unpack_from(data, pos)
+    pos += _COUNT.size
+    buckets = {}
+    for _ in range(policies):
+        name, pos = _unpack_key(data, pos)
+        (count,) = _COUNT.unpack_from(data, pos)
+        pos += _COUNT.size
+        entries = buckets[name] = []
+        for _ in range(count):
+            key, pos = _unpack_key(data, pos)
+            tokens, updated_at = _BUCKET.unpack_from(data, pos)
+            pos += _BUCKET.size
+            entries.append((key, tokens, updated_at))
+    (count,) = _COUNT.unpack_from(data, pos)
+    pos += _COUNT.size
+    blocks = []
+    for _ in range(count):
+        (name, key), pos = _unpack_key(data, pos)
+        (until,) = _UNTIL.unpack_from(data, pos)
+        pos += _UNTIL.size
+        blocks.append((name, key, until))
+    return buckets, blocks
+
+
+def _pack_key(key, out):
+    if key is None:
+        out.append(b'N')
+    elif isinstance(key, int):
+        out.append(b'I' + _INT.pack(key))
+    elif isinstance(key, str):
+        raw = key.encode()
+        out.append(b'S' + _LENGTH.pack(len(raw)) + raw)
+    elif isinstance(key, tuple):
+        out.append(b'T' + bytes((len(key),)))
+        for part in key:
+            _pack_key(part, out)
+    else:
+        raise TypeError(f"can't snapshot rate limit key {key!r}")
+
+
+def _unpack_key(data, pos):
+    tag = data[pos:pos + 1]
+    pos += 1
+    if tag == b'N':
+        return None, pos
+    if tag == b'I':
+        return _INT.unpack_from(data, pos)[0], pos + _INT.size
+    if tag == b'S':
+        (length,) = _LENGTH.unpack_from(data, pos)
+        pos += _LENGTH.size
+        return data[pos:pos + length].decode(), pos + length
+    if tag == b'T':
+        count = data[pos]
+        pos += 1
+        parts = []
+        for _ in range(count):
+            part, pos = _unpack_key(data, pos)
+            parts.append(part)
+        return tuple(parts), pos
+    raise ValueError(f"bad key tag {tag!r} in rate limiter snapshot")
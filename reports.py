@@ -0,0 +1,82 @@
+import asyncio
+import time
+from datetime import datetime, timezone
+
+
+class InactivityReport:
+    """A finished !inactive report: how many members are in each tier and the most inactive few"""
+
+    __slots__ = ('guild_id', 'created_at', 'summary', 'member_count', 'tiers')
+
+    def __init__(self, guild_id, created_at, summary, member_count, tiers):
+        self.guild_id = guild_id
+        self.created_at = created_at  # Epoch seconds
+        self.summary = summary  # Where the data came from, e.g. "Scanned N messages across M channels"
+        self.member_count = member_count
+        self.tiers = tiers  # One (member ids, days inactive) pair of arrays per threshold, most inactive first
+
+    def age(self):
+        """Seconds since the report was built"""
+        return time.time() - self.created_at
+
+
+class ReportScheduler:
+    """Keeps the latest report per guild, rebuilt in the background.
+
+    Every `interval` seconds (only during off_peak_hours, if any are given)
+    each guild's report is rebuilt in turn, so a command can answer from the
+    snapshot straight away. Before a rebuild, estimate_pages(guild) says how
+    many history pages it would read and `await take_budget(guild_id, pages)`
+    must allow it; guilds over their API budget keep their old snapshot.
+    """
+
+    def __init__(self, build, estimate_pages, take_budget, interval, off_peak_hours=()):
+        self.build = build  # async fn(guild, progress) -> report
+        self.estimate_pages = estimate_pages
+        self.take_budget = take_budget
+        self.interval = interval
+        self.off_peak_hours = tuple(off_peak_hours)  # UTC hours; empty means any hour
+        self._snapshots = {}  # guild_id -> latest report
+        self._task = None
+
+    def start(self, client):
+        """Start rebuilding reports for every guild the client is in (safe to call more than once)"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(client))
+
+    def snapshot(self, guild_id):
+        """The latest report for a guild, or None"""
+        return self._snapshots.get(guild_id)
+
+    async def refresh(self, guild, progress=None):
+        """Build a guild's report now and keep it as the snapshot"""
+        report = await self.build(guild, progress)
+        self._snapshots[guild.id] = report
+        return report
+
+    def forget(self, guild_id):
+        self._snapshots.pop(guild_id, None)
+
+    async def _run(self, client):
+        await client.wait_until_ready()
+        while True:
+            hour = datetime.now(timezone.utc).hour
+            if not self.off_peak_hours or hour in self.off_peak_hours:
+                await self._refresh_all(client)
+            await asyncio.sleep(self.interval)
+
+    async def _refresh_all(self, client):
+        start = time.monotonic()
+        refreshed = 0
+        for guild in list(client.guilds):
+            pages = self.estimate_pages(guild)
+            allowed, wait = await self.take_budget(guild.id, pages)
+            if not allowed:
+                print(f"Report precompute: skipping '{guild.name}' ({pages} pages over its API budget for {wait:.0f}s)")
+                continue
+            try:
+                await self.refresh(guild)
+                refreshed += 1
+            except Exception as e:
+                print(f"Report precompute: error building report for '{guild.name}': {e}")
+        print(f"Report precompute: refreshed {refreshed}/{len(client.guilds)} servers in {time.monotonic() - start:.1f}s")
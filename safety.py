@@ -0,0 +1,110 @@
+import asyncio
+import struct
+import time
+
+from config import (
+    RATE_LIMIT_SECONDS, COOLDOWN_EXPENSIVE_COMMANDS, MAX_MESSAGES_PER_MINUTE, SPAM_MUTE_DURATION,
+    GUILD_EXPENSIVE_BUDGET, GLOBAL_EXPENSIVE_BUDGET, RATE_LIMIT_MAX_KEYS, SAFETY_SWEEP_INTERVAL,
+    REPORT_GUILD_PAGE_BUDGET, STATE_STORE, REDIS_URL, STATE_SNAPSHOT_PATH, STATE_SNAPSHOT_INTERVAL,
+)
+from state_store import MemoryStore, RedisStore
+
+# Token buckets for safety features (user -> guild -> global), shared by every shard when STATE_STORE is 'redis'
+if STATE_STORE == 'redis':
+    state_store = RedisStore(REDIS_URL)
+else:
+    state_store = MemoryStore(RATE_LIMIT_MAX_KEYS)
+state_store.add_policy('spam', MAX_MESSAGES_PER_MINUTE, 60)  # Messages per user
+state_store.add_policy('command', 1, RATE_LIMIT_SECONDS)  # Any command, per user
+state_store.add_policy('cooldown', 1, COOLDOWN_EXPENSIVE_COMMANDS)  # Each expensive command, per user
+state_store.add_policy('guild', GUILD_EXPENSIVE_BUDGET, 60)  # Expensive commands, per server
+state_store.add_policy('global', GLOBAL_EXPENSIVE_BUDGET, 60)  # Expensive commands, whole bot
+state_store.add_policy('background', REPORT_GUILD_PAGE_BUDGET, 86400)  # History pages read by background work, per server
+
+# Servers can change the spam, command and cooldown limits (see guild_settings.py); each limit in use gets its own policy
+_limit_policies = {
+    ('spam', MAX_MESSAGES_PER_MINUTE, 60): 'spam',
+    ('command', 1, RATE_LIMIT_SECONDS): 'command',
+    ('cooldown', 1, COOLDOWN_EXPENSIVE_COMMANDS): 'cooldown',
+}
+
+def limit_policy(kind, capacity, per_seconds):
+    """Name of the policy for one kind of bucket at the given limit, added the first time a server uses it"""
+    key = (kind, capacity, per_seconds)
+    name = _limit_policies.get(key)
+    if name is None:
+        # repr() keeps the exact values: :g rounds, so two close limits would share (and reconfigure) one policy
+        name = _limit_policies[key] = f"{kind}:{capacity!r}/{per_seconds!r}"
+        state_store.add_policy(name, capacity, per_seconds)
+    return name
+
+async def is_spam(user_id, policy='spam'):
+    """Check if a user is spamming based on message frequency"""
+    can_proceed, _, _ = await state_store.acquire(time.time(), (policy, user_id, 1))
+    return not can_proceed
+
+async def is_muted(user_id):
+    """Check if a user is temporarily muted for spamming"""
+    return await state_store.blocked_for('spam', user_id, time.time()) > 0
+
+async def mute_spammer(user_id):
+    """Ignore a user's messages for SPAM_MUTE_DURATION seconds"""
+    await state_store.block('spam', user_id, SPAM_MUTE_DURATION, time.time())
+
+async def check_rate_limit(user_id, policy='command'):
+    """Check if user is rate limited (basic cooldown between any commands)"""
+    can_proceed, wait_time, _ = await state_store.acquire(time.time(), (policy, user_id, 1))
+    return can_proceed, wait_time
+
+def expensive_command_buckets(user_id, guild_id, command_name, cost, policy):
+    """Buckets an expensive command draws from: the user's cooldown, then the server and global budgets"""
+    return (
+        (policy, (user_id, command_name), 1),
+        ('guild', guild_id, cost),
+        ('global', None, cost),
+    )
+
+async def check_command_cooldown(user_id, guild_id, command_name, cost, policy='cooldown'):
+    """Check if a specific command is on cooldown for a user, or its server or the bot is over budget"""
+    can_proceed, wait_time, _ = await state_store.acquire(time.time(), *expensive_command_buckets(user_id, guild_id, command_name, cost, policy))
+    return can_proceed, wait_time
+
+async def refund_command_cooldown(user_id, guild_id, command_name, cost, policy='cooldown'):
+    """Undo check_command_cooldown for a command that was turned away before doing any work"""
+    await state_store.refund(time.time(), *expensive_command_buckets(user_id, guild_id, command_name, cost, policy))
+
+async def take_background_budget(guild_id, pages):
+    """Spend history pages from a server's daily budget for background work (a job bigger than the whole budget never fits)"""
+    can_proceed, wait_time, _ = await state_store.acquire(time.time(), ('background', guild_id, pages))
+    return can_proceed, wait_time
+
+async def sweep_safety_state():
+    """Periodically drop idle rate limit buckets and expired mutes so memory stays flat"""
+    while True:
+        await asyncio.sleep(SAFETY_SWEEP_INTERVAL)
+        dropped = await state_store.sweep(time.time())
+        if dropped:
+            print(f"Safety sweep: dropped {dropped} idle rate limit entries")
+
+async def load_safety_state():
+    """Bring back the cooldowns and mutes saved before the last restart (anything expired since is dropped)"""
+    try:
+        restored = await state_store.load(STATE_SNAPSHOT_PATH, time.time())
+    except (OSError, ValueError, IndexError, struct.error) as e:
+        print(f"Could not load safety state from {STATE_SNAPSHOT_PATH}: {e}")
+        return
+    if restored:
+        print(f"Restored {restored} rate limit and mute entries from {STATE_SNAPSHOT_PATH}")
+
+async def save_safety_state():
+    """Write cooldowns and mutes to disk so a restart doesn't reset them"""
+    try:
+        await state_store.save(STATE_SNAPSHOT_PATH, time.time())
+    except OSError as e:
+        print(f"Could not save safety state to {STATE_SNAPSHOT_PATH}: {e}")
+
+async def snapshot_safety_state():
+    """Periodically save safety state, so even a crash loses at most STATE_SNAPSHOT_INTERVAL seconds of it"""
+    while True:
+        await asyncio.sleep(STATE_SNAPSHOT_INTERVAL)
+        await save_safety_state()
@@ -0,0 +1,105 @@
+import asyncio
+import sqlite3
+import threading
+from datetime import datetime, timezone
+
+from scanner import ScanResult
+
+
+class ScanStore:
+    """Scan results kept on disk so later scans only read new messages.
+
+    For each channel it remembers the newest message ID already counted (the
+    watermark), and for each member the running totals from every scan so
+    far. A rescan reads history after the watermarks and adds what it finds.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()  # Serializes access to the SQLite connection
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS scan_watermarks ("
+            " guild_id INTEGER NOT NULL,"
+            " channel_id INTEGER NOT NULL,"
+            " message_id INTEGER NOT NULL,"
+            " PRIMARY KEY (guild_id, channel_id)"
+            ") WITHOUT ROWID"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS scan_members ("
+            " guild_id INTEGER NOT NULL,"
+            " member_id INTEGER NOT NULL,"
+            " messages INTEGER NOT NULL,"
+            " last_seen REAL NOT NULL,"
+            " name TEXT NOT NULL,"
+            " PRIMARY KEY (guild_id, member_id)"
+            ") WITHOUT ROWID"
+        )
+        self._conn.commit()
+
+    async def load(self, guild_id):
+        """The stored totals for a guild as a ScanResult, with its watermarks"""
+        watermarks, members = await asyncio.to_thread(self._read, guild_id)
+        result = ScanResult()
+        result.watermarks = watermarks
+        result.channels_scanned = len(watermarks)
+        for member_id, messages, last_seen, name in members:
+            result.message_count += messages
+            result.message_counts[member_id] = messages
+            result.last_seen[member_id] = datetime.fromtimestamp(last_seen, timezone.utc)
+            result.names[member_id] = name
+        return result
+
+    async def add(self, guild_id, delta):
+        """Add a scan of new messages to the stored totals and move the watermarks forward"""
+        await asyncio.to_thread(self._write, guild_id, delta)
+
+    async def forget(self, guild_id):
+        """Delete everything stored for a guild"""
+        await asyncio.to_thread(self._delete, guild_id)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _read(self, guild_id):
+        with self._lock:
+            watermarks = dict(self._conn.execute(
+                "SELECT channel_id, message_id FROM scan_watermarks WHERE guild_id = ?", (guild_id,)
+            ))
+            members = self._conn.execute(
+                "SELECT member_id, messages, last_seen, name FROM scan_members WHERE guild_id = ?", (guild_id,)
+            ).fetchall()
+        return watermarks, members
+
+    def _write(self, guild_id, delta):
+        members = [
+            (guild_id, member_id, count, delta.last_seen[member_id].timestamp(), delta.names[member_id])
+            for member_id, count in delta.message_counts.items()
+        ]
+        watermarks = [(guild_id, channel_id, message_id) for channel_id, message_id in delta.watermarks.items()]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO scan_members (guild_id, member_id, messages, last_seen, name) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(guild_id, member_id) DO UPDATE SET "
+                "messages = messages + excluded.messages, "
+                "name = CASE WHEN excluded.last_seen >= last_seen THEN excluded.name ELSE name END, "
+                "last_seen = MAX(last_seen, excluded.last_seen)",
+                members
+            )
+            self._conn.executemany(
+                "INSERT INTO scan_watermarks (guild_id, channel_id, message_id) VALUES (?, ?, ?) "
+                "ON CONFLICT(guild_id, channel_id) DO UPDATE SET "
+                "message_id = MAX(message_id, excluded.message_id)",
+                watermarks
+            )
+            self._conn.commit()
+
+    def _delete(self, guild_id):
+        with self._lock:
+            self._conn.execute("DELETE FROM scan_watermarks WHERE guild_id = ?", (guild_id,))
+            self._conn.execute("DELETE FROM scan_members WHERE guild_id = ?", (guild_id,))
+            self._conn.commit()
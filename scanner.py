@@ -0,0 +1,262 @@
+import asyncio
+import time
+from collections import defaultdict
+
+import discord
+
+import metrics
+
+HISTORY_PAGE_SIZE = 100  # Messages per channel.history API request
+
+
+class ScanResult:
+    """Per-member activity collected from one or more channels"""
+
+    def __init__(self):
+        self.message_count = 0  # Non-bot messages seen
+        self.messages_read = 0  # Of those, how many the latest scan read from Discord (the rest were stored from earlier scans)
+        self.channels_scanned = 0
+        self.last_seen = {}  # member_id -> datetime of newest message
+        self.message_counts = defaultdict(int)  # member_id -> number of messages
+        self.names = {}  # member_id -> display name from their newest message
+        self.watermarks = {}  # channel_id -> newest message ID read (including bot messages)
+        self.incomplete = set()  # Channel IDs where the limit was reached before everything after `after` was read
+
+    def add_message(self, msg):
+        """Count one message (history is newest first, so the first one seen wins for names)"""
+        author_id = msg.author.id
+        self.message_count += 1
+        self.message_counts[author_id] += 1
+        if author_id not in self.last_seen or msg.created_at > self.last_seen[author_id]:
+            self.last_seen[author_id] = msg.created_at
+            self.names[author_id] = msg.author.display_name
+
+    def merge(self, other):
+        """Fold another (per-channel) result into this one"""
+        self.message_count += other.message_count
+        self.channels_scanned += other.channels_scanned
+        for member_id, count in other.message_counts.items():
+            self.message_counts[member_id] += count
+        for member_id, seen_at in other.last_seen.items():
+            if member_id not in self.last_seen or seen_at > self.last_seen[member_id]:
+                self.last_seen[member_id] = seen_at
+                self.names[member_id] = other.names[member_id]
+        for channel_id, message_id in other.watermarks.items():
+            if message_id > self.watermarks.get(channel_id, 0):
+                self.watermarks[channel_id] = message_id
+        self.incomplete |= other.incomplete
+
+
+class PagePacer:
+    """Spaces out history page requests shared by all scan workers.
+
+    discord.py already waits out 429s, but every 429 still costs a round trip
+    and counts against the invalid request limit, so stay under the global
+    request rate instead of hitting it.
+    """
+
+    def __init__(self, pages_per_second):
+        self._interval = 1 / pages_per_second
+        self._next_slot = 0.0
+
+    async def wait(self):
+        now = time.monotonic()
+        slot = max(now, self._next_slot)
+        self._next_slot = slot + self._interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+async def scan_channel(channel, limit, pacer, log_prefix="", after=None, newest_first=False):
+    """Read one channel's history into its own ScanResult.
+
+    With `after` (a message ID) only messages newer than it are read, oldest
+    first, so a rescan picks up where the last one stopped. newest_first
+    reads them from the newest down instead, so if there are more than
+    `limit` the most recent ones are the ones read. Either way a channel
+    that reaches the limit goes in `incomplete`.
+    """
+    result = ScanResult()
+    result.channels_scanned = 1
+    fetched = 0
+    newest = after or 0
+    if after:
+        history = channel.history(limit=limit, after=discord.Object(id=after), oldest_first=not newest_first)
+    else:
+        history = channel.history(limit=limit)
+    try:
+        await pacer.wait()
+        async for msg in history:
+            fetched += 1
+            if fetched % HISTORY_PAGE_SIZE == 0:
+                # The next iteration fetches a new page
+                await pacer.wait()
+            if msg.id > newest:
+                newest = msg.id
+
+            # Skip bot messages
+            if msg.author.bot:
+                continue
+            result.add_message(msg)
+    except discord.Forbidden:
+        print(f"{log_prefix}Forbidden: Cannot access channel '{channel.name}'")
+    except Exception as e:
+        print(f"{log_prefix}Error scanning channel {channel.name}: {e}")
+        if after:
+            result.incomplete.add(channel.id)
+    if after and fetched >= limit:
+        result.incomplete.add(channel.id)
+    if newest:
+        result.watermarks[channel.id] = newest
+    return result
+
+
+async def scan_guild(guild, limit, concurrency, pages_per_second, log_prefix="", watermarks=None, newest_first=False):
+    """Scan every readable text channel in a guild using a bounded pool of workers.
+
+    Each worker scans one channel at a time into a partial result, and the
+    partials are merged as channels finish, so total time is bounded by the
+    slowest channels instead of the sum of all of them. Channels with a
+    watermark (channel_id -> message ID) are only read from there on
+    (newest first, with newest_first).
+    """
+    watermarks = watermarks or {}
+    channels = [
+        channel for channel in guild.text_channels
+        if channel.permissions_for(guild.me).read_message_history
+    ]
+    print(f"{log_prefix}Found {len(guild.text_channels)} text channels, bot has permission to read {len(channels)} of them")
+
+    queue = asyncio.Queue()
+    for channel in channels:
+        queue.put_nowait(channel)
+
+    pacer = PagePacer(pages_per_second)
+    total = ScanResult()
+    start = time.monotonic()
+
+    async def worker():
+        while True:
+            try:
+                channel = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            channel_start = time.monotonic()
+            partial = await scan_channel(channel, limit, pacer, log_prefix, watermarks.get(channel.id), newest_first)
+            elapsed = time.monotonic() - channel_start
+            metrics.scan_messages.inc(guild.id, channel.id, amount=partial.message_count)
+            metrics.scan_rate.set(partial.message_count / elapsed if elapsed > 0 else 0, guild.id, channel.id)
+            total.merge(partial)
+            new = " new" if channel.id in watermarks else ""
+            print(f"{log_prefix}  → Found {partial.message_count}{new} messages in '{channel.name}' ({total.channels_scanned}/{len(channels)})")
+
+    workers = min(concurrency, len(channels))
+    await asyncio.gather(*(worker() for _ in range(workers)))
+
+    print(f"{log_prefix}✓ Scanned {total.message_count} messages across {total.channels_scanned} channels in {time.monotonic() - start:.1f}s")
+    return total
+
+
+class ScanCache:
+    """Per-guild cache of scan_guild results with single-flight deduplication.
+
+    A fresh result (younger than ttl seconds) is returned as is. Otherwise one
+    scan is started, and every caller asking for the same guild while it runs
+    awaits that same scan instead of starting another. With a ScanStore the
+    scan is incremental: only messages after the stored watermarks are read,
+    and they are added to the stored totals. Scans of one guild that touch
+    the store run one at a time, so a scan started after invalidate() waits
+    for the one it replaced to store its messages and then reads on from
+    there, instead of reading (and adding) the same messages again.
+    """
+
+    def __init__(self, limit, concurrency, pages_per_second, ttl, store=None, guild_limit=None):
+        self.limit = limit
+        self.guild_limit = guild_limit  # guild_id -> that server's own scan limit or None, if servers can set one
+        self.concurrency = concurrency
+        self.pages_per_second = pages_per_second
+        self.ttl = ttl
+        self.store = store  # ScanStore with watermarks and running totals, or None to always rescan
+        self._results = {}  # guild_id -> (monotonic time scanned, ScanResult)
+        self._in_flight = {}  # guild_id -> asyncio.Task running scan_guild
+        self._store_locks = {}  # guild_id -> asyncio.Lock held while a scan reads and updates the store
+
+    async def get(self, guild, log_prefix=""):
+        """Return a ScanResult for the guild, scanning only if there is no fresh one"""
+        self._drop_expired()
+        cached = self._results.get(guild.id)
+        if cached is not None:
+            print(f"{log_prefix}Using cached scan of '{guild.name}' ({self.age(guild.id):.0f}s old)")
+            return cached[1]
+
+        task = self._in_flight.get(guild.id)
+        if task is None:
+            task = asyncio.create_task(self._scan(guild, log_prefix))
+            self._in_flight[guild.id] = task
+        else:
+            print(f"{log_prefix}Waiting for scan of '{guild.name}' already in progress")
+        # Shield so a cancelled caller doesn't cancel the scan other callers are waiting on
+        return await asyncio.shield(task)
+
+    def age(self, guild_id):
+        """Seconds since the cached result for a guild was taken, or None"""
+        cached = self._results.get(guild_id)
+        if cached is None:
+            return None
+        return time.monotonic() - cached[0]
+
+    def limit_for(self, guild_id):
+        """Messages read per channel when scanning a guild"""
+        if self.guild_limit is not None:
+            return self.guild_limit(guild_id) or self.limit
+        return self.limit
+
+    def invalidate(self, guild_id):
+        """Forget the cached result for a guild so the next get() rescans"""
+        self._results.pop(guild_id, None)
+        # A scan already running may have read stale data; let it finish for its
+        # current waiters but don't cache it or hand it to new callers
+        self._in_flight.pop(guild_id, None)
+
+    async def forget(self, guild_id):
+        """Invalidate a guild and delete its stored totals, so the next scan starts from scratch"""
+        self.invalidate(guild_id)
+        if self.store is not None:
+            # Wait for a running scan to write its results first, or they would land after the delete
+            async with self._store_lock(guild_id):
+                await self.store.forget(guild_id)
+
+    async def _scan(self, guild, log_prefix):
+        task = asyncio.current_task()
+        limit = self.limit_for(guild.id)
+        try:
+            if self.store is None:
+                result = await scan_guild(guild, limit, self.concurrency, self.pages_per_second, log_prefix)
+                result.messages_read = result.message_count
+            else:
+                async with self._store_lock(guild.id):
+                    result = await self.store.load(guild.id)
+                    new = await scan_guild(guild, limit, self.concurrency, self.pages_per_second, log_prefix,
+                                           result.watermarks)
+                    await self.store.add(guild.id, new)
+                result.merge(new)
+                result.channels_scanned = new.channels_scanned
+                result.messages_read = new.message_count
+            if self._in_flight.get(guild.id) is task:
+                self._results[guild.id] = (time.monotonic(), result)
+            return result
+        finally:
+            if self._in_flight.get(guild.id) is task:
+                del self._in_flight[guild.id]
+
+    def _store_lock(self, guild_id):
+        lock = self._store_locks.get(guild_id)
+        if lock is None:
+            lock = self._store_locks[guild_id] = asyncio.Lock()
+        return lock
+
+    def _drop_expired(self):
+        now = time.monotonic()
+        expired = [guild_id for guild_id, (scanned_at, _) in self._results.items() if now - scanned_at >= self.ttl]
+        for guild_id in expired:
+            del self._results[guild_id]
@@ -0,0 +1,152 @@
+import math
+import time
+from array import array
+
+from config import (
+    OWNER_ID, NUKE_OWNER_ID, RATE_LIMIT_SECONDS, COOLDOWN_EXPENSIVE_COMMANDS, MAX_MESSAGES_PER_MINUTE,
+    HUMOR_API_KEY, AI_WORKERS, AI_MAX_QUEUE, AI_MAX_RETRIES, AI_RETRY_BASE_DELAY,
+    MESSAGE_SCAN_LIMIT, SCAN_CONCURRENCY, SCAN_PAGES_PER_SECOND, SCAN_CACHE_TTL,
+    MEME_BUFFER_SIZE, MEME_LOW_WATER, MEME_MAX_AGE, MEME_MAX_BACKOFF,
+    ACTIVITY_DB_PATH, ACTIVITY_FLUSH_INTERVAL, ACTIVITY_FLUSH_BATCH,
+    REPORT_PRECOMPUTE_INTERVAL, REPORT_OFF_PEAK_HOURS,
+    WATCHDOG_INTERVAL, WATCHDOG_STALL_THRESHOLD, WATCHDOG_HANDLER_THRESHOLD, WATCHDOG_EVENTS_KEPT,
+)
+from activity_index import ActivityIndex
+from guild_settings import GuildSettings
+from memes import MemeBuffer
+from ai_queue import AIScheduler
+from scanner import ScanCache, HISTORY_PAGE_SIZE, scan_guild
+from scan_store import ScanStore
+from kicker import KickPacer
+from loop_watchdog import Watchdog
+from members import build_activity_table
+from reports import InactivityReport, ReportScheduler
+from safety import take_background_budget
+
+INACTIVE_TIERS = (30, 14, 7)  # Day thresholds of the !inactive report
+INACTIVE_TOP_PER_TIER = 10  # Members listed by name in each tier on the report's first page
+
+# Per-server overrides of the limits and owners in config.py, looked up on every message
+guild_settings = GuildSettings(ACTIVITY_DB_PATH, {
+    'admins': frozenset(OWNER_ID),
+    'nuke_owners': frozenset((NUKE_OWNER_ID,)),
+    'rate_limit_seconds': RATE_LIMIT_SECONDS,
+    'cooldown_seconds': COOLDOWN_EXPENSIVE_COMMANDS,
+    'max_messages_per_minute': MAX_MESSAGES_PER_MINUTE,
+    'scan_limit': MESSAGE_SCAN_LIMIT,
+})
+
+# Last-seen index fed by on_message, used by !inactive and !nuke instead of rescanning history
+activity_index = ActivityIndex(ACTIVITY_DB_PATH, ACTIVITY_FLUSH_INTERVAL, ACTIVITY_FLUSH_BATCH)
+
+# Prefetched memes so !meme doesn't wait on the API
+meme_buffer = MemeBuffer(HUMOR_API_KEY, MEME_BUFFER_SIZE, MEME_LOW_WATER, MEME_MAX_AGE, MEME_MAX_BACKOFF)
+
+# Worker pool for OpenRouter requests, fair across guilds
+ai_scheduler = AIScheduler(AI_WORKERS, AI_MAX_QUEUE, AI_MAX_RETRIES, AI_RETRY_BASE_DELAY)
+
+# Per-channel watermarks and running totals, so rescans only read new messages
+scan_store = ScanStore(ACTIVITY_DB_PATH)
+
+# Shared history scans, cached per guild so back-to-back commands don't rescan
+scan_cache = ScanCache(MESSAGE_SCAN_LIMIT, SCAN_CONCURRENCY, SCAN_PAGES_PER_SECOND, SCAN_CACHE_TTL, scan_store,
+                       guild_limit=lambda guild_id: guild_settings.override(guild_id, 'scan_limit'))
+
+# Kick pacing for !nuke, fed by the rate limit headers on Discord's kick responses
+kick_pacer = KickPacer()
+
+# Captures stacks when the event loop blocks or an on_message call runs long
+watchdog = Watchdog(WATCHDOG_INTERVAL, WATCHDOG_STALL_THRESHOLD, WATCHDOG_HANDLER_THRESHOLD, WATCHDOG_EVENTS_KEPT)
+
+async def backfill_activity_index(guild, log_prefix=""):
+    """Seed the activity index for a guild from recent message history"""
+    scan = await scan_cache.get(guild, log_prefix)
+    for user_id, seen_at in scan.last_seen.items():
+        activity_index.record(guild.id, user_id, seen_at.timestamp())
+    activity_index.record_channels_read(guild.id, scan.watermarks)
+    await activity_index.mark_backfilled(guild.id)
+    print(f"{log_prefix}✓ Backfilled activity index for {len(scan.last_seen)} members")
+    return scan
+
+
+async def catch_up_activity_index(guild, log_prefix=""):
+    """Read messages posted since the bot last saw each channel (e.g. while it was offline) into the activity index.
+
+    Each channel is read newest first back to its mark. Returns the number
+    of channels with more messages in that gap than the scan limit; unless
+    it is 0 the guild is not marked caught up, since someone who only posted
+    in the unread part would look inactive.
+    """
+    marks = activity_index.catch_up_marks(guild.id)
+    scan = await scan_guild(guild, scan_cache.limit_for(guild.id), scan_cache.concurrency, scan_cache.pages_per_second,
+                            log_prefix, marks, newest_first=True)
+    for user_id, seen_at in scan.last_seen.items():
+        activity_index.record(guild.id, user_id, seen_at.timestamp())
+    # Channels that hit the limit keep their old mark, so the next catch-up reads their gap again
+    read = {channel_id: message_id for channel_id, message_id in scan.watermarks.items() if channel_id not in scan.incomplete}
+    activity_index.record_channels_read(guild.id, read)
+    await activity_index.flush()
+    if scan.incomplete:
+        print(f"{log_prefix}⚠️ Not caught up: {len(scan.incomplete)} channels had more messages since the bot last saw them than the scan limit")
+        return len(scan.incomplete)
+    activity_index.mark_caught_up(guild.id)
+    print(f"{log_prefix}✓ Caught up the activity index from history")
+    return 0
+
+
+async def build_inactivity_report(guild, progress=None, log_prefix=""):
+    """Work out a guild's !inactive report from the activity index, backfilling it first if needed"""
+    now = time.time()
+    message_count = 0
+    channels_scanned = 0
+    unread = 0
+
+    # One-time backfill: seed the activity index from message history.
+    # After this, on_message keeps the index up to date and no scan is needed.
+    if not activity_index.is_backfilled(guild.id):
+        if progress is not None:
+            await progress("🔍 First run: scanning message history across all server channels...")
+        scan = await backfill_activity_index(guild, log_prefix)
+        message_count = scan.messages_read
+        channels_scanned = scan.channels_scanned
+    elif activity_index.needs_catch_up(guild.id):
+        # Only on_message keeps the index current, so anything sent while the bot was down would look like inactivity
+        if progress is not None:
+            await progress("🔍 Catching up on messages sent while the bot was offline...")
+        unread = await catch_up_activity_index(guild, log_prefix)
+
+    # Each member's last activity: their newest message in the index, falling back to their join date
+    last_seen = await activity_index.last_seen_for_guild(guild.id)
+    table = await build_activity_table(guild, last_seen, now)
+    print(f"{log_prefix}✓ Tracking {len(table)} non-bot members ({len(last_seen)} in activity index)")
+
+    if channels_scanned:
+        summary = f"Scanned {message_count} messages across {channels_scanned} channels"
+    else:
+        summary = f"Activity index: {len(last_seen)} members with recorded messages"
+    if unread:
+        summary += (f"\n⚠️ {unread} channels had more messages while the bot was offline than the scan limit reads; "
+                    "members who only posted then may be listed as inactive")
+
+    # Categorize users by inactivity period (each tier comes back most inactive first).
+    # Whole tiers are kept, 12 bytes a member, so every page of the report renders from here.
+    tiers = [
+        (array('Q', (table.ids[row] for row in rows)), array('I', (table.days_inactive(row, now) for row in rows)))
+        for rows in table.tiers(now, INACTIVE_TIERS)
+    ]
+    return InactivityReport(guild.id, now, summary, len(table), tiers)
+
+
+def estimate_report_pages(guild):
+    """History pages building a guild's report would read (only the first one, and the first after downtime, scan)"""
+    if activity_index.is_backfilled(guild.id) and not activity_index.needs_catch_up(guild.id):
+        return 0
+    readable = sum(1 for channel in guild.text_channels if channel.permissions_for(guild.me).read_message_history)
+    return readable * math.ceil(scan_cache.limit_for(guild.id) / HISTORY_PAGE_SIZE)
+
+
+# Latest !inactive report per guild, rebuilt in the background so the command answers instantly
+report_scheduler = ReportScheduler(
+    build_inactivity_report, estimate_report_pages, take_background_budget,
+    REPORT_PRECOMPUTE_INTERVAL, REPORT_OFF_PEAK_HOURS
+)
@@ -0,0 +1,298 @@
+"""Where rate limit, cooldown and mute state lives.
+
+MemoryStore keeps it in this process (a RateLimiter), which is all a single
+process needs. RedisStore keeps the same token buckets and blocks in Redis,
+so several shard processes share them and a user's cooldown follows them to
+whichever shard handles their next message. Both have the same async
+interface; safety.py picks one from STATE_STORE.
+
+RedisStore speaks the Redis protocol (RESP) itself with a small client
+below, so there is no extra dependency; bench/resp_server.py is a local
+stand-in that serves the commands it uses.
+"""
+import asyncio
+import math
+import os
+from urllib.parse import urlsplit
+
+from ratelimit import RateLimiter, decode_snapshot
+
+
+class StateStore:
+    """Token buckets and blocks shared by everything that enforces safety limits.
+
+    requests are (policy, key, cost) tuples, as for RateLimiter.acquire.
+    """
+
+    def add_policy(self, name, capacity, per_seconds):
+        raise NotImplementedError
+
+    async def acquire(self, now, *requests):
+        """(True, 0, None) if every bucket had the tokens (they are taken), else (False, wait, policy)"""
+        raise NotImplementedError
+
+    async def refund(self, now, *requests):
+        raise NotImplementedError
+
+    async def block(self, name, key, seconds, now):
+        raise NotImplementedError
+
+    async def blocked_for(self, name, key, now):
+        raise NotImplementedError
+
+    async def sweep(self, now):
+        """Drop idle state, returning how many entries went"""
+        raise NotImplementedError
+
+    async def save(self, path, now):
+        """Write state a restart would lose to path (nothing, if it lives outside the process)"""
+
+    async def load(self, path, now):
+        """Merge in state written by save(), returning how many entries came back"""
+        return 0
+
+    async def close(self):
+        pass
+
+
+class MemoryStore(StateStore):
+    """State held in this process only"""
+
+    def __init__(self, max_keys):
+        self.limiter = RateLimiter(max_keys)
+
+    def add_policy(self, name, capacity, per_seconds):
+        self.limiter.add_policy(name, capacity, per_seconds)
+
+    async def acquire(self, now, *requests):
+        return self.limiter.acquire(now, *requests)
+
+    async def refund(self, now, *requests):
+        self.limiter.refund(now, *requests)
+
+    async def block(self, name, key, seconds, now):
+        self.limiter.block(name, key, seconds, now)
+
+    async def blocked_for(self, name, key, now):
+        return self.limiter.blocked_for(name, key, now)
+
+    async def sweep(self, now):
+        return self.limiter.sweep(now)
+
+    async def save(self, path, now):
+        data = self.limiter.snapshot(now)
+        await asyncio.to_thread(_write_file, path, data)
+
+    async def load(self, path, now):
+        try:
+            state = await asyncio.to_thread(_read_snapshot, path)
+        except FileNotFoundError:
+            return 0
+        return self.limiter.restore(state, now)
+
+
+def _write_file(path, data):
+    temp_path = path + '.tmp'
+    with open(temp_path, 'wb') as f:
+        f.write(data)
+    os.replace(temp_path, path)  # A crash mid-write leaves the previous snapshot intact
+
+
+def _read_snapshot(path):
+    with open(path, 'rb') as f:
+        return decode_snapshot(f.read())
+
+
+class RespError(Exception):
+    """An error reply from the Redis server"""
+
+
+class RespConnection:
+    """Minimal asyncio Redis client: one connection, commands pipelined in order"""
+
+    def __init__(self, url, timeout=2):
+        parts = urlsplit(url)
+        self.host = parts.hostname or '127.0.0.1'
+        self.port = parts.port or 6379
+        self.password = parts.password
+        self.db = int(parts.path.lstrip('/') or 0)
+        self.timeout = timeout
+        self._reader = None
+        self._writer = None
+        self._lock = asyncio.Lock()  # One command batch on the wire at a time
+
+    async def pipeline(self, *commands):
+        """Send several commands in one write and return their replies in order"""
+        async with self._lock:
+            try:
+                if self._writer is None:
+                    await self._connect()
+                return await asyncio.wait_for(self._round_trip(commands), self.timeout)
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError):
+                self._disconnect()  # Reconnect on the next call
+                raise
+
+    async def execute(self, *args):
+        reply = (await self.pipeline(args))[0]
+        if isinstance(reply, RespError):
+            raise reply
+        return reply
+
+    async def close(self):
+        async with self._lock:
+            self._disconnect()
+
+    async def _connect(self):
+        self._reader, self._writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port), self.timeout
+        )
+        setup = []
+        if self.password:
+            setup.append(('AUTH', self.password))
+        if self.db:
+            setup.append(('SELECT', self.db))
+        if setup:
+            for reply in await self._round_trip(setup):
+                if isinstance(reply, RespError):
+                    raise reply
+
+    def _disconnect(self):
+        if self._writer is not None:
+            self._writer.close()
+        self._reader = self._writer = None
+
+    async def _round_trip(self, commands):
+        self._writer.write(b''.join(_encode(command) for command in commands))
+        await self._writer.drain()
+        return [await _read_reply(self._reader) for _ in commands]
+
+
+def _encode(args):
+    out = [b'*%d\r\n' % len(args)]
+    for arg in args:
+        if not isinstance(arg, bytes):
+            arg = str(arg).encode()
+        out.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+    return b''.join(out)
+
+
+async def _read_reply(reader):
+    line = await reader.readuntil(b'\r\n')
+    kind, rest = line[:1], line[1:-2]
+    if kind == b'+':
+        return rest.decode()
+    if kind == b'-':
+        return RespError(rest.decode())
+    if kind == b':':
+        return int(rest)
+    if kind == b'$':
+        length = int(rest)
+        if length < 0:
+            return None
+        data = await reader.readexactly(length + 2)
+        return data[:-2].decode()
+    if kind == b'*':
+        count = int(rest)
+        if count < 0:
+            return None
+        return [await _read_reply(reader) for _ in range(count)]
+    raise RespError(f"unexpected reply {line!r}")
+
+
+class RedisStore(StateStore):
+    """State in Redis, shared by every process pointed at the same server.
+
+    A bucket is a hash of its token count and when it was last updated.
+    Taking tokens from several buckets at once uses WATCH/MULTI/EXEC, so two
+    shards racing for the same bucket can't both spend its last token (the
+    loser retries). Buckets expire once they would have refilled, and blocks
+    are plain keys with a TTL, so there is nothing to sweep.
+
+    If Redis can't be reached the checks fail open (nobody is limited) rather
+    than taking the bot down with them.
+    """
+
+    MAX_ATTEMPTS = 10  # Transaction retries when another shard touched the same bucket
+
+    def __init__(self, url, prefix='botty'):
+        self.connection = RespConnection(url)
+        self.prefix = prefix
+        self._policies = {}  # name -> (capacity, tokens refilled per second)
+        self._transaction = asyncio.Lock()  # WATCH state belongs to the connection, so one transaction at a time
+
+    def add_policy(self, name, capacity, per_seconds):
+        self._policies[name] = (capacity, capacity / per_seconds)
+
+    async def acquire(self, now, *requests):
+        try:
+            return await self._transact(now, requests, take=True)
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, RespError) as e:
+            print(f"State store unavailable, allowing request: {e}")
+            return True, 0, None
+
+    async def refund(self, now, *requests):
+        try:
+            await self._transact(now, requests, take=False)
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, RespError) as e:
+            print(f"State store unavailable, refund dropped: {e}")
+
+    async def block(self, name, key, seconds, now):
+        try:
+            await self.connection.execute('SET', self._key('block', name, key), 1, 'PX', max(1, int(seconds * 1000)))
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, RespError) as e:
+            print(f"State store unavailable, block dropped: {e}")
+
+    async def blocked_for(self, name, key, now):
+        try:
+            ttl = await self.connection.execute('PTTL', self._key('block', name, key))
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, RespError) as e:
+            print(f"State store unavailable, treating as not blocked: {e}")
+            return 0
+        return ttl / 1000 if ttl > 0 else 0
+
+    async def sweep(self, now):
+        return 0  # Redis expires idle buckets and finished blocks itself
+
+    async def close(self):
+        await self.connection.close()
+
+    async def _transact(self, now, requests, take):
+        keys = [self._key('bucket', name, key) for name, key, _ in requests]
+        async with self._transaction:
+            return await self._attempt(now, requests, keys, take)
+
+    async def _attempt(self, now, requests, keys, take):
+        for _ in range(self.MAX_ATTEMPTS):
+            replies = await self.connection.pipeline(('WATCH', *keys), *(('HMGET', key, 'tokens', 'at') for key in keys))
+            levels = []
+            wait = 0
+            limited_by = None
+            for (name, _, cost), stored in zip(requests, replies[1:]):
+                capacity, rate = self._policies[name]
+                tokens = capacity
+                if stored[0] is not None:
+                    tokens = min(capacity, float(stored[0]) + (now - float(stored[1])) * rate)
+                if take and tokens < cost:
+                    needed = (cost - tokens) / rate
+                    if needed > wait:
+                        wait, limited_by = needed, name
+                levels.append(min(capacity, tokens - cost) if take else min(capacity, tokens + cost))
+            if limited_by is not None:
+                await self.connection.execute('UNWATCH')
+                return False, wait, limited_by
+
+            commands = [('MULTI',)]
+            for (name, _, _), key, tokens in zip(requests, keys, levels):
+                capacity, rate = self._policies[name]
+                commands.append(('HSET', key, 'tokens', repr(tokens), 'at', repr(now)))
+                # Gone once it would have refilled completely, same as a missing bucket
+                commands.append(('PEXPIRE', key, max(1, math.ceil((capacity - tokens) / rate * 1000))))
+            commands.append(('EXEC',))
+            if (await self.connection.pipeline(*commands))[-1] is not None:
+                return True, 0, None
+        raise RespError("too much contention on rate limit buckets")
+
+    def _key(self, kind, name, key):
+        if isinstance(key, tuple):
+            key = ':'.join(str(part) for part in key)
+        return f"{self.prefix}:{kind}:{name}:{key}"
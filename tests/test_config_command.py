@@ -0,0 +1,79 @@
+"""!config permissions: who may change which per-server setting.
+
+    python -m unittest discover tests
+"""
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+_data_dir = tempfile.mkdtemp()
+os.environ['ACTIVITY_DB_PATH'] = os.path.join(_data_dir, 'activity.db')
+os.environ['STATE_SNAPSHOT_PATH'] = os.path.join(_data_dir, 'safety_state.bin')
+
+import commands  # noqa: E402 (the paths above must be set before services opens its databases)
+from commands import COMMANDS, CommandContext  # noqa: E402
+from config import NUKE_OWNER_ID, OWNER_ID  # noqa: E402
+from services import guild_settings  # noqa: E402
+
+GUILD_ID = 5
+OTHER_OWNER_ID = next(user_id for user_id in OWNER_ID if user_id != NUKE_OWNER_ID)
+
+
+class Channel:
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, content=None, **kwargs):
+        self.sent.append(content)
+
+
+def make_message(content, author_id):
+    guild = SimpleNamespace(id=GUILD_ID, name='test-guild')
+    author = SimpleNamespace(id=author_id, name=str(author_id), mention=f'<@{author_id}>')
+    return SimpleNamespace(content=content, author=author, guild=guild, channel=Channel())
+
+
+async def run_config(author_id, *args):
+    message = make_message('!config ' + ' '.join(args), author_id)
+    await COMMANDS['config'].handler(
+        CommandContext(None, message, COMMANDS['config'], list(args), guild_settings.get(GUILD_ID))
+    )
+    return message.channel.sent
+
+
+class ConfigPermissionTest(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncTearDown(self):
+        await guild_settings.reset(GUILD_ID)
+
+    async def test_owner_who_is_not_a_nuke_owner_cannot_set_nuke_owners(self):
+        sent = await run_config(OTHER_OWNER_ID, 'set', 'nuke_owners', str(OTHER_OWNER_ID))
+        self.assertIn("Permission Denied", sent[-1])
+        self.assertEqual(guild_settings.get(GUILD_ID).nuke_owners, frozenset((NUKE_OWNER_ID,)))
+
+        # And so still can't get past the !nuke owner check
+        message = make_message('!nuke', OTHER_OWNER_ID)
+        await commands.dispatch(None, message)
+        self.assertIn("Permission Denied", message.channel.sent[-1])
+
+    async def test_owner_who_is_not_a_nuke_owner_cannot_reset_nuke_owners(self):
+        await run_config(NUKE_OWNER_ID, 'set', 'nuke_owners', f'{NUKE_OWNER_ID} 123')
+        for target in ('nuke_owners', 'all'):
+            sent = await run_config(OTHER_OWNER_ID, 'reset', target)
+            self.assertIn("Permission Denied", sent[-1])
+        self.assertEqual(guild_settings.get(GUILD_ID).nuke_owners, frozenset((NUKE_OWNER_ID, 123)))
+
+    async def test_nuke_owner_can_change_nuke_owners(self):
+        await run_config(NUKE_OWNER_ID, 'set', 'nuke_owners', f'{NUKE_OWNER_ID} {OTHER_OWNER_ID}')
+        self.assertEqual(guild_settings.get(GUILD_ID).nuke_owners, frozenset((NUKE_OWNER_ID, OTHER_OWNER_ID)))
+
+    async def test_other_settings_and_reset_all_stay_open_to_owners(self):
+        await run_config(OTHER_OWNER_ID, 'set', 'scan_limit', '500')
+        self.assertEqual(guild_settings.get(GUILD_ID).scan_limit, 500)
+        await run_config(OTHER_OWNER_ID, 'reset', 'all')
+        self.assertIs(guild_settings.get(GUILD_ID), guild_settings.defaults)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+"""RedisStore against the RESP stand-in in bench/resp_server.py.
+
+    python -m unittest discover tests
+"""
+import asyncio
+import time
+import unittest
+
+from bench.resp_server import start_server
+from state_store import RedisStore
+
+
+class RedisStoreTest(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.server = await start_server('127.0.0.1', 0)
+        self.url = f"redis://127.0.0.1:{self.server.sockets[0].getsockname()[1]}"
+        self.stores = []
+
+    async def asyncTearDown(self):
+        for store in self.stores:
+            await store.close()
+        await asyncio.sleep(0.01)  # Let the server's connection handlers see the clients hang up
+        self.server.close()
+        await self.server.wait_closed()
+
+    def make_store(self, url=None):
+        store = RedisStore(url or self.url, prefix='test')
+        store.add_policy('command', 2, 60)
+        store.add_policy('spam', 5, 60)
+        self.stores.append(store)
+        return store
+
+    async def test_acquire_stops_at_capacity(self):
+        store = self.make_store()
+        now = time.time()
+        self.assertEqual(await store.acquire(now, ('command', 1, 1)), (True, 0, None))
+        self.assertEqual(await store.acquire(now, ('command', 1, 1)), (True, 0, None))
+        allowed, wait, policy = await store.acquire(now, ('command', 1, 1))
+        self.assertFalse(allowed)
+        self.assertEqual(policy, 'command')
+        self.assertAlmostEqual(wait, 30, places=3)  # One token refills every 30 seconds
+        # Other keys have their own buckets, and time refills this one
+        self.assertTrue((await store.acquire(now, ('command', 2, 1)))[0])
+        self.assertTrue((await store.acquire(now + 30, ('command', 1, 1)))[0])
+
+    async def test_acquire_takes_all_buckets_or_none(self):
+        store = self.make_store()
+        now = time.time()
+        await store.acquire(now, ('command', 1, 2))
+        allowed, _, policy = await store.acquire(now, ('spam', 1, 1), ('command', 1, 1))
+        self.assertFalse(allowed)
+        self.assertEqual(policy, 'command')
+        # The spam token was not spent by the refused request
+        self.assertTrue((await store.acquire(now, ('spam', 1, 5)))[0])
+
+    async def test_refund_returns_tokens(self):
+        store = self.make_store()
+        now = time.time()
+        await store.acquire(now, ('command', 1, 2))
+        await store.refund(now, ('command', 1, 1))
+        self.assertTrue((await store.acquire(now, ('command', 1, 1)))[0])
+        self.assertFalse((await store.acquire(now, ('command', 1, 1)))[0])
+
+    async def test_block_and_remaining_time(self):
+        store = self.make_store()
+        now = time.time()
+        self.assertEqual(await store.blocked_for('mute', 1, now), 0)
+        await store.block('mute', 1, 60, now)
+        self.assertTrue(59 < await store.blocked_for('mute', 1, now) <= 60)
+        self.assertEqual(await store.blocked_for('mute', 2, now), 0)
+        await store.block('mute', 3, 0.05, now)
+        await asyncio.sleep(0.1)
+        self.assertEqual(await store.blocked_for('mute', 3, now), 0)
+
+    async def test_concurrent_shards_never_overspend_a_bucket(self):
+        # Each store has its own connection, like separate shard processes
+        stores = [self.make_store() for _ in range(4)]
+        aborted = 0
+        for store in stores:
+            pipeline = store.connection.pipeline
+
+            async def counting_pipeline(*commands, pipeline=pipeline):
+                nonlocal aborted
+                replies = await pipeline(*commands)
+                if commands[-1] == ('EXEC',) and replies[-1] is None:
+                    aborted += 1
+                return replies
+            store.connection.pipeline = counting_pipeline
+
+        now = time.time()
+        results = await asyncio.gather(*(
+            store.acquire(now, ('spam', 1, 1)) for store in stores for _ in range(5)
+        ))
+        self.assertEqual(sum(allowed for allowed, _, _ in results), 5)
+        self.assertGreater(aborted, 0)  # The WATCH conflict path was actually taken
+
+    async def test_fails_open_when_connection_drops(self):
+        store = self.make_store()
+        now = time.time()
+        await store.acquire(now, ('command', 1, 2))
+        store.connection._writer.transport.abort()
+        self.assertEqual(await store.acquire(now, ('command', 1, 1)), (True, 0, None))
+        # The next call reconnects and sees the bucket is still empty
+        self.assertFalse((await store.acquire(now, ('command', 1, 1)))[0])
+
+    async def test_fails_open_when_server_is_gone(self):
+        self.server.close()
+        await self.server.wait_closed()
+        store = self.make_store()
+        now = time.time()
+        self.assertEqual(await store.acquire(now, ('command', 1, 1)), (True, 0, None))
+        await store.block('mute', 1, 60, now)
+        self.assertEqual(await store.blocked_for('mute', 1, now), 0)
+        await store.refund(now, ('command', 1, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()